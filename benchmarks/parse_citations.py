@@ -0,0 +1,68 @@
+"""Benchmark processing citation records from the API.
+
+Run with ``python benchmarks/parse_citations.py``. It reports the number of records per
+second for each return type of
+:func:`opencitations_client.get_incoming_citations_from_api`, on a synthetic response
+like one for a highly cited article. Full citations are validated with
+:func:`opencitations_client.models.process_citation`, while strings and references are
+taken directly from the CURIEs in each record. Each rate is the best of several runs,
+since a single run is easily slowed down by the rest of the machine.
+"""
+
+import gc
+import time
+from typing import Any
+
+import click
+from curies import Reference
+
+from opencitations_client.json_api_client import _process_citations
+from opencitations_client.models import CitationReturnType
+
+REFERENCE = Reference(prefix="doi", identifier="10.1038/s41597-022-01807-3")
+
+
+def _get_records(n: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "oci": f"0{i}-061202127149",
+            "citing": f"omid:br/0{i} doi:10.1000/{i} openalex:W{i} pmid:{i}",
+            "cited": f"omid:br/061202127149 doi:{REFERENCE.identifier} pmid:36371467",
+            "creation": "2023-04-01",
+            "timespan": "P0Y5M",
+            "journal_sc": "no",
+            "author_sc": "no",
+        }
+        for i in range(n)
+    ]
+
+
+def _time(records: int, return_type: CitationReturnType, repeats: int) -> float:
+    rates = []
+    for _ in range(repeats):
+        data = _get_records(records)
+        # collect the garbage from previous runs first, so it doesn't slow down this one
+        gc.collect()
+        start = time.perf_counter()
+        _process_citations(data, REFERENCE, return_type=return_type, outgoing=False)
+        rates.append(records / (time.perf_counter() - start))
+    return max(rates)
+
+
+@click.command()
+@click.option("--records", type=int, default=100_000, show_default=True)
+@click.option("--repeats", type=int, default=10, show_default=True)
+def main(records: int, repeats: int) -> None:
+    """Benchmark processing citation records from the API."""
+    baseline = _time(records, "citation", repeats)
+    click.echo(f"{'return_type=citation:':<24} {baseline:>10,.0f} records/s")
+    for return_type in ("reference", "str"):
+        rate = _time(records, return_type, repeats)
+        click.echo(
+            f"{'return_type=' + return_type + ':':<24} {rate:>10,.0f} records/s"
+            f" ({rate / baseline:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
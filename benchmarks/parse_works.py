@@ -0,0 +1,65 @@
+"""Benchmark parsing CSV files from the metadata dump.
+
+Run with ``python benchmarks/parse_works.py``. It reports the number of rows per second
+for each way of parsing a CSV file from the metadata archive: validating each row into
+a :class:`opencitations_client.Work`, wrapping it in a
+:class:`opencitations_client.models.LazyWork` (then reading only its OMID, or all of
+its fields), and projecting a few columns into dictionaries or arrays.
+"""
+
+import time
+from collections.abc import Callable, Iterable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import click
+
+from opencitations_client import download
+from opencitations_client.models import Work
+
+HERE = Path(__file__).parent.resolve()
+SAMPLE_PATH = HERE.parent.joinpath("tests", "articles_sample.csv")
+COLUMNS = ("id", "pub_date", "type")
+
+
+def _lazy_omid(data: bytes) -> None:
+    for work in download._process_metadata_member_lazy(data):
+        _ = work.omid
+
+
+def _lazy_all(data: bytes) -> None:
+    for work in download._process_metadata_member_lazy(data):
+        for field in Work.model_fields:
+            getattr(work, field)
+
+
+def _time(func: Callable[[bytes], Any], data: bytes, rows: int) -> float:
+    start = time.perf_counter()
+    func(data)
+    return rows / (time.perf_counter() - start)
+
+
+def _get_funcs() -> Iterable[tuple[str, Callable[[bytes], Any]]]:
+    yield "LazyWork, OMID only", _lazy_omid
+    yield "LazyWork, all fields", _lazy_all
+    columns = ", ".join(COLUMNS)
+    yield f"columns={columns}", partial(download._process_metadata_member_columns, columns=COLUMNS)
+    yield f"batches of {columns}", partial(download._process_metadata_member_batch, columns=COLUMNS)
+
+
+@click.command()
+@click.option("--rows", type=int, default=100_000, show_default=True)
+def main(rows: int) -> None:
+    """Benchmark parsing CSV files from the metadata dump."""
+    header, *lines = SAMPLE_PATH.read_text().splitlines(keepends=True)
+    data = "".join([header, *(lines[i % len(lines)] for i in range(rows))]).encode("utf-8")
+    baseline = _time(download._process_metadata_member, data, rows)
+    click.echo(f"{'process_work:':<36} {baseline:>10,.0f} rows/s")
+    for name, func in _get_funcs():
+        rate = _time(func, data, rows)
+        click.echo(f"{name + ':':<36} {rate:>10,.0f} rows/s ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
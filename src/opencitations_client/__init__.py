@@ -1,6 +1,6 @@
 """Access and download data from OpenCitations."""
 
-from .api import Backend, get_incoming_citations, get_outgoing_citations
+from .api import Backend, get_articles, get_incoming_citations, get_outgoing_citations
 from .client import (
     get_doi_from_omid,
     get_doi_to_omid,
@@ -25,18 +25,23 @@ from .download import (
     ensure_source_nt,
 )
 from .json_api_client import (
-    get_articles,
     get_articles_for_author,
     get_articles_for_editor,
+    get_articles_many,
     get_incoming_citations_from_api,
+    get_incoming_citations_from_api_many,
     get_outgoing_citations_from_api,
+    get_outgoing_citations_from_api_many,
+    iter_incoming_citations_from_api,
+    iter_outgoing_citations_from_api,
 )
-from .models import Citation, CitationReturnType, Person, Publisher, Venue, Work
+from .models import Citation, CitationReturnType, LazyWork, Person, Publisher, Venue, Work
 
 __all__ = [
     "Backend",
     "Citation",
     "CitationReturnType",
+    "LazyWork",
     "Person",
     "Publisher",
     "Venue",
@@ -55,16 +60,21 @@ __all__ = [
     "get_articles",
     "get_articles_for_author",
     "get_articles_for_editor",
+    "get_articles_many",
     "get_doi_from_omid",
     "get_doi_to_omid",
     "get_incoming_citations",
     "get_incoming_citations_from_api",
+    "get_incoming_citations_from_api_many",
     "get_omid_from_doi",
     "get_omid_from_pubmed",
     "get_omid_to_doi",
     "get_omid_to_pubmed",
     "get_outgoing_citations",
     "get_outgoing_citations_from_api",
+    "get_outgoing_citations_from_api_many",
     "get_pubmed_from_omid",
     "get_pubmed_to_omid",
+    "iter_incoming_citations_from_api",
+    "iter_outgoing_citations_from_api",
 ]
@@ -0,0 +1,305 @@
+"""An asynchronous client for the OpenCitations JSON API.
+
+This module mirrors :mod:`opencitations_client.json_api_client` with coroutines, so
+many lookups can be made concurrently on an event loop without a thread per request.
+It requires :mod:`httpx`, which can be installed with ``pip install
+opencitations_client[aio]``.
+
+.. code-block:: python
+
+    import asyncio
+
+    from opencitations_client import aio
+
+
+    async def main(curies: list[str]):
+        async with aio.get_async_client() as client:
+            return await asyncio.gather(
+                *(aio.get_incoming_citations_from_api(curie, client=client) for curie in curies)
+            )
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Literal, overload
+
+import httpx
+import pystow
+from curies import Reference
+
+from .json_api_client import (
+    AGENT,
+    BASE_V2,
+    DEFAULT_MAX_WORKERS,
+    MAX_URL_LENGTH,
+    META_V1,
+    _get_articles_part,
+    _pack_references,
+    _process_citations,
+    _raise_for_invalid_articles,
+    _raise_for_invalid_person,
+)
+from .models import Citation, CitationReturnType, Work, handle_input, process_work
+from .rate_limit import get_rate_limiter
+from .retry import get_retry_policy
+
+__all__ = [
+    "get_articles",
+    "get_articles_for_author",
+    "get_articles_for_editor",
+    "get_async_client",
+    "get_incoming_citations_from_api",
+    "get_outgoing_citations_from_api",
+]
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get a client that keeps connections to the API alive, for reuse between calls."""
+    return httpx.AsyncClient(
+        headers={"User-Agent": AGENT},
+        timeout=15,
+        limits=httpx.Limits(max_connections=DEFAULT_MAX_WORKERS * 2),
+    )
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[str]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[Reference]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[Citation]: ...
+
+
+async def get_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    client: httpx.AsyncClient | None = None,
+) -> list[Citation] | list[Reference] | list[str]:
+    """Get the articles that the given article cites, from OpenCitations.
+
+    :param reference: The reference to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param client: A client from :func:`get_async_client`. If not given, a new
+        connection is opened for the call.
+    :return: A list of citations
+
+    .. seealso:: :func:`opencitations_client.get_outgoing_citations_from_api`
+    """
+    reference = handle_input(reference)
+    res = await _get(f"{BASE_V2}/references/{reference.curie}", token=token, client=client)
+    res.raise_for_status()
+    return _process_citations(res.json(), reference, return_type=return_type, outgoing=True)
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[str]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[Reference]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+async def get_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    client: httpx.AsyncClient | None = ...,
+) -> list[Citation]: ...
+
+
+async def get_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    client: httpx.AsyncClient | None = None,
+) -> list[Citation] | list[Reference] | list[str]:
+    """Get the articles that cite a given article, from OpenCitations.
+
+    :param reference: The reference to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param client: A client from :func:`get_async_client`. If not given, a new
+        connection is opened for the call.
+    :return: A list of citations
+
+    .. seealso:: :func:`opencitations_client.get_incoming_citations_from_api`
+    """
+    reference = handle_input(reference)
+    res = await _get(f"{BASE_V2}/citations/{reference.curie}", token=token, client=client)
+    res.raise_for_status()
+    return _process_citations(res.json(), reference, return_type=return_type, outgoing=False)
+
+
+async def get_articles(
+    references: list[Reference],
+    *,
+    token: str | None = None,
+    max_url_length: int = MAX_URL_LENGTH,
+    client: httpx.AsyncClient | None = None,
+) -> list[Work]:
+    """Get documents by reference.
+
+    :param references: A list of references to articles
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param max_url_length: The maximum length of the URL for a call. If the references
+        don't fit in one call, they're split over several, which are made concurrently.
+    :param client: A client from :func:`get_async_client`. If not given, a new
+        connection is opened for the calls.
+    :return: A list of articles for the references
+
+    .. seealso:: :func:`opencitations_client.get_articles`
+    """
+    _raise_for_invalid_articles(references)
+    async with _ensure_client(client) as ensured_client:
+        batches = await asyncio.gather(
+            *(
+                _get_articles_batch(batch, token=token, client=ensured_client)
+                for batch in _pack_references(references, max_url_length=max_url_length)
+            )
+        )
+    return [work for batch in batches for work in batch]
+
+
+async def _get_articles_batch(
+    references: list[Reference], *, token: str | None, client: httpx.AsyncClient
+) -> list[Work]:
+    res = await _get(f"{META_V1}{_get_articles_part(references)}", token=token, client=client)
+    res.raise_for_status()
+    return [process_work(record) for record in res.json()]
+
+
+async def get_articles_for_author(
+    reference: Reference,
+    *,
+    token: str | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> list[Work]:
+    """Get documents incident to the author.
+
+    :param reference: A reference for an author, using ``orcid`` or ``omid`` as a prefix
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param client: A client from :func:`get_async_client`. If not given, a new
+        connection is opened for the call.
+    :return: A list of articles associated with the author
+
+    .. seealso:: :func:`opencitations_client.get_articles_for_author`
+    """
+    _raise_for_invalid_person(reference)
+    res = await _get(f"{META_V1}/author/{reference.curie}", token=token, client=client)
+    res.raise_for_status()
+    return [process_work(record) for record in res.json()]
+
+
+async def get_articles_for_editor(
+    reference: Reference,
+    *,
+    token: str | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> list[Work]:
+    """Get documents incident to the editor.
+
+    :param reference: A reference for an editor, using ``orcid`` or ``omid`` as a prefix
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param client: A client from :func:`get_async_client`. If not given, a new
+        connection is opened for the call.
+    :return: A list of articles associated with the editor
+
+    .. seealso:: :func:`opencitations_client.get_articles_for_editor`
+    """
+    _raise_for_invalid_person(reference)
+    res = await _get(f"{META_V1}/editor/{reference.curie}", token=token, client=client)
+    res.raise_for_status()
+    return [process_work(record) for record in res.json()]
+
+
+async def _get(
+    url: str, *, token: str | None = None, client: httpx.AsyncClient | None = None
+) -> httpx.Response:
+    token = pystow.get_config("opencitations", "token", passthrough=token, raise_on_missing=True)
+    retry_policy = get_retry_policy()
+    attempt = 0
+    async with _ensure_client(client) as ensured_client:
+        while True:
+            # the rate limit is shared with the synchronous client, and possibly other
+            # processes through a locked file, so the reservation is made in a thread to
+            # not block the event loop
+            wait = await asyncio.to_thread(get_rate_limiter().reserve)
+            await asyncio.sleep(wait + retry_policy.reserve())
+            try:
+                res = await ensured_client.get(url, headers={"authorization": token})
+            except httpx.TransportError:
+                if (delay := retry_policy.get_delay(attempt)) is None:
+                    raise
+            else:
+                delay = retry_policy.get_delay(
+                    attempt, status=res.status_code, retry_after=res.headers.get("Retry-After")
+                )
+                if delay is None:
+                    return res
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+@asynccontextmanager
+async def _ensure_client(client: httpx.AsyncClient | None) -> AsyncIterator[httpx.AsyncClient]:
+    if client is not None:
+        yield client
+    else:
+        async with get_async_client() as new_client:
+            yield new_client
@@ -4,17 +4,38 @@ from typing import Literal, TypeAlias, overload
 
 from curies import Reference
 
-from .cache import get_incoming_citations_from_cache, get_outgoing_citations_from_cache
-from .json_api_client import get_incoming_citations_from_api, get_outgoing_citations_from_api
-from .models import Citation, CitationReturnType
+from .cache import (
+    _get_citations_from_cache_if_available,
+    _get_full_citations_from_cache_if_available,
+    _get_metadata_store,
+    _has_metadata_store,
+    _unique_works,
+    get_articles_from_cache,
+    get_incoming_citations_from_cache,
+    get_outgoing_citations_from_cache,
+)
+from .json_api_client import (
+    MAX_URL_LENGTH,
+    get_articles_many,
+    get_incoming_citations_from_api,
+    get_outgoing_citations_from_api,
+)
+from .json_api_client import get_articles as get_articles_from_api
+from .models import Citation, CitationReturnType, Work, handle_input
+from .response_cache import ensure_response_cache
 
 __all__ = [
     "Backend",
+    "get_articles",
     "get_incoming_citations",
     "get_outgoing_citations",
 ]
 
-Backend: TypeAlias = Literal["api", "local"]
+#: The backend for looking up citations. ``auto`` uses the local graph cache if it's
+#: built and has the reference (and for full citations, the local store of citation
+#: attributes is built too), and otherwise the API, whose responses are then cached on
+#: disk by :mod:`opencitations_client.response_cache`, even if caching isn't enabled
+Backend: TypeAlias = Literal["api", "local", "auto"]
 
 
 # docstr-coverage:excused `overload`
@@ -60,7 +81,8 @@ def get_outgoing_citations(
     """Get the articles that the given article cites, from OpenCitations.
 
     :param reference: The reference to get citations for
-    :param backend: The backend to use (either web-based API or local cache)
+    :param backend: The backend to use (either web-based API, local cache, or ``auto``
+        to use the local cache when it can answer and the API otherwise)
     :param token: The token to use for authentication.
         Loaded via :func:`pystow.get_config` if not given explicitly
     :param return_type: The return type for citations. If using references or strings,
@@ -75,6 +97,8 @@ def get_outgoing_citations(
         return get_outgoing_citations_from_api(reference, token=token, return_type=return_type)
     elif backend == "local":
         return get_outgoing_citations_from_cache(reference, return_type=return_type)
+    elif backend == "auto":
+        return _get_citations_auto(reference, token=token, return_type=return_type, out=True)
     else:
         raise ValueError(f"backend {backend} not supported")
 
@@ -122,7 +146,8 @@ def get_incoming_citations(
     """Get the articles that cite a given article, from OpenCitations.
 
     :param reference: The reference to get citations for
-    :param backend: The backend to use (either web-based API or local cache)
+    :param backend: The backend to use (either web-based API, local cache, or ``auto``
+        to use the local cache when it can answer and the API otherwise)
     :param token: The token to use for authentication.
         Loaded via :func:`pystow.get_config` if not given explicitly
     :param return_type: The return type for citations. If using references or strings,
@@ -137,5 +162,75 @@ def get_incoming_citations(
         return get_incoming_citations_from_api(reference, token=token, return_type=return_type)
     elif backend == "local":
         return get_incoming_citations_from_cache(reference, return_type=return_type)
+    elif backend == "auto":
+        return _get_citations_auto(reference, token=token, return_type=return_type, out=False)
+    else:
+        raise ValueError(f"backend {backend} not supported")
+
+
+def _get_citations_auto(
+    reference: str | Reference,
+    *,
+    token: str | None,
+    return_type: CitationReturnType,
+    out: bool,
+) -> list[Citation] | list[Reference] | list[str]:
+    normalized_reference = handle_input(reference)
+    if return_type == "citation":
+        citations = _get_full_citations_from_cache_if_available(normalized_reference, out=out)
+        if citations is not None:
+            return citations
+    else:
+        identifiers = _get_citations_from_cache_if_available(normalized_reference, out=out)
+        if identifiers is not None:
+            if return_type == "str":
+                return identifiers
+            return [
+                Reference(prefix=normalized_reference.prefix, identifier=identifier)
+                for identifier in identifiers
+            ]
+    # write the results back to a local cache, so the next lookup doesn't call the API
+    with ensure_response_cache():
+        if out:
+            return get_outgoing_citations_from_api(reference, token=token, return_type=return_type)
+        return get_incoming_citations_from_api(reference, token=token, return_type=return_type)
+
+
+def get_articles(
+    references: list[Reference],
+    *,
+    backend: Backend = "api",
+    token: str | None = None,
+    max_url_length: int = MAX_URL_LENGTH,
+) -> list[Work]:
+    """Get documents by reference.
+
+    :param references: A list of references to articles
+    :param backend: The backend to use (either web-based API, local database of the
+        metadata dump, or ``auto`` to use the local database if it's built, and the API
+        for references that aren't in it)
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param max_url_length: The maximum length of the URL for a call to the API. If the
+        references don't fit in one call, they're split over several.
+    :return: A list of articles for the references
+
+    .. seealso::
+
+        - https://api.opencitations.net/meta/v1#/metadata/{ids}
+        - :func:`opencitations_client.cache.get_articles_from_cache`
+    """
+    if backend == "api":
+        return get_articles_from_api(references, token=token, max_url_length=max_url_length)
+    elif backend == "local":
+        return get_articles_from_cache(references)
+    elif backend == "auto":
+        if not _has_metadata_store():
+            return get_articles_from_api(references, token=token, max_url_length=max_url_length)
+        works = _get_metadata_store().get_works(references)
+        missing = [reference for reference, work in works.items() if work is None]
+        if missing:
+            works.update(get_articles_many(missing, token=token, max_url_length=max_url_length))
+        return _unique_works(works.values())
     else:
         raise ValueError(f"backend {backend} not supported")
@@ -1,23 +1,56 @@
 """Database operations."""
 
-from functools import lru_cache
-from typing import Literal, overload
+import json
+import shutil
+from collections import ChainMap
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Any, Literal, TypeAlias, overload
 
+import numpy as np
 from curies import Reference
-from pystow.graph import GraphCache, GraphCachePaths, build_graph_cache
+from pystow.graph import GraphCache, GraphCachePaths, SingleGraphCache, build_graph_cache
 
-from .download import MODULE, iter_doi_citations, iter_omid_citations, iter_pubmed_citations
-from .models import Citation, CitationReturnType, handle_input
+from .citation_store import CitationStore
+from .client import _get_mapping
+from .delta import CitationDelta, DeltaGraphCache
+from .download import (
+    MODULE,
+    _commit_citations,
+    _ensure_citation_store,
+    _has_citation_store,
+    _load_citation_store,
+    _load_metadata_store,
+    _read_manifest,
+    _update_citations,
+    _write_manifest,
+    iter_doi_citations,
+    iter_omid_citations,
+    iter_pubmed_citations,
+)
+from .mapping import OMIDMapping, parse_omid
+from .metadata_store import MetadataStore
+from .models import Citation, CitationReturnType, Work, handle_input
 
 __all__ = [
+    "BatchReturnType",
+    "CitationNeighborhoods",
+    "compact_omid_cache",
+    "get_articles_from_cache",
     "get_incoming_citations_from_cache",
+    "get_incoming_citations_from_cache_batch",
     "get_outgoing_citations_from_cache",
+    "get_outgoing_citations_from_cache_batch",
+    "update_omid_cache",
 ]
 
 pubmed_cache_paths = GraphCachePaths.from_directory(MODULE.join("database-pmid"))
-omid_cache_paths = GraphCachePaths.from_directory(MODULE.join("database-omid"))
+#: The file that points at the directories of the current OMID graph cache and delta layer
+omid_state_path = MODULE.join(name="database-omid.json")
 doi_cache_paths = GraphCachePaths.from_directory(MODULE.join("database-doi"))
 
+#: The local database of the metadata dump, see :mod:`opencitations_client.metadata_store`
 CITATION_DB = MODULE.join(name="metadata.db")
 
 
@@ -25,29 +58,165 @@ CITATION_DB = MODULE.join(name="metadata.db")
 def _get_pubmed_cache() -> GraphCache:
     if not pubmed_cache_paths.exists():
         return build_graph_cache(
-            iter_pubmed_citations, pubmed_cache_paths, estimated_edges=191_000_000
+            partial(iter_pubmed_citations, edge_format="bin"),
+            pubmed_cache_paths,
+            estimated_edges=191_000_000,
         )
     # takes about 9 seconds to warm up
     return GraphCache(pubmed_cache_paths)
 
 
 @lru_cache(1)
-def _get_omid_cache() -> GraphCache:
-    if not omid_cache_paths.exists():
-        return build_graph_cache(
-            iter_omid_citations, omid_cache_paths, estimated_edges=1_191_000_000
-        )
-    return GraphCache(omid_cache_paths)
+def _get_omid_cache() -> GraphCache | DeltaGraphCache:
+    state = _read_omid_state()
+    paths = _get_omid_cache_paths(state)
+    if not paths.exists():
+        return _build_omid_cache(paths)
+    cache = GraphCache(paths)
+    delta = _load_omid_delta(state)
+    if delta:
+        return DeltaGraphCache(cache, delta)
+    return cache
+
+
+def _build_omid_cache(paths: GraphCachePaths) -> GraphCache:
+    return build_graph_cache(
+        partial(iter_omid_citations, edge_format="bin"),
+        paths,
+        estimated_edges=1_191_000_000,
+    )
+
+
+def _read_omid_state() -> dict[str, Any]:
+    """Read the names of the directories of the current OMID graph cache and delta layer.
+
+    Updates and compactions write into new directories, and then switch to them by
+    atomically replacing this state, so an interruption never leaves a graph cache that
+    is partially rebuilt, or a delta layer that doesn't match it.
+    """
+    if not omid_state_path.is_file():
+        return {"version": 0, "cache": "database-omid", "delta": "database-omid-delta"}
+    rv: dict[str, Any] = json.loads(omid_state_path.read_text())
+    return rv
+
+
+def _switch_omid_state(state: dict[str, Any]) -> None:
+    """Atomically switch to a new OMID graph cache or delta layer, then delete the old ones.
+
+    Only the directories of the previous state are deleted, since other ones might be
+    being built by another process.
+    """
+    previous_state = _read_omid_state()
+    temporary_path = omid_state_path.with_name(f"{omid_state_path.name}.tmp")
+    temporary_path.write_text(json.dumps(state, indent=2))
+    temporary_path.replace(omid_state_path)
+    _get_omid_cache.cache_clear()
+    for name in (previous_state["cache"], previous_state["delta"]):
+        if not name or name in {state["cache"], state["delta"]}:
+            continue
+        if (path := omid_state_path.parent.joinpath(name)).is_dir():
+            shutil.rmtree(path)
+
+
+def _get_omid_cache_paths(state: dict[str, Any] | None = None) -> GraphCachePaths:
+    if state is None:
+        state = _read_omid_state()
+    return GraphCachePaths.from_directory(MODULE.join(state["cache"]))
+
+
+def _load_omid_delta(state: dict[str, Any]) -> CitationDelta:
+    if not state["delta"]:
+        return CitationDelta()
+    return CitationDelta.load(MODULE.join(name=state["delta"]))
+
+
+def _recover_omid_cache() -> dict[str, Any]:
+    """Get the OMID state, after finishing an update that was interrupted.
+
+    The manifest of the updated edge list is saved with the delta layer, and committed
+    after switching to it. If that didn't happen, committing it again brings the edge
+    list in line with the delta layer.
+    """
+    state = _read_omid_state()
+    if state["delta"] and (manifest := _read_manifest(MODULE.join(name=state["delta"]))):
+        _commit_citations("omid", manifest)
+    return state
+
+
+def update_omid_cache(
+    *, workers: int | None = None, compaction_threshold: float = 0.05
+) -> CitationDelta:
+    """Update the OMID citation cache to the current OpenCitations Index release.
+
+    Rather than rebuilding the cache over all citations, only the citation archives that
+    changed since the last update are processed. The edges that were added and removed
+    are stored in a delta layer that lookups consult on top of the cache. Once the
+    delta grows beyond a fraction of the cache's edges, the cache is rebuilt from the
+    (already updated) binary edge list and the delta is cleared. If the attributes of
+    citations were stored for returning full citations from the cache, they're updated
+    the same way.
+
+    :param workers: The number of processes for reading new or changed archives
+    :param compaction_threshold: The size of the delta, as a fraction of the number of
+        edges in the cache, above which the cache gets compacted
+    :return: The delta between the cache and the current release, which is empty if
+        the cache was built or compacted
+    """
+    if _has_citation_store():
+        _ensure_citation_store(update=True, workers=workers)
+        _get_citation_store.cache_clear()
+
+    state = _recover_omid_cache()
+    paths = _get_omid_cache_paths(state)
+    if not paths.exists():
+        _build_omid_cache(paths)
+        _get_omid_cache.cache_clear()
+        return CitationDelta()
+
+    added, removed, manifest = _update_citations("omid", workers=workers)
+    delta = _load_omid_delta(state).update(added=added, removed=removed)
+    # the new delta and the manifest of the edge list it reflects are saved to a new
+    # directory, which becomes current all at once, before the manifest is committed
+    version = state["version"] + 1
+    delta_directory = MODULE.join(name=f"database-omid-delta.v{version}")
+    if delta_directory.exists():
+        shutil.rmtree(delta_directory)
+    delta.save(delta_directory)
+    _write_manifest(delta_directory, manifest)
+    _switch_omid_state({**state, "version": version, "delta": delta_directory.name})
+    _commit_citations("omid", manifest)
+
+    if len(delta) > compaction_threshold * len(GraphCache(paths).forward.indices):
+        compact_omid_cache()
+        return CitationDelta()
+    return delta
+
+
+def compact_omid_cache() -> None:
+    """Rebuild the OMID citation cache from the binary edge list and clear its delta."""
+    state = _recover_omid_cache()
+    version = state["version"] + 1
+    directory = MODULE.join(name=f"database-omid.v{version}")
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir()
+    _build_omid_cache(GraphCachePaths.from_directory(directory))
+    # only switch to the new cache once it's completely built
+    _switch_omid_state({"version": version, "cache": directory.name, "delta": None})
 
 
 @lru_cache(1)
 def _get_doi_cache() -> GraphCache:
     if not doi_cache_paths.exists():
-        return build_graph_cache(iter_doi_citations, doi_cache_paths, estimated_edges=1_191_000_000)
+        return build_graph_cache(
+            partial(iter_doi_citations, edge_format="bin"),
+            doi_cache_paths,
+            estimated_edges=1_191_000_000,
+        )
     return GraphCache(doi_cache_paths)
 
 
-def _get_cache(prefix: str) -> GraphCache:
+def _get_cache(prefix: str) -> GraphCache | DeltaGraphCache:
     match prefix:
         case "pmid" | "pubmed":
             return _get_pubmed_cache()
@@ -59,6 +228,85 @@ def _get_cache(prefix: str) -> GraphCache:
             raise NotImplementedError(f"citation lookup not implemented for prefix: {prefix}")
 
 
+@lru_cache(1)
+def _get_citation_store() -> CitationStore:
+    return _load_citation_store()
+
+
+def _get_full_citations(reference: Reference, *, out: bool) -> list[Citation]:
+    """Get citations with their attributes from the citation store.
+
+    :param reference: A reference that was processed by :func:`handle_input`
+    :param out: Should outgoing citations be returned? If false, returns incoming citations
+    :return: A list of citations. The citing and cited articles have their OMIDs and,
+        if the reference uses an external identifier, their identifiers with its prefix.
+    """
+    if reference.prefix == "omid":
+        omid: str | None = reference.identifier
+        mappings: dict[str, OMIDMapping] | None = None
+    else:
+        mapping = _get_mapping(reference.prefix)
+        omid = mapping.get_omid(reference.identifier)
+        mappings = {reference.prefix: mapping}
+    if omid is None:
+        return []
+    try:
+        omid_value = parse_omid(omid)
+    except ValueError:
+        return []
+    store = _get_citation_store()
+    columns = store.get_outgoing(omid_value) if out else store.get_incoming(omid_value)
+    return store.to_citations(columns, mappings=mappings)
+
+
+def _get_full_citations_from_cache_if_available(
+    reference: Reference, *, out: bool
+) -> list[Citation] | None:
+    """Get citations with their attributes, or none if they aren't known locally.
+
+    This is only the case if the citation store was already built, and the graph cache
+    for the reference's prefix is built and has the node (see
+    :func:`_get_citations_from_cache_if_available`).
+    """
+    if not _has_citation_store():
+        return None
+    if _get_citations_from_cache_if_available(reference, out=out) is None:
+        return None
+    return _get_full_citations(reference, out=out)
+
+
+def _has_cache(prefix: str) -> bool:
+    """Check if the graph cache for the prefix has been built, without building it."""
+    match prefix:
+        case "pmid" | "pubmed":
+            return pubmed_cache_paths.exists()
+        case "omid":
+            return _get_omid_cache_paths().exists()
+        case "doi":
+            return doi_cache_paths.exists()
+        case _:
+            return False
+
+
+def _get_citations_from_cache_if_available(reference: Reference, *, out: bool) -> list[str] | None:
+    """Get citations from the graph cache, or none if it isn't built or misses the node.
+
+    :param reference: A reference that was processed by :func:`handle_input`
+    :param out: Should outgoing citations be returned? If false, returns incoming citations
+    :return: A list of local unique identifiers, or none if the answer isn't known locally,
+        e.g., if the reference is for an article that's newer than the dump
+    """
+    if not _has_cache(reference.prefix):
+        return None
+    cache = _get_cache(reference.prefix)
+    try:
+        if out:
+            return cache.out_edges(reference.identifier, raise_on_missing=True)
+        return cache.in_edges(reference.identifier, raise_on_missing=True)
+    except KeyError:
+        return None
+
+
 # docstr-coverage:excused `overload`
 @overload
 def get_outgoing_citations_from_cache(
@@ -83,10 +331,14 @@ def get_outgoing_citations_from_cache(
 def get_outgoing_citations_from_cache(
     reference: str | Reference, *, return_type: CitationReturnType = "reference"
 ) -> list[Citation] | list[Reference] | list[str]:
-    """Get outgoing citations as a list of local unique identifiers."""
-    if return_type == "citation":
-        raise NotImplementedError("cache-based citation lookup can't return full citation yet")
+    """Get outgoing citations as a list of local unique identifiers.
+
+    Full citations (with ``return_type="citation"``) are looked up in a store of
+    citation attributes, which is built from the citation dump the first time.
+    """
     reference = handle_input(reference)
+    if return_type == "citation":
+        return _get_full_citations(reference, out=True)
     identifiers = _get_cache(reference.prefix).out_edges(reference.identifier)
     if return_type == "str":
         return identifiers
@@ -117,11 +369,296 @@ def get_incoming_citations_from_cache(
 def get_incoming_citations_from_cache(
     reference: str | Reference, *, return_type: CitationReturnType = "reference"
 ) -> list[Citation] | list[Reference] | list[str]:
-    """Get incoming citations as a list of local unique identifiers."""
-    if return_type == "citation":
-        raise NotImplementedError("cache-based citation lookup can't return full citation yet")
+    """Get incoming citations as a list of local unique identifiers.
+
+    Full citations (with ``return_type="citation"``) are looked up in a store of
+    citation attributes, which is built from the citation dump the first time.
+    """
     reference = handle_input(reference)
+    if return_type == "citation":
+        return _get_full_citations(reference, out=False)
     identifiers = _get_cache(reference.prefix).in_edges(reference.identifier)
     if return_type == "str":
         return identifiers
     return [Reference(prefix=reference.prefix, identifier=identifier) for identifier in identifiers]
+
+
+@lru_cache(1)
+def _get_metadata_store() -> MetadataStore:
+    return _load_metadata_store(CITATION_DB)
+
+
+def _has_metadata_store() -> bool:
+    """Check if the local metadata database has been built, without building it."""
+    return CITATION_DB.is_file()
+
+
+def get_articles_from_cache(references: Iterable[Reference]) -> list[Work]:
+    """Get documents by reference, from a local database of the metadata dump.
+
+    The first time this is called, the database is built from the metadata dump, which
+    takes a while. Afterwards, lookups are indexed queries.
+
+    :param references: References to articles, using OMIDs or any external identifier
+        in the metadata dump, like ``doi``, ``pmid``, or ``openalex``
+    :return: A list of articles for the references, in the order of the references.
+        References that aren't in the dump are skipped, and each article is only
+        returned once, even if several references point to it.
+    """
+    return _unique_works(_get_metadata_store().get_works(references).values())
+
+
+def _unique_works(works: Iterable[Work | None]) -> list[Work]:
+    return list({work.omid: work for work in works if work is not None}.values())
+
+
+#: The return type for batch lookups, where ``csr`` gives a :class:`CitationNeighborhoods`
+BatchReturnType: TypeAlias = Literal["csr", "reference", "str"]
+
+
+@dataclass
+class CitationNeighborhoods:
+    """The citations for many nodes, in compressed sparse row (CSR) format.
+
+    The neighbors of the node at position ``i`` in :attr:`nodes` are
+    ``neighbors[offsets[i]:offsets[i + 1]]``, which are node indices in the graph
+    cache. They can be converted to local unique identifiers with :attr:`id_to_node`.
+    """
+
+    #: The local unique identifiers that were looked up
+    nodes: Sequence[str]
+    #: An array of shape ``(len(nodes) + 1,)`` with the start of each node's neighbors
+    offsets: np.ndarray
+    #: An array with the node indices of the neighbors of all nodes, concatenated
+    neighbors: np.ndarray
+    #: A mapping from node indices to local unique identifiers
+    id_to_node: Mapping[int, str]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __getitem__(self, position: int) -> list[str]:
+        """Get the local unique identifiers for the neighbors of the node at a position."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return [self.id_to_node[i] for i in self.neighbors[start:end].tolist()]
+
+    def to_dict(self) -> dict[str, list[str]]:
+        """Get a dictionary from each node to the local unique identifiers of its neighbors."""
+        # only look up the identifier for each distinct neighbor once
+        unique, inverse = np.unique(self.neighbors, return_inverse=True)
+        labels = np.array([self.id_to_node[i] for i in unique.tolist()], dtype=object)
+        return {
+            node: labels[inverse[start:end]].tolist()
+            for node, start, end in zip(
+                self.nodes, self.offsets[:-1].tolist(), self.offsets[1:].tolist(), strict=True
+            )
+        }
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["csr"] = ...,
+) -> CitationNeighborhoods: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> dict[Reference, list[Reference]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> dict[str, list[str]]: ...
+
+
+def get_outgoing_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = None,
+    return_type: BatchReturnType = "reference",
+) -> CitationNeighborhoods | dict[Reference, list[Reference]] | dict[str, list[str]]:
+    """Get outgoing citations for many references at once.
+
+    :param references: References or CURIEs, which all have to have the same prefix. If
+        a prefix is given explicitly, strings are instead interpreted as local unique
+        identifiers, which skips parsing them.
+    :param prefix: The prefix for all references
+    :param return_type: The return type. If ``csr``, gives arrays of node indices in the
+        graph cache, which avoids constructing a string or reference for each citation.
+    :return: Outgoing citations for each reference
+    """
+    return _get_citations_batch(references, prefix=prefix, return_type=return_type, out=True)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["csr"] = ...,
+) -> CitationNeighborhoods: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> dict[Reference, list[Reference]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> dict[str, list[str]]: ...
+
+
+def get_incoming_citations_from_cache_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = None,
+    return_type: BatchReturnType = "reference",
+) -> CitationNeighborhoods | dict[Reference, list[Reference]] | dict[str, list[str]]:
+    """Get incoming citations for many references at once.
+
+    :param references: References or CURIEs, which all have to have the same prefix. If
+        a prefix is given explicitly, strings are instead interpreted as local unique
+        identifiers, which skips parsing them.
+    :param prefix: The prefix for all references
+    :param return_type: The return type. If ``csr``, gives arrays of node indices in the
+        graph cache, which avoids constructing a string or reference for each citation.
+    :return: Incoming citations for each reference
+    """
+    return _get_citations_batch(references, prefix=prefix, return_type=return_type, out=False)
+
+
+def _get_citations_batch(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None,
+    return_type: BatchReturnType,
+    out: bool,
+) -> CitationNeighborhoods | dict[Reference, list[Reference]] | dict[str, list[str]]:
+    prefix, identifiers = _handle_batch_input(references, prefix=prefix)
+    neighborhoods = _get_neighborhoods(_get_cache(prefix), identifiers, out=out)
+    if return_type == "csr":
+        return neighborhoods
+    rv = neighborhoods.to_dict()
+    if return_type == "str":
+        return rv
+    return {
+        Reference(prefix=prefix, identifier=node): [
+            Reference(prefix=prefix, identifier=neighbor) for neighbor in neighbors
+        ]
+        for node, neighbors in rv.items()
+    }
+
+
+def _handle_batch_input(
+    references: Iterable[str | Reference], *, prefix: str | None
+) -> tuple[str, list[str]]:
+    if prefix is not None:
+        return prefix, [
+            reference if isinstance(reference, str) else reference.identifier
+            for reference in references
+        ]
+    parsed = [handle_input(reference) for reference in references]
+    prefixes = {reference.prefix for reference in parsed}
+    if len(prefixes) != 1:
+        raise ValueError(f"batch lookup needs references with exactly one prefix: {prefixes}")
+    return prefixes.pop(), [reference.identifier for reference in parsed]
+
+
+def _get_neighborhoods(
+    cache: GraphCache | DeltaGraphCache, nodes: list[str], *, out: bool
+) -> CitationNeighborhoods:
+    base = cache.base if isinstance(cache, DeltaGraphCache) else cache
+    single: SingleGraphCache = base.forward if out else base.reverse
+    node_ids = np.fromiter(
+        (single.node_to_id.get(node, -1) for node in nodes), dtype=np.int64, count=len(nodes)
+    )
+    offsets, neighbors = _gather_csr(single.indices_pointers, single.indices, node_ids)
+    rv = CitationNeighborhoods(
+        nodes=nodes, offsets=offsets, neighbors=neighbors, id_to_node=single.id_to_node
+    )
+    if isinstance(cache, DeltaGraphCache):
+        rv = _apply_delta(rv, cache, single, out=out)
+    return rv
+
+
+def _gather_csr(
+    indices_pointers: np.ndarray, indices: np.ndarray, node_ids: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Gather the neighbors of nodes from a CSR graph, where missing nodes are ``-1``."""
+    found = node_ids >= 0
+    safe_ids = np.where(found, node_ids, 0)
+    starts = np.where(found, indices_pointers[safe_ids], 0)
+    lengths = np.where(found, indices_pointers[safe_ids + 1] - starts, 0)
+    offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    # the position in the indices of each neighbor, for all nodes at once
+    positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+    return offsets, np.asarray(indices[positions], dtype=np.int64)
+
+
+def _apply_delta(
+    neighborhoods: CitationNeighborhoods,
+    cache: DeltaGraphCache,
+    single: SingleGraphCache,
+    *,
+    out: bool,
+) -> CitationNeighborhoods:
+    """Replace the neighbors of the nodes that are changed by the delta."""
+    added = cache.delta.added_out if out else cache.delta.added_in
+    removed = cache.delta.removed_out if out else cache.delta.removed_in
+    ids = cache.parse_nodes(neighborhoods.nodes)
+    changed = np.flatnonzero(added.count(ids) + removed.count(ids)).tolist()
+    if not changed:
+        return neighborhoods
+
+    # nodes that are only in the delta get indices after the ones in the graph cache
+    extra_node_to_id: dict[str, int] = {}
+    extra_id_to_node: dict[int, str] = {}
+
+    def _get_id(node: str) -> int:
+        if (node_id := single.node_to_id.get(node)) is not None:
+            return node_id
+        if node not in extra_node_to_id:
+            extra_node_to_id[node] = len(single.node_to_id) + len(extra_node_to_id)
+            extra_id_to_node[extra_node_to_id[node]] = node
+        return extra_node_to_id[node]
+
+    rows = np.split(neighborhoods.neighbors, neighborhoods.offsets[1:-1])
+    for position in changed:
+        node = neighborhoods.nodes[position]
+        edges = cache.out_edges(node) if out else cache.in_edges(node)
+        rows[position] = np.array([_get_id(edge) for edge in edges], dtype=np.int64)
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=offsets[1:])
+    return CitationNeighborhoods(
+        nodes=neighborhoods.nodes,
+        offsets=offsets,
+        neighbors=np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+        id_to_node=ChainMap(extra_id_to_node, single.id_to_node),
+    )
@@ -0,0 +1,173 @@
+"""A local store for the attributes of citations, for returning full citations offline.
+
+The graph caches only know which articles cite which. The attributes of each citation
+(its creation date, timespan, and whether it's a journal or author self-citation) are
+stored separately, as columns of arrays in one binary file per citation archive. Each
+file holds the following columns back to back, each of the same length:
+
+1. ``citing``, the integer OMIDs of the citing articles, sorted (see
+   :func:`opencitations_client.mapping.parse_omid`)
+2. ``cited``, the integer OMIDs of the cited articles, sorted within each citing article
+3. ``cited_sorted``, the ``cited`` column, sorted
+4. ``cited_order``, the positions that sort the ``cited`` column
+5. ``creation``, the creation date as days since 1970-01-01
+6. ``timespan``, the timespan in days, counting years as 365 days and months as 30 days
+   as the API does
+7. ``journal_sc`` and ``author_sc``, which are 1 for self-citations, 0 if not, and -1
+   if unknown
+
+Outgoing citations are found with a binary search on the ``citing`` column of each
+file, and incoming citations on the ``cited_sorted`` column, using memory-mapping so
+only the pages that are needed are read from disk.
+"""
+
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from curies import Reference
+
+from .mapping import OMIDMapping, format_omid
+from .models import Citation
+
+__all__ = [
+    "CitationStore",
+]
+
+#: The columns in each file, in order, with their data types
+COLUMNS: list[tuple[str, type[np.generic]]] = [
+    ("citing", np.int64),
+    ("cited", np.int64),
+    ("cited_sorted", np.int64),
+    ("cited_order", np.int64),
+    ("creation", np.int32),
+    ("timespan", np.int32),
+    ("journal_sc", np.int8),
+    ("author_sc", np.int8),
+]
+#: The value for creation dates and timespans that are missing or couldn't be parsed
+MISSING = np.iinfo(np.int32).min
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def write_columns(path: Path, columns: dict[str, np.ndarray]) -> None:
+    """Write the columns of citation attributes to a binary file, in order."""
+    with path.open("wb") as file:
+        for name, dtype in COLUMNS:
+            np.ascontiguousarray(columns[name], dtype=dtype).tofile(file)
+
+
+def read_columns(path: Path, length: int) -> dict[str, np.ndarray]:
+    """Memory-map the columns of citation attributes from a binary file."""
+    rv: dict[str, np.ndarray] = {}
+    offset = 0
+    for name, dtype in COLUMNS:
+        if length:
+            rv[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(length,))
+        else:
+            # numpy can't memory-map an empty part of a file
+            rv[name] = np.empty(0, dtype=dtype)
+        offset += length * np.dtype(dtype).itemsize
+    return rv
+
+
+def sort_columns(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Sort parsed citation attributes by citing then cited article, and index them."""
+    order = np.lexsort((columns["cited"], columns["citing"]))
+    rv = {name: values[order] for name, values in columns.items()}
+    rv["cited_order"] = np.argsort(rv["cited"], kind="stable")
+    rv["cited_sorted"] = rv["cited"][rv["cited_order"]]
+    return rv
+
+
+class CitationStore:
+    """Random access to citation attributes, from the files built from the citation dump."""
+
+    def __init__(self, directory: str | Path, manifest: dict[str, Any]) -> None:
+        """Construct a citation store.
+
+        :param directory: The directory containing the files
+        :param manifest: The manifest describing the files in the directory, where each
+            shard has a ``name`` and a number of ``edges``
+        """
+        directory = Path(directory)
+        self.shards = [
+            read_columns(directory.joinpath(shard["name"]), shard["edges"])
+            for shard in manifest["shards"]
+            if shard["edges"]
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(shard["citing"]) for shard in self.shards)
+
+    def get_outgoing(self, citing: int) -> dict[str, np.ndarray]:
+        """Get the attributes of citations from an article, given its integer OMID."""
+        parts = []
+        for shard in self.shards:
+            start, end = np.searchsorted(shard["citing"], [citing, citing + 1])
+            if start < end:
+                parts.append({name: values[start:end] for name, values in shard.items()})
+        return _concatenate(parts)
+
+    def get_incoming(self, cited: int) -> dict[str, np.ndarray]:
+        """Get the attributes of citations to an article, given its integer OMID."""
+        parts = []
+        for shard in self.shards:
+            start, end = np.searchsorted(shard["cited_sorted"], [cited, cited + 1])
+            if start < end:
+                # keep the rows in the order of the file, for locality
+                positions = np.sort(shard["cited_order"][start:end])
+                parts.append({name: values[positions] for name, values in shard.items()})
+        return _concatenate(parts)
+
+    @staticmethod
+    def to_citations(
+        columns: dict[str, np.ndarray], *, mappings: dict[str, OMIDMapping] | None = None
+    ) -> list[Citation]:
+        """Convert the attributes of citations into citation objects.
+
+        :param columns: Attributes of citations from :meth:`get_outgoing` or
+            :meth:`get_incoming`
+        :param mappings: A dictionary from prefixes to mappings. If given, adds the
+            external identifiers from these mappings to the citing and cited articles,
+            in addition to their OMIDs
+        :return: A list of citations
+        """
+        return [
+            Citation(
+                reference=Reference(prefix="oci", identifier=f"0{citing}-0{cited}"),
+                citing=_get_references(citing, mappings),
+                cited=_get_references(cited, mappings),
+                creation=None if creation == MISSING else EPOCH + datetime.timedelta(creation),
+                timespan=None if timespan == MISSING else datetime.timedelta(timespan),
+                journal_self_citation=None if journal_sc < 0 else bool(journal_sc),
+                author_self_citation=None if author_sc < 0 else bool(author_sc),
+            )
+            for citing, cited, creation, timespan, journal_sc, author_sc in zip(
+                columns["citing"].tolist(),
+                columns["cited"].tolist(),
+                columns["creation"].tolist(),
+                columns["timespan"].tolist(),
+                columns["journal_sc"].tolist(),
+                columns["author_sc"].tolist(),
+                strict=True,
+            )
+        ]
+
+
+def _get_references(omid_value: int, mappings: dict[str, OMIDMapping] | None) -> list[Reference]:
+    omid = format_omid(omid_value)
+    rv = [Reference(prefix="omid", identifier=omid)]
+    for prefix, mapping in (mappings or {}).items():
+        if (external := mapping.get_external(omid)) is not None:
+            rv.append(Reference(prefix=prefix, identifier=external))
+    return rv
+
+
+def _concatenate(parts: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    if not parts:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+    return {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
@@ -8,9 +8,28 @@ __all__ = [
 
 
 @click.command()
-def main() -> None:
+@click.option(
+    "--workers",
+    type=int,
+    help="The number of processes to use for preprocessing the citation archives",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Incrementally update the OMID citation cache to the current release",
+)
+def main(workers: int | None, update: bool) -> None:
     """Prepare local caches."""
-    from .cache import _get_doi_cache, _get_omid_cache, _get_pubmed_cache
+    from .cache import _get_doi_cache, _get_omid_cache, _get_pubmed_cache, update_omid_cache
+    from .download import _ensure_citations
+
+    if update:
+        delta = update_omid_cache(workers=workers)
+        click.echo(f"{len(delta.added):,} citations added, {len(delta.removed):,} removed")
+        return
+
+    for prefix in ("omid", "pmid", "doi"):
+        _ensure_citations(prefix, workers=workers, edge_format="bin")
 
     _get_omid_cache()
     _get_pubmed_cache()
@@ -1,8 +1,10 @@
 """Access to OpenCitations."""
 
+from collections.abc import Mapping
 from functools import lru_cache
 
-from .download import _get_omid_to_external
+from .download import _get_omid_mapping
+from .mapping import OMIDMapping
 
 __all__ = [
     "get_doi_from_omid",
@@ -16,47 +18,46 @@ __all__ = [
 ]
 
 
+@lru_cache
+def _get_mapping(prefix: str, *, force_process: bool = False) -> OMIDMapping:
+    return _get_omid_mapping(prefix, force_process=force_process)
+
+
 def get_doi_from_omid(omid: str) -> str | None:
     """Get a DOI for the given OMID."""
-    return get_omid_to_doi().get(omid)
+    return _get_mapping("doi").get_external(omid)
 
 
 def get_omid_from_doi(doi: str) -> str | None:
     """Get an OMID for the given DOI."""
-    return get_doi_to_omid().get(doi)
+    return _get_mapping("doi").get_omid(doi)
 
 
-@lru_cache(1)
-def get_doi_to_omid(*, force_process: bool = False) -> dict[str, str]:
+def get_doi_to_omid(*, force_process: bool = False) -> Mapping[str, str]:
     """Get a mapping from DOIs to OMIDs."""
-    return {doi: omid for omid, doi in get_omid_to_doi(force_process=force_process).items()}
+    return _get_mapping("doi", force_process=force_process).backward
 
 
-@lru_cache(1)
-def get_omid_to_doi(*, force_process: bool = False) -> dict[str, str]:
+def get_omid_to_doi(*, force_process: bool = False) -> Mapping[str, str]:
     """Get OMID to DOI dictionary."""
-    return _get_omid_to_external("pmid", force_process=force_process)
+    return _get_mapping("doi", force_process=force_process).forward
 
 
 def get_pubmed_from_omid(omid: str) -> str | None:
     """Get a PubMed ID for the given OMID."""
-    return get_omid_to_pubmed().get(omid)
+    return _get_mapping("pmid").get_external(omid)
 
 
 def get_omid_from_pubmed(pubmed: str | int) -> str | None:
     """Get an OMID for the given PubMed ID."""
-    return get_pubmed_to_omid().get(str(pubmed))
+    return _get_mapping("pmid").get_omid(str(pubmed))
 
 
-@lru_cache(1)
-def get_pubmed_to_omid(*, force_process: bool = False) -> dict[str, str]:
+def get_pubmed_to_omid(*, force_process: bool = False) -> Mapping[str, str]:
     """Get a mapping from PubMed identifiers to OMIDs."""
-    return {
-        pubmed: omid for omid, pubmed in get_omid_to_pubmed(force_process=force_process).items()
-    }
+    return _get_mapping("pmid", force_process=force_process).backward
 
 
-@lru_cache(1)
-def get_omid_to_pubmed(*, force_process: bool = False) -> dict[str, str]:
+def get_omid_to_pubmed(*, force_process: bool = False) -> Mapping[str, str]:
     """Get a mapping from OMIDs to PubMed identifiers."""
-    return _get_omid_to_external("pmid", force_process=force_process)
+    return _get_mapping("pmid", force_process=force_process).forward
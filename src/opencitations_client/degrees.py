@@ -0,0 +1,182 @@
+"""Citation counts for all nodes of the local citation graph.
+
+The number of citations of a node is the length of its row in the CSR index of the
+graph cache, so counts can be read for many nodes at once without listing their
+citations. The counts for all nodes are computed once and saved next to the files of
+the graph cache, as ``in_degrees.bin`` and ``out_degrees.bin``. They're computed again
+if the graph cache is rebuilt, e.g., when it's compacted by
+:func:`opencitations_client.cache.update_omid_cache`, and the delta layer is applied
+on top of them.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Literal, overload
+
+import numpy as np
+from curies import Reference
+from pystow.graph import GraphCache, SingleGraphCache
+
+from .cache import _get_cache, _handle_batch_input
+from .delta import DeltaGraphCache
+from .traversal import Direction, NodeReturnType
+
+__all__ = [
+    "get_citation_counts",
+    "get_most_cited",
+]
+
+
+def _get_degrees(single: SingleGraphCache, *, out: bool) -> np.ndarray:
+    """Get the degree of each node in a graph cache, computing and saving them if needed."""
+    indices_pointers_path = Path(single.indices_pointers.filename)  # type:ignore[arg-type]
+    path = indices_pointers_path.with_name(f"{'out' if out else 'in'}_degrees.bin")
+    if not path.is_file() or path.stat().st_mtime < indices_pointers_path.stat().st_mtime:
+        temporary_path = path.with_name(f"{path.stem}.partial.bin")
+        np.diff(single.indices_pointers).astype(np.int32).tofile(temporary_path)
+        temporary_path.replace(path)
+    if not path.stat().st_size:
+        # numpy can't memory-map an empty file
+        return np.empty(0, dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode="r")
+
+
+def _get_counts(cache: GraphCache | DeltaGraphCache, nodes: list[str], *, out: bool) -> np.ndarray:
+    base = cache.base if isinstance(cache, DeltaGraphCache) else cache
+    single = base.forward if out else base.reverse
+    node_ids = np.fromiter(
+        (single.node_to_id.get(node, -1) for node in nodes), dtype=np.int64, count=len(nodes)
+    )
+    degrees = _get_degrees(single, out=out)
+    rv = np.where(node_ids >= 0, degrees[np.maximum(node_ids, 0)], -1).astype(np.int64)
+    if isinstance(cache, DeltaGraphCache) and cache.delta:
+        delta = cache.delta
+        ids = cache.parse_nodes(nodes)
+        added, removed = (
+            (delta.added_out, delta.removed_out) if out else (delta.added_in, delta.removed_in)
+        )
+        change = added.count(ids) - removed.count(ids)
+        # nodes that are only in the delta are in the graph, even without a change
+        changed = (change != 0) | (delta.added_out.count(ids) + delta.added_in.count(ids) > 0)
+        rv[changed] = np.maximum(rv[changed], 0) + change[changed]
+    return rv
+
+
+def get_citation_counts(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = None,
+    direction: Direction = "in",
+) -> np.ndarray:
+    """Count the citations of many references at once, from the local citation graph.
+
+    :param references: References or CURIEs, which all have to have the same prefix. If
+        a prefix is given explicitly, strings are instead interpreted as local unique
+        identifiers, which skips parsing them.
+    :param prefix: The prefix for all references
+    :param direction: ``in`` counts the articles that cite each reference, ``out`` the
+        articles that each reference cites, and ``both`` their sum
+    :return: An array with the number of citations of each reference, in order, which
+        is -1 for references that aren't in the graph
+    """
+    prefix, identifiers = _handle_batch_input(references, prefix=prefix)
+    cache = _get_cache(prefix)
+    if direction != "both":
+        return _get_counts(cache, identifiers, out=direction == "out")
+    incoming = _get_counts(cache, identifiers, out=False)
+    outgoing = _get_counts(cache, identifiers, out=True)
+    return np.where(incoming >= 0, incoming + outgoing, -1)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_most_cited(
+    prefix: str,
+    *,
+    k: int = ...,
+    direction: Direction = ...,
+    return_type: Literal["reference"] = ...,
+) -> dict[Reference, int]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_most_cited(
+    prefix: str,
+    *,
+    k: int = ...,
+    direction: Direction = ...,
+    return_type: Literal["str"] = ...,
+) -> dict[str, int]: ...
+
+
+def get_most_cited(
+    prefix: str,
+    *,
+    k: int = 10,
+    direction: Direction = "in",
+    return_type: NodeReturnType = "reference",
+) -> dict[Reference, int] | dict[str, int]:
+    """Get the most cited articles in the local citation graph.
+
+    :param prefix: The prefix of the graph, e.g., ``omid`` or ``pubmed``
+    :param k: The number of articles to get
+    :param direction: ``in`` ranks articles by how many articles cite them, ``out`` by
+        how many articles they cite, and ``both`` by the sum
+    :param return_type: The return type for articles
+    :return: A dictionary from the ``k`` articles with the most citations to their
+        number of citations, from most to least. Ties are broken by the order of
+        articles in the graph cache.
+    """
+    cache = _get_cache(prefix)
+    base = cache.base if isinstance(cache, DeltaGraphCache) else cache
+    degrees = _get_all_degrees(base, direction=direction)
+    changed: dict[str, int] = {}
+    if isinstance(cache, DeltaGraphCache) and cache.delta:
+        # the delta changes the counts of its nodes, so they're ranked separately
+        nodes = cache.format_nodes(cache.delta.get_nodes())
+        counts = get_citation_counts(nodes, prefix=prefix, direction=direction)
+        changed = dict(zip(nodes, counts.tolist(), strict=True))
+    # the top k nodes that the delta doesn't change are among the top k + len(changed)
+    candidates = _get_top(degrees, k + len(changed))
+    ranked = [
+        (node, count)
+        for node, count in zip(
+            (base.forward.id_to_node[i] for i in candidates.tolist()),
+            degrees[candidates].tolist(),
+            strict=True,
+        )
+        if node not in changed
+    ]
+    if changed:
+        ranked.extend((node, count) for node, count in changed.items() if count >= 0)
+        size = len(base.forward.node_to_id)
+        ranked.sort(key=lambda item: (-item[1], base.forward.node_to_id.get(item[0], size)))
+    rv = dict(ranked[:k])
+    if return_type == "str":
+        return rv
+    return {Reference(prefix=prefix, identifier=node): count for node, count in rv.items()}
+
+
+def _get_all_degrees(cache: GraphCache, *, direction: Direction) -> np.ndarray:
+    if direction == "in":
+        return _get_degrees(cache.reverse, out=False)
+    if direction == "out":
+        return _get_degrees(cache.forward, out=True)
+    rv: np.ndarray = _get_degrees(cache.reverse, out=False) + _get_degrees(cache.forward, out=True)
+    return rv
+
+
+def _get_top(values: np.ndarray, k: int) -> np.ndarray:
+    """Get the positions of the k largest values, by decreasing value then position."""
+    if k < len(values):
+        # the k-th largest value, where only the first positions with it are kept
+        threshold = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > threshold)
+        ties = np.flatnonzero(values == threshold)[: k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.lexsort((candidates, -values[candidates]))]
@@ -0,0 +1,231 @@
+"""A layer of changes on top of a graph cache, for incremental updates.
+
+Building a graph cache over all citations takes hours, but consecutive OpenCitations
+releases only differ by a small fraction of their edges. Instead of rebuilding, the
+edges that were added and removed since the graph cache was built are kept in a
+:class:`CitationDelta`, and :class:`DeltaGraphCache` consults it on each lookup. When
+the delta gets large, the graph cache should be rebuilt (i.e., compacted).
+
+Even a small fraction of all citations is tens of millions of edges, so the delta keeps
+them as sorted arrays of integer OMIDs (see :func:`opencitations_client.mapping.parse_omid`),
+which are searched with :func:`numpy.searchsorted`. Nodes are only converted to and from
+local unique identifiers at the boundary of :class:`DeltaGraphCache`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from pystow.graph import GraphCache
+
+from .mapping import format_omid, parse_omid
+
+__all__ = [
+    "CitationDelta",
+    "DeltaGraphCache",
+]
+
+#: Edges as a two-dimensional array of integer nodes, or anything that can be turned into one
+EdgesLike = npt.ArrayLike | Iterable[tuple[int, int]]
+
+
+def _to_edges(edges: EdgesLike) -> np.ndarray:
+    """Get an array of sorted, unique edges, with one row per edge."""
+    rv: np.ndarray = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    rv = rv[_lexsort(rv)]
+    keep = np.ones(len(rv), dtype=bool)
+    keep[1:] = np.any(rv[1:] != rv[:-1], axis=1)
+    return rv[keep]
+
+
+def _lexsort(edges: np.ndarray) -> np.ndarray:
+    """Get the order of edges by source, then target."""
+    rv: np.ndarray = np.lexsort((edges[:, 1], edges[:, 0]))
+    return rv
+
+
+def _isin(edges: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """Get a mask for the unique edges that are also in the other unique edges."""
+    both = np.concatenate([edges, other])
+    order = _lexsort(both)
+    # since neither has duplicates, equal neighbors in the sorted edges are one of each
+    equal = np.all(both[order[1:]] == both[order[:-1]], axis=1)
+    rv = np.zeros(len(both), dtype=bool)
+    rv[order[1:][equal]] = True
+    rv[order[:-1][equal]] = True
+    return rv[: len(edges)]
+
+
+class _Adjacency:
+    """The neighbors of nodes, in sorted arrays of nodes and the neighbor for each of them."""
+
+    def __init__(self, edges: np.ndarray, *, out: bool) -> None:
+        if out:
+            # edges are sorted by source, then target
+            self.keys = edges[:, 0].copy()
+            self.values = edges[:, 1].copy()
+        else:
+            order = np.lexsort((edges[:, 0], edges[:, 1]))
+            self.keys = edges[order, 1]
+            self.values = edges[order, 0]
+
+    def get(self, node: int) -> np.ndarray:
+        """Get the sorted neighbors of a node."""
+        start, stop = np.searchsorted(self.keys, [node, node + 1])
+        return self.values[start:stop]
+
+    def count(self, nodes: np.ndarray) -> np.ndarray:
+        """Get the number of neighbors of each node."""
+        rv: np.ndarray = np.searchsorted(self.keys, nodes + 1) - np.searchsorted(self.keys, nodes)
+        return rv
+
+    def get_nodes(self) -> np.ndarray:
+        """Get the sorted nodes that have neighbors."""
+        return np.unique(self.keys)
+
+
+class CitationDelta:
+    """Edges that were added to and removed from a graph since its cache was built."""
+
+    def __init__(self, added: EdgesLike = (), removed: EdgesLike = ()) -> None:
+        """Construct a delta.
+
+        :param added: Edges that aren't in the graph cache, but should be, as pairs of
+            integer nodes
+        :param removed: Edges that are in the graph cache, but shouldn't be, as pairs of
+            integer nodes
+        """
+        self.added = _to_edges(added)
+        self.removed = _to_edges(removed)
+        self.added_out = _Adjacency(self.added, out=True)
+        self.added_in = _Adjacency(self.added, out=False)
+        self.removed_out = _Adjacency(self.removed, out=True)
+        self.removed_in = _Adjacency(self.removed, out=False)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed)
+
+    def get_nodes(self) -> np.ndarray:
+        """Get the sorted nodes of all edges in the delta."""
+        return np.unique(np.concatenate([self.added.ravel(), self.removed.ravel()]))
+
+    def update(self, added: EdgesLike, removed: EdgesLike) -> CitationDelta:
+        """Get a new delta that additionally applies the changes from a newer release.
+
+        :param added: Edges that were added in the newer release
+        :param removed: Edges that were removed in the newer release
+        :return: A new delta, relative to the same graph cache
+        """
+        added = _to_edges(added)
+        removed = _to_edges(removed)
+        # if an edge was added by a previous delta, it's not in the graph cache
+        rv_added = self.added[~_isin(self.added, removed)]
+        rv_removed = _to_edges(np.concatenate([self.removed, removed[~_isin(removed, self.added)]]))
+        # if an edge was removed by a previous delta, it's already in the graph cache
+        rv_added = np.concatenate([rv_added, added[~_isin(added, rv_removed)]])
+        rv_removed = rv_removed[~_isin(rv_removed, added)]
+        return CitationDelta(added=rv_added, removed=rv_removed)
+
+    @classmethod
+    def load(cls, directory: str | Path) -> CitationDelta:
+        """Load a delta from a directory, or get an empty delta if it hasn't been saved."""
+        directory = Path(directory)
+        edges = {}
+        for key in ("added", "removed"):
+            path = directory.joinpath(f"{key}.npy")
+            if path.is_file():
+                edges[key] = np.load(path)
+        return cls(added=edges.get("added", ()), removed=edges.get("removed", ()))
+
+    def save(self, directory: str | Path) -> None:
+        """Save the delta to a directory as NumPy arrays of edges."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for key, edges in [("added", self.added), ("removed", self.removed)]:
+            path = directory.joinpath(f"{key}.npy")
+            temporary_path = directory.joinpath(f"{key}.partial.npy")
+            with temporary_path.open("wb") as file:
+                np.save(file, edges)
+            temporary_path.replace(path)
+
+
+class DeltaGraphCache:
+    """A graph cache with a delta layer applied on top of it."""
+
+    def __init__(
+        self,
+        base: GraphCache,
+        delta: CitationDelta,
+        *,
+        parse_node: Callable[[str], int] = parse_omid,
+        format_node: Callable[[int], str] = format_omid,
+    ) -> None:
+        """Construct a graph cache with a delta layer.
+
+        :param base: The graph cache that was built from an earlier release
+        :param delta: The changes since the graph cache was built
+        :param parse_node: A function that turns a node of the graph cache into the
+            integer used in the delta, which raises a :class:`ValueError` for nodes
+            that can't be in it. Defaults to parsing OMIDs.
+        :param format_node: A function that turns an integer used in the delta back
+            into a node of the graph cache. Defaults to formatting OMIDs.
+        """
+        self.base = base
+        self.delta = delta
+        self.parse_node = parse_node
+        self.format_node = format_node
+
+    def parse_nodes(self, nodes: Iterable[str]) -> np.ndarray:
+        """Get the integers for nodes, where ones that can't be in the delta are -1."""
+        return np.fromiter((self._parse_node(node) for node in nodes), dtype=np.int64)
+
+    def _parse_node(self, node: str) -> int:
+        try:
+            return self.parse_node(node)
+        except ValueError:
+            return -1
+
+    def format_nodes(self, nodes: np.ndarray) -> list[str]:
+        """Get the nodes of the graph cache for integers used in the delta."""
+        return [self.format_node(node) for node in nodes.tolist()]
+
+    def out_edges(self, node: str, *, raise_on_missing: bool = False) -> list[str]:
+        """Get out-edges for the node."""
+        return self._get_edges(
+            node,
+            self.base.out_edges,
+            added=self.delta.added_out,
+            removed=self.delta.removed_out,
+            raise_on_missing=raise_on_missing,
+        )
+
+    def in_edges(self, node: str, *, raise_on_missing: bool = False) -> list[str]:
+        """Get in-edges for the node."""
+        return self._get_edges(
+            node,
+            self.base.in_edges,
+            added=self.delta.added_in,
+            removed=self.delta.removed_in,
+            raise_on_missing=raise_on_missing,
+        )
+
+    def _get_edges(
+        self,
+        node: str,
+        func: Callable[..., list[str]],
+        *,
+        added: _Adjacency,
+        removed: _Adjacency,
+        raise_on_missing: bool,
+    ) -> list[str]:
+        if (node_id := self._parse_node(node)) < 0:
+            return func(node, raise_on_missing=raise_on_missing)
+        added_nodes = self.format_nodes(added.get(node_id))
+        # nodes that are only in the delta don't count as missing
+        rv = func(node, raise_on_missing=raise_on_missing and not added_nodes)
+        if removed_nodes := set(self.format_nodes(removed.get(node_id))):
+            rv = [neighbor for neighbor in rv if neighbor not in removed_nodes]
+        return [*rv, *added_nodes]
@@ -1,22 +1,38 @@
 """Download data in bulk."""
 
-from collections.abc import Iterable
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import shutil
+import sys
+import tarfile
+import zipfile
+from collections.abc import Callable, Collection, Iterable, Mapping, Sequence
+from functools import partial
 from pathlib import Path
+from typing import Any, Literal, TypeAlias, overload
 
 import figshare_client
+import numpy as np
 import pystow
 import zenodo_client
 from pystow.utils import (
-    iter_tarred_csvs,
     iter_zipped_csvs,
     safe_open_reader,
     safe_open_writer,
 )
 from tqdm import tqdm
 
-from .models import Citation, Work, process_citation, process_work
+from .citation_store import COLUMNS, MISSING, CitationStore, sort_columns, write_columns
+from .mapping import OMIDMapping, format_omid
+from .metadata_store import MetadataStore
+from .models import Citation, LazyWork, Work, process_citation, process_work
+from .utils import iter_ordered_map
 
 __all__ = [
+    "EdgeFormat",
     "ensure_citation_data_csv",
     "ensure_citation_data_nt",
     "ensure_citation_data_scholix",
@@ -28,7 +44,10 @@ __all__ = [
     "ensure_provenance_rdf",
     "ensure_source_csv",
     "ensure_source_nt",
+    "iter_citation_arrays",
     "iter_doi_citations",
+    "iter_metadata",
+    "iter_metadata_batches",
     "iter_omid_citations",
     "iter_pubmed_citations",
 ]
@@ -50,18 +69,247 @@ def ensure_metadata_csv() -> Path:
     return zenodo_client.download_zenodo(METADATA_RECORD_ID, name=METADATA_NAME)
 
 
-def iter_metadata() -> Iterable[Work]:
-    """Iterate over all documents."""
+#: The columns of the CSV files in the metadata dump
+METADATA_COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "issue",
+    "volume",
+    "venue",
+    "page",
+    "pub_date",
+    "type",
+    "publisher",
+    "editor",
+)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_metadata(
+    *, workers: int | None = ..., lazy: Literal[False] = ..., columns: None = ...
+) -> Iterable[Work]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_metadata(
+    *, workers: int | None = ..., lazy: Literal[True] = ..., columns: None = ...
+) -> Iterable[LazyWork]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_metadata(
+    *, workers: int | None = ..., lazy: Literal[False] = ..., columns: Sequence[str] = ...
+) -> Iterable[dict[str, str]]: ...
+
+
+def iter_metadata(
+    *,
+    workers: int | None = None,
+    lazy: bool = False,
+    columns: Sequence[str] | None = None,
+) -> Iterable[Work] | Iterable[LazyWork] | Iterable[dict[str, str]]:
+    """Iterate over all documents.
+
+    :param workers: The number of processes for parsing the CSV files in the metadata
+        archive. The archive itself is decompressed in the current process, but each CSV
+        file in it is parsed by a worker. Documents are yielded in the same order as the
+        archive regardless of the number of workers.
+    :param lazy: Should lightweight documents be yielded, whose fields are only parsed
+        when accessed and aren't validated? This is several times faster, especially if
+        only a few fields of each document are used.
+    :param columns: If given, yields dictionaries with the raw values of only these
+        columns of the dump (see :data:`METADATA_COLUMNS`) instead of documents, which
+        skips parsing the rest. Rows with missing values get empty strings for them, and
+        extra values are ignored. See also :func:`iter_metadata_batches`.
+    :yields: Documents, or dictionaries from the given columns to their values
+    :raises ValueError: If both ``lazy`` and ``columns`` are given, or if any of the
+        columns aren't in the dump
+    """
     path = ensure_metadata_csv()
+    func = _get_metadata_member_processor(lazy=lazy, columns=columns)
+    for works in iter_ordered_map(func, _iter_tarred_csvs(path), workers=workers):
+        yield from works
+
+
+def _get_metadata_member_processor(
+    *, lazy: bool, columns: Sequence[str] | None
+) -> Callable[[bytes], list[Any]]:
+    if columns is not None:
+        if lazy:
+            raise ValueError("columns are read without making documents, so can't be lazy")
+        return partial(_process_metadata_member_columns, columns=_check_columns(columns))
+    if lazy:
+        return _process_metadata_member_lazy
+    return _process_metadata_member
+
+
+def iter_metadata_batches(
+    columns: Sequence[str], *, workers: int | None = None
+) -> Iterable[dict[str, np.ndarray]]:
+    """Iterate over columns of the metadata dump, one batch of arrays per CSV file.
+
+    :param columns: The columns of the dump to get (see :data:`METADATA_COLUMNS`)
+    :param workers: The number of processes for parsing the CSV files in the metadata
+        archive. Batches are yielded in the same order as the archive.
+    :yields: Dictionaries from the given columns to aligned arrays. The ``pub_date``
+        column is an array of ``datetime64[D]``, where partial dates are taken as the
+        first month or day, and missing dates are ``NaT``. The other columns are arrays
+        of strings, as Python objects.
+    """
+    func = partial(_process_metadata_member_batch, columns=_check_columns(columns))
+    yield from iter_ordered_map(func, _iter_tarred_csvs(ensure_metadata_csv()), workers=workers)
+
+
+def _check_columns(columns: Sequence[str]) -> tuple[str, ...]:
+    if invalid := [column for column in columns if column not in METADATA_COLUMNS]:
+        raise ValueError(f"invalid columns: {invalid}, use some of {METADATA_COLUMNS}")
+    return tuple(columns)
+
+
+def _iter_tarred_csvs(path: Path) -> Iterable[bytes]:
+    """Iterate over the contents of CSV files in a tar archive, in a single streaming pass."""
+    with tarfile.open(path, mode="r|*") as tar_file:
+        for member in tqdm(tar_file, desc=f"reading {path.name}", unit="file", unit_scale=True):
+            if not member.isfile() or not member.name.endswith(".csv"):
+                continue
+            if (file := tar_file.extractfile(member)) is not None:
+                yield file.read()
+
+
+def _iter_member_rows(data: bytes, *, max_line_length: int | None = None) -> Iterable[list[str]]:
+    """Iterate over the rows of a CSV file's contents, skipping the header."""
+    lines: Iterable[str] = io.StringIO(data.decode("utf-8"), newline="")
+    if max_line_length is not None:
+        lines = _cut_long_lines(lines, max_line_length)
+    reader = csv.reader(lines)
+    _header = next(reader, None)
+    yield from reader
+
+
+def _cut_long_lines(lines: Iterable[str], max_line_length: int) -> Iterable[str]:
+    for line in lines:
+        if len(line) > max_line_length:
+            tqdm.write(f"line of length {len(line):,} is too long: {line[:100]}")
+            continue
+        yield line
 
+
+def _process_metadata_member(data: bytes) -> list[Work]:
+    """Parse all documents in a CSV file from the metadata archive."""
+    return [process_work(record) for record in _iter_metadata_records(data)]
+
+
+def _process_metadata_member_lazy(data: bytes) -> list[LazyWork]:
+    """Wrap all documents in a CSV file from the metadata archive, without parsing them."""
+    return [LazyWork(record) for record in _iter_metadata_records(data)]
+
+
+def _iter_metadata_records(data: bytes) -> Iterable[dict[str, str]]:
     # see https://github.com/cthoyt/opencitations-client/issues/6
-    import csv
-    import sys
+    csv.field_size_limit(sys.maxsize)
+    return csv.DictReader(io.StringIO(data.decode("utf-8"), newline=""))
+
+
+def _ensure_metadata_store(
+    path: Path, *, force_process: bool = False, workers: int | None = None
+) -> Path:
+    """Ensure a local database of the metadata dump, for looking up works.
+
+    :param path: The path to the SQLite database
+    :param force_process: Should the database be rebuilt, even if it exists?
+    :param workers: The number of processes for parsing the CSV files in the metadata
+        archive. Rows are inserted into the database by the current process.
+    :return: The path to the database
+
+    .. seealso:: :class:`opencitations_client.metadata_store.MetadataStore`
+    """
+    if path.is_file() and not force_process:
+        return path
+    members = iter_ordered_map(
+        _process_metadata_rows_member, _iter_tarred_csvs(ensure_metadata_csv()), workers=workers
+    )
+    MetadataStore.build(path, METADATA_COLUMNS, (row for rows in members for row in rows))
+    return path
+
+
+def _load_metadata_store(path: Path, *, workers: int | None = None) -> MetadataStore:
+    """Load the local database of the metadata dump, building it first if needed."""
+    return MetadataStore(_ensure_metadata_store(path, workers=workers))
 
+
+def _process_metadata_rows_member(
+    data: bytes, *, columns: Sequence[str] = METADATA_COLUMNS
+) -> list[list[str]]:
+    """Get the rows of a CSV file from the metadata archive, with values for the columns.
+
+    Like :class:`csv.DictReader`, this skips empty rows and tolerates malformed ones,
+    where missing values are empty strings and extra values are ignored.
+    """
     csv.field_size_limit(sys.maxsize)
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+    header = next(reader, [])
+    if tuple(header) == tuple(columns):
+        width = len(columns)
+        return [
+            row if len(row) == width else [*row[:width], *[""] * (width - len(row))]
+            for row in reader
+            if row
+        ]
+    positions = [header.index(column) if column in header else None for column in columns]
+    return [
+        ["" if p is None or p >= len(row) else row[p] for p in positions] for row in reader if row
+    ]
+
+
+def _process_metadata_member_columns(
+    data: bytes, *, columns: Sequence[str]
+) -> list[dict[str, str]]:
+    """Get the values for the columns of each row of a CSV file from the metadata archive."""
+    return [
+        dict(zip(columns, row, strict=True))
+        for row in _process_metadata_rows_member(data, columns=columns)
+    ]
+
+
+def _process_metadata_member_batch(data: bytes, *, columns: Sequence[str]) -> dict[str, np.ndarray]:
+    """Get arrays for the columns of a CSV file from the metadata archive."""
+    rows = _process_metadata_rows_member(data, columns=columns)
+    rv = {}
+    for position, column in enumerate(columns):
+        values = [row[position] for row in rows]
+        if column == "pub_date":
+            rv[column] = _parse_date_array(values)
+        else:
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            rv[column] = array
+    return rv
+
+
+def _parse_date_array(values: list[str]) -> np.ndarray:
+    """Parse dates like ``2018``, ``2018-06``, or ``2018-06-29`` into an array of days."""
+    try:
+        # numpy parses all three forms, and makes empty strings into NaT
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        # fall back to parsing one at a time, if some dates are invalid
+        return np.array([_parse_date(value) for value in values], dtype="datetime64[D]")
+
+
+def _parse_date(value: str) -> np.datetime64:
+    try:
+        return np.datetime64(value, "D")
+    except ValueError:
+        return np.datetime64("NaT", "D")
 
-    for record in iter_tarred_csvs(path, return_type="record", progress=True):
-        yield process_work(record)
+
+#: Prefixes for external identifiers whose mappings to OMIDs are extracted
+#: from the metadata dump
+EXTERNAL_PREFIXES = ("doi", "pmid", "pmcid", "openalex", "issn", "isbn")
 
 
 def iter_omid_to_doi() -> Iterable[tuple[str, str]]:
@@ -75,37 +323,103 @@ def iter_omid_to_pubmed() -> Iterable[tuple[str, str]]:
 
 
 def _iter_omid_to_external_identifier(prefix: str) -> Iterable[tuple[str, str]]:
+    path = _ensure_omid_to_external(prefix)
+    with safe_open_reader(path) as reader:
+        _header = next(reader)
+        yield from reader
+
+
+def _iter_omid_to_external_identifiers(
+    prefixes: Collection[str], *, workers: int | None = None
+) -> Iterable[tuple[str, str, str]]:
+    """Iterate over triples of prefix, OMID, and external identifier in one pass of the dump.
+
+    Unlike DOIs and PubMed identifiers, some prefixes (like ISSN and ISBN) regularly
+    appear several times in a single record, so all of them are yielded.
+    """
     path = ensure_metadata_csv()
-    for curies, *_ in iter_tarred_csvs(path, max_line_length=100_000):
-        references = {}
+    func = partial(_process_external_identifiers_member, prefixes=frozenset(prefixes))
+    for triples in iter_ordered_map(func, _iter_tarred_csvs(path), workers=workers):
+        yield from triples
+
+
+def _process_external_identifiers_member(
+    data: bytes, *, prefixes: Collection[str]
+) -> list[tuple[str, str, str]]:
+    """Extract external identifiers from a CSV file from the metadata archive."""
+    rv: list[tuple[str, str, str]] = []
+    for curies, *_ in _iter_member_rows(data, max_line_length=100_000):
+        omid = None
+        references = []
         for curie in curies.split():
-            _prefix, _, identifier = curie.partition(":")
+            prefix, _, identifier = curie.partition(":")
             if not identifier:
                 continue
-            references[_prefix] = identifier
-        try:
-            omid = references["omid"]
-        except KeyError:
+            if prefix == "omid":
+                omid = identifier
+            elif prefix in prefixes:
+                references.append((prefix, identifier))
+        if omid is None:
             tqdm.write(f"bad curies: {curies}")
             continue
-        if external_identifier := references.get(prefix):
-            yield omid, external_identifier
+        rv.extend((prefix, omid, identifier) for prefix, identifier in references)
+    return rv
+
 
+def _ensure_omid_to_external(
+    prefix: str, *, force_process: bool = False, workers: int | None = None
+) -> Path:
+    """Ensure a TSV file mapping OMIDs to external identifiers with the given prefix.
 
-def _get_omid_to_external(prefix: str, *, force_process: bool = False) -> dict[str, str]:
-    """Get a dictionary from OMIDs to PubMed identifiers."""
-    path = MODULE.join(name=f"omid_to_{prefix}.tsv.gz")
+    If the file doesn't exist, the files for all prefixes in :data:`EXTERNAL_PREFIXES`
+    are created together, since they can be extracted in a single pass over the dump.
+    """
+    path = _get_omid_to_external_path(prefix)
     if path.is_file() and not force_process:
-        with safe_open_reader(path) as file:
-            _header = next(file)
-            return dict(file)
-    rv = {}
-    with safe_open_writer(path) as writer:
-        writer.writerow(("omid", prefix))
-        for omid_id, external_id in _iter_omid_to_external_identifier(prefix):
-            writer.writerow((omid_id, external_id))
-            rv[omid_id] = external_id
-    return rv
+        return path
+    prefixes = {*EXTERNAL_PREFIXES, prefix}
+    return _ensure_omid_to_externals(prefixes, force_process=force_process, workers=workers)[prefix]
+
+
+def _get_omid_to_external_path(prefix: str) -> Path:
+    return MODULE.join(name=f"omid_to_{prefix}.tsv.gz")
+
+
+def _ensure_omid_to_externals(
+    prefixes: Collection[str], *, force_process: bool = False, workers: int | None = None
+) -> dict[str, Path]:
+    """Ensure TSV files mapping OMIDs to external identifiers for all the given prefixes."""
+    paths = {prefix: _get_omid_to_external_path(prefix) for prefix in prefixes}
+    if all(path.is_file() for path in paths.values()) and not force_process:
+        return paths
+    with contextlib.ExitStack() as stack:
+        writers = {
+            prefix: stack.enter_context(safe_open_writer(path)) for prefix, path in paths.items()
+        }
+        for prefix, writer in writers.items():
+            writer.writerow(("omid", prefix))
+        for prefix, omid, external_identifier in _iter_omid_to_external_identifiers(
+            prefixes, workers=workers
+        ):
+            writers[prefix].writerow((omid, external_identifier))
+    return paths
+
+
+def _get_omid_mapping(prefix: str, *, force_process: bool = False) -> OMIDMapping:
+    """Get a compact mapping between OMIDs and external identifiers with the given prefix.
+
+    The first time this is called, the mapping is built from the TSV file and saved as a
+    memory-mappable index next to it. Afterwards, loading the index is instant.
+    """
+    directory = MODULE.join(name=f"omid_to_{prefix}.index")
+    if OMIDMapping.exists(directory) and not force_process:
+        return OMIDMapping.load(directory)
+    path = _ensure_omid_to_external(prefix, force_process=force_process)
+    with safe_open_reader(path) as reader:
+        _header = next(reader)
+        mapping = OMIDMapping.from_pairs(reader)
+    mapping.save(directory)
+    return OMIDMapping.load(directory)
 
 
 def ensure_metadata_kubernetes() -> list[Path]:
@@ -175,51 +489,835 @@ def ensure_source_csv() -> list[Path]:
     return list(figshare_client.ensure_files(SOURCE_CSV_ID))
 
 
-def iter_pubmed_citations(*, force_process: bool = False) -> Iterable[tuple[str, str]]:
+#: The format for storing preprocessed citations. ``tsv`` is a gzipped TSV file of
+#: identifier pairs. ``bin`` is a directory of raw int64 arrays of shape ``(n, 2)``,
+#: one per citation archive, with a ``manifest.json`` that can be memory-mapped
+#: without any text parsing (see :func:`iter_citation_arrays`).
+EdgeFormat: TypeAlias = Literal["tsv", "bin"]
+
+#: The name of the file listing the shards in a binary edge list directory
+MANIFEST_NAME = "manifest.json"
+
+
+def iter_pubmed_citations(
+    *, force_process: bool = False, workers: int | None = None, edge_format: EdgeFormat = "tsv"
+) -> Iterable[tuple[str, str]]:
     """Get PubMed-PubMed citations."""
-    return _get_external_citations("pmid", force_process=force_process)
+    return _iter_citations(
+        "pmid", force_process=force_process, workers=workers, edge_format=edge_format
+    )
 
 
-def iter_doi_citations(*, force_process: bool = False) -> Iterable[tuple[str, str]]:
+def iter_doi_citations(
+    *, force_process: bool = False, workers: int | None = None, edge_format: EdgeFormat = "tsv"
+) -> Iterable[tuple[str, str]]:
     """Get DOI-DOI citations."""
-    return _get_external_citations("doi", force_process=force_process)
+    return _iter_citations(
+        "doi", force_process=force_process, workers=workers, edge_format=edge_format
+    )
 
 
-def _get_external_citations(
-    prefix: str, *, force_process: bool = False
+def iter_omid_citations(
+    *, force_process: bool = False, workers: int | None = None, edge_format: EdgeFormat = "tsv"
 ) -> Iterable[tuple[str, str]]:
-    out_path = MODULE.join(name=f"{prefix}_citations.tsv.gz")
-    if out_path.is_file() and not force_process:
-        with safe_open_reader(out_path) as reader:
-            yield from reader
-    else:
-        omid_to_external = _get_omid_to_external(prefix, force_process=force_process)
-        with safe_open_writer(out_path) as writer:
-            for path in tqdm(ensure_citation_data_csv(), desc="reading citations", unit="archive"):
-                for citation, *_ in iter_zipped_csvs(path, progress=True):
-                    left, _, right = citation.lstrip("oci:").partition("-")
-                    source_external_id = omid_to_external.get(f"br/{left}")
-                    target_external_id = omid_to_external.get(f"br/{right}")
-                    if source_external_id and target_external_id:
-                        writer.writerow((source_external_id, target_external_id))
-                        yield source_external_id, target_external_id
-
-
-def iter_omid_citations(*, force_process: bool = False) -> Iterable[tuple[str, str]]:
     """Iterate citations between OpenCitation identifiers."""
-    out_path = MODULE.join(name="omid_citations.tsv.gz")
-    if out_path.is_file() and not force_process:
-        with safe_open_reader(out_path) as reader:
+    return _iter_citations(
+        "omid", force_process=force_process, workers=workers, edge_format=edge_format
+    )
+
+
+def _iter_citations(
+    prefix: str,
+    *,
+    force_process: bool = False,
+    workers: int | None = None,
+    edge_format: EdgeFormat = "tsv",
+) -> Iterable[tuple[str, str]]:
+    if edge_format == "tsv":
+        path = _ensure_citations(prefix, force_process=force_process, workers=workers)
+        with safe_open_reader(path) as reader:
             yield from reader
+        return
+
+    edges_iterable = iter_citation_arrays(prefix, force_process=force_process, workers=workers)
+    mapping = None if prefix == "omid" else _get_omid_mapping(prefix)
+    for edges in edges_iterable:
+        # go in batches to bound the memory needed for making strings
+        for start in range(0, len(edges), 1 << 20):
+            batch = np.asarray(edges[start : start + (1 << 20)])
+            if mapping is None:
+                yield from ((format_omid(s), format_omid(t)) for s, t in batch.tolist())
+            else:
+                yield from mapping.table.take(batch).tolist()
+
+
+def iter_citation_arrays(
+    prefix: str, *, force_process: bool = False, workers: int | None = None
+) -> Iterable[np.ndarray]:
+    """Iterate over citations as memory-mapped integer arrays, one per citation archive.
+
+    :param prefix: Either ``omid`` or the prefix for an external identifier, like ``doi``
+        or ``pmid``
+    :param force_process: Should the binary edge list be rebuilt, even if it exists?
+    :param workers: The number of processes for reading citation archives
+    :yields: Arrays of shape ``(n, 2)`` with citing and cited nodes in each row. For
+        ``omid``, these are integer OMIDs (see
+        :func:`opencitations_client.mapping.parse_omid`). For other prefixes, these are
+        positions in the string table of the mapping between OMIDs and that prefix.
+    """
+    directory = _ensure_citations(
+        prefix, force_process=force_process, workers=workers, edge_format="bin"
+    )
+    for shard in _read_manifest(directory)["shards"]:
+        yield _load_shard(directory, shard)
+
+
+def _ensure_citations(
+    prefix: str,
+    *,
+    force_process: bool = False,
+    workers: int | None = None,
+    edge_format: EdgeFormat = "tsv",
+) -> Path:
+    """Ensure preprocessed citations between identifiers with the given prefix.
+
+    Each citation archive is processed into its own shard. After each shard is
+    finished, it's recorded in a manifest along with checksums, so if processing is
+    interrupted, calling this function again resumes from the shards that were already
+    completed instead of starting over.
+
+    :param prefix: Either ``omid`` or the prefix for an external identifier, like ``doi``
+        or ``pmid``. For external identifiers, only citations where both sides have an
+        external identifier are kept.
+    :param force_process: Should the citations be rebuilt from scratch, even if they
+        already exist or were partially processed?
+    :param workers: The number of processes for reading citation archives. Each
+        archive is processed independently into a shard.
+    :param edge_format: The format in which the citations are stored. For ``tsv``, the
+        shards are concatenated into a single file, in order.
+    :return: The path to the gzipped TSV file of citations, or the directory containing
+        the binary edge list and its manifest
+    """
+    if edge_format == "tsv":
+        path = MODULE.join(name=f"{prefix}_citations.tsv.gz")
+        if path.is_file() and not force_process:
+            return path
+        shard_directory = MODULE.join(name=f"{prefix}_citations_shards")
+    elif edge_format == "bin":
+        path = shard_directory = _get_edges_directory(prefix)
+        if _read_manifest(path).get("complete") and not force_process:
+            return path
+    else:
+        raise ValueError(f"unknown edge format: {edge_format}")
+
+    if force_process and shard_directory.exists():
+        shutil.rmtree(shard_directory)
+    shard_directory.mkdir(parents=True, exist_ok=True)
+
+    if prefix != "omid":
+        # make sure the memory-mapped index exists before starting
+        # workers, so they can all open it instead of building it
+        _get_omid_mapping(prefix, force_process=force_process)
+    stamp = _get_mapping_stamp(prefix)
+
+    func = partial(
+        _process_citation_archive,
+        prefix=prefix,
+        directory=shard_directory,
+        progress=workers is None or workers <= 1,
+        edge_format=edge_format,
+        stamp=stamp,
+    )
+    manifest = _process_archives(
+        func,
+        shard_directory,
+        {"prefix": prefix, "format": edge_format, "dtype": "int64"},
+        desc=f"reading {prefix} citations",
+        workers=workers,
+        stamp=stamp,
+    )
+    if edge_format == "bin":
+        return path
+
+    # gzip files can be concatenated into a single valid gzip file
+    temporary_path = path.with_name(f"{path.name}.tmp")
+    with temporary_path.open("wb") as file:
+        for shard in manifest["shards"]:
+            with shard_directory.joinpath(shard["name"]).open("rb") as shard_file:
+                shutil.copyfileobj(shard_file, file)
+    temporary_path.replace(path)
+    shutil.rmtree(shard_directory)
+    return path
+
+
+def _process_archives(
+    func: Callable[[Path], dict[str, Any]],
+    directory: Path,
+    metadata: dict[str, Any],
+    *,
+    desc: str,
+    workers: int | None = None,
+    stamp: Mapping[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Process each citation archive into a shard, resuming from completed shards.
+
+    :param func: A picklable function that processes an archive into a shard in the
+        directory, and returns its description for the manifest
+    :param directory: The directory containing the shards and the manifest
+    :param metadata: Additional keys for the manifest
+    :param desc: The description for the progress bar
+    :param workers: The number of processes for reading citation archives
+    :param stamp: Additional keys that each shard must have to be reused, see
+        :func:`_get_mapping_stamp`
+    :return: The completed manifest, with the shards in the order of the archives
+    """
+    archives = ensure_citation_data_csv()
+    completed = _get_completed_shards(directory, archives, stamp=stamp)
+    manifest: dict[str, Any] = {
+        **metadata,
+        "complete": False,
+        "shards": list(completed.values()),
+    }
+    remaining = [archive for archive in archives if archive.name not in completed]
+    for shard in tqdm(
+        iter_ordered_map(func, remaining, workers=workers),
+        initial=len(completed),
+        total=len(archives),
+        desc=desc,
+        unit="archive",
+    ):
+        completed[shard["archive"]] = shard
+        manifest["shards"].append(shard)
+        _write_manifest(directory, manifest)
+
+    manifest["shards"] = [completed[archive.name] for archive in archives]
+    manifest["complete"] = True
+    _write_manifest(directory, manifest)
+    return manifest
+
+
+def _update_citations(
+    prefix: str, *, workers: int | None = None
+) -> tuple[np.ndarray, np.ndarray, dict[str, Any]]:
+    """Prepare an update of a binary edge list to the current citation release.
+
+    Archives that match a shard in the existing manifest by name, size, and modification
+    time are assumed to be unchanged. New or changed archives are processed into a
+    staging directory and compared with the shard they replace, then moved next to the
+    existing shards under names that include their checksum, so that no shard that the
+    current manifest refers to is overwritten. The update only takes effect when the
+    returned manifest is committed with :func:`_commit_citations`, which also deletes
+    the shards it no longer refers to. Afterwards, the edge list matches what a full
+    rebuild would produce.
+
+    :param prefix: Either ``omid`` or the prefix for an external identifier. Note that
+        for the latter, the mapping from OMIDs isn't updated, and if it was rebuilt
+        since the edge list was, all archives are processed again.
+    :param workers: The number of processes for reading new or changed archives
+    :return: A triple of two arrays of shape ``(n, 2)`` for the edges that were added
+        and removed, respectively, and the manifest for the updated edge list
+    """
+    directory = _ensure_citations(prefix, workers=workers, edge_format="bin")
+    manifest = _read_manifest(directory)
+    old_shards = {shard["archive"]: shard for shard in manifest["shards"]}
+    archives = ensure_citation_data_csv()
+    stamp = _get_mapping_stamp(prefix)
+    changed = [
+        archive
+        for archive in archives
+        if archive.name not in old_shards
+        or not _is_unchanged(old_shards[archive.name], archive, stamp=stamp)
+    ]
+    archive_names = {archive.name for archive in archives}
+    dropped = [shard for name, shard in old_shards.items() if name not in archive_names]
+
+    empty = np.empty((0, 2), dtype=np.int64)
+    added, removed = [empty], [empty]
+    for shard in dropped:
+        removed.append(np.array(_load_shard(directory, shard)))
+
+    staging_directory = MODULE.join(name=f"{prefix}_citations.edges.staging")
+    if staging_directory.exists():
+        shutil.rmtree(staging_directory)
+    staging_directory.mkdir()
+    func = partial(
+        _process_citation_archive,
+        prefix=prefix,
+        directory=staging_directory,
+        progress=workers is None or workers <= 1,
+        edge_format="bin",
+        stamp=stamp,
+    )
+    new_shards = {}
+    for shard in tqdm(
+        iter_ordered_map(func, changed, workers=workers),
+        total=len(changed),
+        desc=f"updating {prefix} citations",
+        unit="archive",
+    ):
+        new_edges = _load_shard(staging_directory, shard)
+        if old_shard := old_shards.get(shard["archive"]):
+            old_edges = _load_shard(directory, old_shard)
+        else:
+            old_edges = empty
+        added.append(_row_difference(new_edges, old_edges))
+        removed.append(_row_difference(old_edges, new_edges))
+        name = f"{Path(shard['name']).stem}.{shard['sha256'][:16]}.bin"
+        staging_directory.joinpath(shard["name"]).replace(directory.joinpath(name))
+        new_shards[shard["archive"]] = {**shard, "name": name}
+    shutil.rmtree(staging_directory)
+
+    new_manifest = {
+        **manifest,
+        "shards": [
+            new_shards.get(archive.name) or old_shards[archive.name] for archive in archives
+        ],
+    }
+    # an edge can move between archives, in which case it's neither added nor removed
+    added_array, removed_array = np.concatenate(added), np.concatenate(removed)
+    return (
+        _row_difference(added_array, removed_array),
+        _row_difference(removed_array, added_array),
+        new_manifest,
+    )
+
+
+def _commit_citations(prefix: str, manifest: dict[str, Any]) -> None:
+    """Commit a manifest from :func:`_update_citations`, then delete unreferenced shards.
+
+    Replacing the manifest is atomic, so the edge list is either entirely the old or
+    the new release. This can be called again with the same manifest, e.g., to finish
+    an update that was interrupted.
+    """
+    directory = _get_edges_directory(prefix)
+    if _read_manifest(directory) != manifest:
+        _write_manifest(directory, manifest)
+    names = {shard["name"] for shard in manifest["shards"]}
+    for path in directory.glob("*.bin"):
+        if path.name not in names:
+            path.unlink()
+
+
+def _get_edges_directory(prefix: str) -> Path:
+    return MODULE.join(name=f"{prefix}_citations.edges")
+
+
+def _load_shard(directory: Path, shard: dict[str, Any]) -> np.ndarray:
+    if shard["edges"] == 0:
+        # numpy can't memory-map an empty file
+        return np.empty((0, 2), dtype=np.int64)
+    return np.memmap(directory.joinpath(shard["name"]), dtype=np.int64, mode="r").reshape(-1, 2)
+
+
+def _row_difference(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Get the rows in the first array of edges that aren't in the second."""
+    # view each row as a single record, so whole edges can be compared at once
+    dtype = np.dtype([("source", np.int64), ("target", np.int64)])
+    left_records = np.ascontiguousarray(left, dtype=np.int64).view(dtype).ravel()
+    right_records = np.ascontiguousarray(right, dtype=np.int64).view(dtype).ravel()
+    return np.asarray(left)[~np.isin(left_records, right_records)]
+
+
+def _read_manifest(directory: Path) -> dict[str, Any]:
+    path = directory.joinpath(MANIFEST_NAME)
+    if not path.is_file():
+        return {}
+    rv: dict[str, Any] = json.loads(path.read_text())
+    return rv
+
+
+def _write_manifest(directory: Path, manifest: dict[str, Any]) -> None:
+    """Write the manifest atomically, so a crash can't leave it half-written."""
+    path = directory.joinpath(MANIFEST_NAME)
+    temporary_path = path.with_name(f"{path.name}.tmp")
+    temporary_path.write_text(json.dumps(manifest, indent=2))
+    temporary_path.replace(path)
+
+
+def _get_completed_shards(
+    directory: Path, archives: list[Path], *, stamp: Mapping[str, Any] | None = None
+) -> dict[str, dict[str, Any]]:
+    """Get the shards from a previous run that can be reused, keyed by archive name.
+
+    A shard is reused if its archive is still in the list of archives with the same
+    size and modification time, if it has the same values for the keys in the stamp,
+    and if the shard file is present with the same checksum as when it was recorded in
+    the manifest.
+    """
+    archives_by_name = {archive.name: archive for archive in archives}
+    rv = {}
+    for shard in _read_manifest(directory).get("shards", []):
+        archive = archives_by_name.get(shard["archive"])
+        if archive is None or not _is_unchanged(shard, archive, stamp=stamp):
+            continue
+        shard_path = directory.joinpath(shard["name"])
+        if not shard_path.is_file() or _sha256(shard_path) != shard["sha256"]:
+            tqdm.write(f"[{shard['archive']}] reprocessing, shard is missing or corrupt")
+            continue
+        rv[shard["archive"]] = shard
+    return rv
+
+
+def _get_archive_stamp(path: Path) -> dict[str, Any]:
+    """Describe an archive for the manifest, so changes to it can be detected."""
+    stat = path.stat()
+    return {"archive": path.name, "archive_size": stat.st_size, "archive_mtime": stat.st_mtime_ns}
+
+
+def _is_unchanged(
+    shard: dict[str, Any], archive: Path, *, stamp: Mapping[str, Any] | None = None
+) -> bool:
+    """Check if an archive and the stamp are the same as when the shard was processed."""
+    expected = {**_get_archive_stamp(archive), **(stamp or {})}
+    return all(shard.get(key) == value for key, value in expected.items())
+
+
+def _get_mapping_stamp(prefix: str) -> dict[str, Any]:
+    """Describe the mapping that the shards of citations for a prefix depend on.
+
+    Shards for external identifiers store positions in the string table of the mapping
+    from OMIDs (see :func:`_get_omid_mapping`), so they're only valid for the exact
+    table they were made with, and not, e.g., after it's rebuilt from a newer metadata
+    dump. Shards for OMIDs don't depend on a mapping.
+    """
+    if prefix == "omid":
+        return {}
+    table = _get_omid_mapping(prefix).table
+    digest = hashlib.sha256()
+    for values in (table.offsets, table.heap):
+        # go in blocks, so that the memory-mapped arrays don't get copied all at once
+        for start in range(0, len(values), 1 << 24):
+            digest.update(np.ascontiguousarray(values[start : start + (1 << 24)]).tobytes())
+    return {"mapping_size": len(table), "mapping_sha256": digest.hexdigest()}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _process_citation_archive(
+    path: Path,
+    *,
+    prefix: str,
+    directory: Path,
+    progress: bool = True,
+    edge_format: EdgeFormat = "tsv",
+    stamp: Mapping[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Write the citations from a single archive to a shard.
+
+    :param stamp: Additional keys for the description of the shard, see
+        :func:`_get_mapping_stamp`
+    :return: A description of the shard for the manifest, including its name, the
+        number of citations in it, its checksum, and the name, size, and modification
+        time of its archive
+    """
+    mapping = None if prefix == "omid" else _get_omid_mapping(prefix)
+    chunks = _iter_edge_chunks(path, mapping=mapping, progress=progress)
+    edges = 0
+    if edge_format == "bin":
+        shard_path = directory.joinpath(f"{path.stem}.bin")
+        temporary_path = shard_path.with_name(f"{path.stem}.partial.bin")
+        with temporary_path.open("wb") as file:
+            for chunk in chunks:
+                chunk.astype(np.int64).tofile(file)
+                edges += len(chunk)
     else:
-        with safe_open_writer(out_path) as writer:
-            for path in tqdm(ensure_citation_data_csv(), desc="reading citations", unit="archive"):
-                for citation, *_ in iter_zipped_csvs(path, progress=True):
-                    left, _, right = citation.lstrip("oci:").partition("-")
-                    source_external_id = f"br/{left}"
-                    target_external_id = f"br/{right}"
-                    writer.writerow((source_external_id, target_external_id))
-                    yield source_external_id, target_external_id
+        shard_path = directory.joinpath(f"{path.stem}.tsv.gz")
+        temporary_path = shard_path.with_name(f"{path.stem}.partial.tsv.gz")
+        with safe_open_writer(temporary_path) as writer:
+            for chunk in chunks:
+                if mapping is None:
+                    writer.writerows(
+                        (format_omid(source), format_omid(target))
+                        for source, target in chunk.tolist()
+                    )
+                else:
+                    writer.writerows(mapping.table.take(chunk).tolist())
+                edges += len(chunk)
+    temporary_path.replace(shard_path)
+    return {
+        "name": shard_path.name,
+        "edges": edges,
+        "sha256": _sha256(shard_path),
+        **_get_archive_stamp(path),
+        **(stamp or {}),
+    }
+
+
+def _iter_edge_chunks(
+    path: Path, *, mapping: OMIDMapping | None = None, progress: bool = True
+) -> Iterable[np.ndarray]:
+    """Iterate over chunks of citations from an archive as arrays of shape ``(n, 2)``.
+
+    :param path: The path to a zip archive of citation CSV files
+    :param mapping: If given, only keeps citations where both sides have an external
+        identifier, and uses the positions of the external identifiers in the mapping's
+        string table instead of integer OMIDs
+    :param progress: Should a progress bar be shown?
+    :yields: Arrays of integer OMIDs or string table positions
+    """
+    for sources, targets in _iter_oci_chunks(path, progress=progress):
+        if mapping is None:
+            yield np.stack([sources, targets], axis=1)
+        else:
+            source_indices = mapping.get_external_indices(sources)
+            target_indices = mapping.get_external_indices(targets)
+            keep = (source_indices >= 0) & (target_indices >= 0)
+            yield np.stack([source_indices[keep], target_indices[keep]], axis=1)
+
+
+OCI_PREFIX = np.frombuffer(b"oci:", dtype=np.uint8)
+
+
+def _iter_oci_chunks(
+    path: Path, *, chunk_size: int = 1 << 24, progress: bool = True
+) -> Iterable[tuple[np.ndarray, np.ndarray]]:
+    """Iterate over chunks of citations in a zip archive as arrays of integer OMIDs.
+
+    :param path: The path to a zip archive of citation CSV files
+    :param chunk_size: The number of bytes to read at a time
+    :param progress: Should a progress bar be shown?
+    :yields: Pairs of aligned arrays of integer OMIDs (see
+        :func:`opencitations_client.mapping.parse_omid`) for the citing and cited works
+    """
+    for data in _iter_csv_chunks(path, chunk_size=chunk_size, progress=progress):
+        yield _parse_oci_chunk(data)
+
+
+def _iter_csv_chunks(
+    path: Path, *, chunk_size: int = 1 << 24, progress: bool = True
+) -> Iterable[bytes]:
+    """Iterate over chunks of complete lines from the CSV files in a zip archive."""
+    with zipfile.ZipFile(path) as zip_file:
+        infos = [info for info in zip_file.infolist() if info.filename.endswith(".csv")]
+        for info in tqdm(infos, desc=f"reading {path.name}", unit="file", disable=not progress):
+            with zip_file.open(info) as file:
+                remainder = b""
+                while chunk := file.read(chunk_size):
+                    # only yield up to the last complete line, and save the rest for later
+                    lines, _, remainder = (remainder + chunk).rpartition(b"\n")
+                    yield lines
+                if remainder:
+                    yield remainder
+
+
+def _parse_oci_chunk(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """Parse the OCIs in a chunk of a citation CSV file into arrays of integer OMIDs.
+
+    Each row in a citation CSV file starts with an OCI like ``oci:06801597168-062402843420``
+    that is made from the numeric parts of the citing and cited OMIDs. Rather than
+    splitting each row in Python, this finds the start and end of each line, and the
+    first comma and the dash before it, using array operations over the raw bytes, then
+    parses the digits between them in bulk. The few rows that can't be parsed this way
+    are parsed one by one with :func:`_parse_oci_line`.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    starts = np.concatenate([np.zeros(1, dtype=np.int64), newlines + 1])
+    ends = np.concatenate([newlines, [len(buffer)]])
+    keep = starts + len(OCI_PREFIX) < len(buffer)
+    starts, ends = starts[keep], ends[keep]
+    # this skips the header and any empty lines
+    is_oci = np.ones(len(starts), dtype=bool)
+    for offset, character in enumerate(OCI_PREFIX):
+        is_oci &= buffer[starts + offset] == character
+    starts, ends = starts[is_oci], ends[is_oci]
+
+    comma_positions = _find_next(np.flatnonzero(buffer == ord(",")), starts, ends)
+    dash_positions = _find_next(np.flatnonzero(buffer == ord("-")), starts, comma_positions)
+    sources, valid_sources = _parse_digits(buffer, starts + len(OCI_PREFIX), dash_positions)
+    targets, valid_targets = _parse_digits(buffer, dash_positions + 1, comma_positions)
+    valid = valid_sources & valid_targets & (dash_positions < comma_positions)
+    for position in np.flatnonzero(~valid).tolist():
+        if (parsed := _parse_oci_line(data[starts[position] : ends[position]])) is not None:
+            sources[position], targets[position] = parsed
+            valid[position] = True
+    return sources[valid], targets[valid]
+
+
+def _find_next(marks: np.ndarray, begins: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Find the position of the first mark from each begin position, up to its end position.
+
+    :param marks: A sorted array of positions, e.g., of a given character in a buffer
+    :param begins: An array of positions where each search starts
+    :param ends: An array of positions where each search stops (exclusive)
+    :return: An array with the position of the first mark in each range, or its end
+        position if there is none
+    """
+    indices = np.searchsorted(marks, begins)
+    found = marks[np.minimum(indices, len(marks) - 1)] if len(marks) else ends
+    return np.where((indices < len(marks)) & (found < ends), found, ends)
+
+
+def _parse_oci_line(line: bytes) -> tuple[int, int] | None:
+    """Parse the OCI at the start of a line of a citation CSV file into integer OMIDs.
+
+    :param line: A line from a citation CSV file
+    :return: The integer OMIDs of the citing and cited works, or none if the line
+        doesn't start with a valid OCI
+    """
+    oci, _, _ = line.rstrip(b"\r").partition(b",")
+    source, separator, target = oci.removeprefix(b"oci:").partition(b"-")
+    if not separator or not all(
+        value.isdigit() and len(value) <= MAX_DIGITS for value in (source, target)
+    ):
+        return None
+    return int(source), int(target)
+
+
+#: The largest number of digits that are parsed, so integers fit into 64 bits
+MAX_DIGITS = 18
+
+
+def _parse_digits(
+    buffer: np.ndarray, begins: np.ndarray, ends: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Parse the integers spanning from each begin to end position in a buffer of bytes.
+
+    :param buffer: An array of bytes
+    :param begins: An array of positions in the buffer where each integer starts
+    :param ends: An array of positions in the buffer where each integer ends (exclusive)
+    :return: A pair of arrays with the integers and a mask for which could be parsed,
+        i.e., that were non-empty, only contained digits, and fit into 64 bits
+    """
+    lengths = ends - begins
+    valid = (lengths > 0) & (lengths <= MAX_DIGITS)
+    # spans that are too long can't be parsed anyway, so they're left out of the matrix
+    # of digits, which bounds its width even if a malformed row spans the whole buffer
+    ends = np.where(valid, ends, begins)
+    width = int(lengths[valid].max(initial=0))
+    # right-align all integers into a matrix of digits, padded with zeros on the left
+    positions = ends[:, None] - width + np.arange(width)
+    digits = buffer[np.clip(positions, 0, max(len(buffer) - 1, 0))].astype(np.int64) - ord("0")
+    digits[positions < begins[:, None]] = 0
+    valid &= ((0 <= digits) & (digits <= 9)).all(axis=1)
+    values = digits @ 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return values, valid
+
+
+def _ensure_citation_store(
+    *, force_process: bool = False, update: bool = False, workers: int | None = None
+) -> Path:
+    """Ensure the attributes of all citations, as columns in one binary file per archive.
+
+    See :mod:`opencitations_client.citation_store` for the layout of the files. Like for
+    :func:`_ensure_citations`, completed shards are recorded in a manifest, so an
+    interrupted build resumes where it stopped.
+
+    :param force_process: Should the files be rebuilt from scratch, even if they exist?
+    :param update: Should the files be updated to the current citation release? Only
+        the archives that are new or changed since the last build are processed.
+    :param workers: The number of processes for reading citation archives. Note that
+        each worker holds all the citations of one archive in memory while sorting them.
+    :return: The directory containing the files and their manifest
+    """
+    directory = _get_citation_store_directory()
+    if _has_citation_store() and not force_process and not update:
+        return directory
+    if force_process and directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    func = partial(
+        _process_citation_attributes_archive,
+        directory=directory,
+        progress=workers is None or workers <= 1,
+    )
+    manifest = _process_archives(
+        func,
+        directory,
+        {"format": "columns", "columns": [name for name, _ in COLUMNS]},
+        desc="reading citation attributes",
+        workers=workers,
+    )
+    # clean up shards for archives that are no longer part of the release
+    names = {shard["name"] for shard in manifest["shards"]}
+    for path in directory.glob("*.bin"):
+        if path.name not in names:
+            path.unlink()
+    return directory
+
+
+def _get_citation_store_directory() -> Path:
+    return MODULE.join(name="citations.attributes")
+
+
+def _has_citation_store() -> bool:
+    """Check if the citation attributes have been completely built, without building them."""
+    return bool(_read_manifest(_get_citation_store_directory()).get("complete"))
+
+
+def _load_citation_store(*, workers: int | None = None) -> CitationStore:
+    """Load the store of citation attributes, building it first if needed."""
+    directory = _ensure_citation_store(workers=workers)
+    return CitationStore(directory, _read_manifest(directory))
+
+
+def _process_citation_attributes_archive(
+    path: Path, *, directory: Path, progress: bool = True
+) -> dict[str, Any]:
+    """Write the attributes of the citations from a single archive to a shard.
+
+    :return: A description of the shard for the manifest, including its name, the
+        number of citations in it, its checksum, and the name, size, and modification
+        time of its archive
+    """
+    chunks = [_parse_citation_chunk(data) for data in _iter_csv_chunks(path, progress=progress)]
+    dtypes = dict(COLUMNS)
+    columns = sort_columns(
+        {
+            name: np.concatenate(
+                [np.empty(0, dtype=dtypes[name]), *(chunk[name] for chunk in chunks)]
+            )
+            for name in PARSED_COLUMNS
+        }
+    )
+    shard_path = directory.joinpath(f"{path.stem}.citations.bin")
+    temporary_path = shard_path.with_name(f"{path.stem}.citations.partial.bin")
+    write_columns(temporary_path, columns)
+    temporary_path.replace(shard_path)
+    return {
+        "name": shard_path.name,
+        "edges": len(columns["citing"]),
+        "sha256": _sha256(shard_path),
+        **_get_archive_stamp(path),
+    }
+
+
+#: The columns that are parsed from citation CSV files, before sorting
+PARSED_COLUMNS = ("citing", "cited", "creation", "timespan", "journal_sc", "author_sc")
+#: The number of days per year, month, and day in a timespan, as used by the API
+TIMESPAN_UNITS = ((ord("Y"), 365), (ord("M"), 30), (ord("D"), 1))
+
+
+def _parse_citation_chunk(data: bytes) -> dict[str, np.ndarray]:
+    """Parse a chunk of a citation CSV file into columns of citation attributes.
+
+    Like :func:`_parse_oci_chunk`, this works on the raw bytes with array operations.
+    The citing and cited articles come from the OCI at the start of each line, and the
+    creation date, timespan, and self-citation flags from the four fields at the end of
+    each line, which never contain commas. Lines without all seven fields are skipped,
+    and values that can't be parsed are stored as missing.
+
+    :param data: Complete lines from a citation CSV file
+    :return: A dictionary from the names in :data:`PARSED_COLUMNS` to aligned arrays
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    starts = np.concatenate([np.zeros(1, dtype=np.int64), newlines + 1])
+    ends = np.concatenate([newlines, [len(buffer)]])
+    keep = starts + len(OCI_PREFIX) < len(buffer)
+    starts, ends = starts[keep], ends[keep]
+    # this skips the header and any empty lines
+    is_oci = np.ones(len(starts), dtype=bool)
+    for offset, character in enumerate(OCI_PREFIX):
+        is_oci &= buffer[starts + offset] == character
+    starts, ends = starts[is_oci], ends[is_oci]
+    ends -= (ends > starts) & (buffer[np.maximum(ends - 1, 0)] == ord("\r"))
+
+    commas = np.flatnonzero(buffer == ord(","))
+    first_commas = np.searchsorted(commas, starts)
+    last_commas = np.searchsorted(commas, ends)
+    keep = last_commas - first_commas >= 6
+    starts, ends = starts[keep], ends[keep]
+    first_commas, last_commas = first_commas[keep], last_commas[keep]
+    oci_ends = commas[first_commas]
+    dash_positions = _find_next(np.flatnonzero(buffer == ord("-")), starts, oci_ends)
+
+    sources, valid_sources = _parse_digits(buffer, starts + len(OCI_PREFIX), dash_positions)
+    targets, valid_targets = _parse_digits(buffer, dash_positions + 1, oci_ends)
+    keep = valid_sources & valid_targets & (dash_positions < oci_ends)
+    # the positions of the last four commas in each line, which start the last four fields
+    field_starts = commas[last_commas[keep, None] - np.arange(4, 0, -1)] + 1
+    field_ends = np.concatenate([field_starts[:, 1:] - 1, ends[keep, None]], axis=1)
+    return {
+        "citing": sources[keep],
+        "cited": targets[keep],
+        "creation": _parse_dates(buffer, field_starts[:, 0], field_ends[:, 0]),
+        "timespan": _parse_timespans(buffer, field_starts[:, 1], field_ends[:, 1]),
+        "journal_sc": _parse_flags(buffer, field_starts[:, 2], field_ends[:, 2]),
+        "author_sc": _parse_flags(buffer, field_starts[:, 3], field_ends[:, 3]),
+    }
+
+
+def _parse_dates(buffer: np.ndarray, begins: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Parse dates like ``2018``, ``2018-06``, or ``2018-06-29`` into days since 1970-01-01.
+
+    Missing components are taken as the first month or day, like in
+    :meth:`opencitations_client.models.Citation.parse_dates`.
+    """
+    lengths = ends - begins
+    # clip to the end of each field, so short fields don't reach past the buffer
+    years, valid = _parse_digits(buffer, begins, np.minimum(begins + 4, ends))
+    months, valid_months = _parse_digits(buffer, begins + 5, np.minimum(begins + 7, ends))
+    days, valid_days = _parse_digits(buffer, begins + 8, np.minimum(begins + 10, ends))
+    has_month = lengths >= 7
+    has_day = lengths == 10
+    months = np.where(has_month, months, 1)
+    days = np.where(has_day, days, 1)
+    last = len(buffer) - 1
+    valid &= (lengths == 4) | (lengths == 7) | has_day
+    valid &= ~has_month | (
+        (buffer[np.minimum(begins + 4, last)] == ord("-"))
+        & valid_months
+        & (1 <= months)
+        & (months <= 12)
+    )
+    valid &= ~has_day | ((buffer[np.minimum(begins + 7, last)] == ord("-")) & valid_days)
+    valid &= (1 <= years) & (years <= 9999)
+
+    month_starts = np.where(valid, (years - 1970) * 12 + months - 1, 0)
+    first_days = month_starts.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    next_first_days = (
+        (month_starts + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    )
+    valid &= (1 <= days) & (days <= next_first_days - first_days)
+    return np.where(valid, first_days + days - 1, MISSING).astype(np.int32)
+
+
+def _parse_timespans(buffer: np.ndarray, begins: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Parse ISO 8601 durations like ``P4Y3M15D`` or ``-P2M`` into signed numbers of days.
+
+    Years count as 365 days and months as 30 days, which is also how :mod:`pydantic`
+    converts the timespans returned by the API to :class:`datetime.timedelta`.
+    """
+    last = len(buffer) - 1
+    negative = (ends > begins) & (buffer[np.minimum(begins, last)] == ord("-"))
+    positions = begins + negative
+    valid = (positions < ends) & (buffer[np.minimum(positions, last)] == ord("P"))
+    positions = positions + 1
+    designators_start = positions
+    total = np.zeros(len(begins), dtype=np.int64)
+    for character, days in TIMESPAN_UNITS:
+        letters = np.flatnonzero(buffer == character)
+        indices = np.searchsorted(letters, positions)
+        letter_positions = letters[np.minimum(indices, len(letters) - 1)] if len(letters) else ends
+        found = (indices < len(letters)) & (letter_positions < ends)
+        values, valid_values = _parse_digits(
+            buffer, positions, np.where(found, letter_positions, positions)
+        )
+        valid &= ~found | valid_values
+        total += np.where(found, values * days, 0)
+        positions = np.where(found, letter_positions + 1, positions)
+    # everything must have been consumed, and there has to be at least one component
+    valid &= (positions == ends) & (positions > designators_start)
+    total = np.where(negative, -total, total)
+    valid &= np.abs(total) < np.iinfo(np.int32).max
+    return np.where(valid, total, MISSING).astype(np.int32)
+
+
+def _parse_flags(buffer: np.ndarray, begins: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Parse ``yes`` and ``no`` into 1 and 0, and anything else into -1."""
+    first = buffer[np.minimum(begins, len(buffer) - 1)]
+    non_empty = ends > begins
+    rv = np.full(len(begins), -1, dtype=np.int8)
+    rv[non_empty & (first == ord("y"))] = 1
+    rv[non_empty & (first == ord("n"))] = 0
+    return rv
 
 
 def ensure_source_nt() -> list[Path]:
@@ -3,37 +3,61 @@
 from __future__ import annotations
 
 import re
-from collections.abc import Iterator
-from typing import Literal, overload
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Literal, TypeVar, overload
 
 import pystow
 import requests
 from curies import Reference
-from ratelimit import limits, sleep_and_retry
+from requests.adapters import HTTPAdapter
+from requests.utils import requote_uri
+from tqdm import tqdm
 
 from .models import (
     Citation,
     CitationReturnType,
     Work,
-    get_reference_with_prefix,
+    get_identifier_from_curies,
     handle_input,
     process_citation,
     process_work,
 )
+from .rate_limit import get_rate_limiter
+from .response_cache import get_response_cache
+from .retry import get_retry_policy
+from .utils import iter_json_array
 from .version import get_version
 
 __all__ = [
     "get_articles",
     "get_articles_for_author",
     "get_articles_for_editor",
+    "get_articles_many",
     "get_incoming_citations_from_api",
+    "get_incoming_citations_from_api_many",
     "get_outgoing_citations_from_api",
+    "get_outgoing_citations_from_api_many",
+    "iter_incoming_citations_from_api",
+    "iter_outgoing_citations_from_api",
 ]
 
 META_V1 = "https://api.opencitations.net/meta/v1"
 BASE_V2 = "https://api.opencitations.net/index/v2"
 AGENT = f"python-opencitations-client v{get_version()}"
 
+#: The number of seconds to wait for the server to respond to a call
+TIMEOUT = 15
+
+#: The default number of threads for bulk lookups. The rate limit of 180 calls
+#: per minute is shared by all threads (see :mod:`opencitations_client.rate_limit`),
+#: so this only needs to be large enough to hide the latency of each call
+DEFAULT_MAX_WORKERS = 8
+
+X = TypeVar("X")
+
 
 # docstr-coverage:excused `overload`
 @overload
@@ -87,17 +111,7 @@ def get_outgoing_citations_from_api(
     reference = handle_input(reference)
     res = _get_index_v2(f"/references/{reference.curie}", token=token)
     res.raise_for_status()
-    citations: Iterator[Citation] = (process_citation(record) for record in res.json())
-    if return_type == "citation":
-        return list(citations)
-    references = (
-        incoming_reference
-        for citation in citations
-        if (incoming_reference := get_reference_with_prefix(citation.cited, reference.prefix))
-    )
-    if return_type == "reference":
-        return list(references)
-    return [r.identifier for r in references]
+    return _process_citations(res.json(), reference, return_type=return_type, outgoing=True)
 
 
 # docstr-coverage:excused `overload`
@@ -152,21 +166,349 @@ def get_incoming_citations_from_api(
     reference = handle_input(reference)
     res = _get_index_v2(f"/citations/{reference.curie}", token=token)
     res.raise_for_status()
-    citations = [process_citation(record) for record in res.json()]
+    return _process_citations(res.json(), reference, return_type=return_type, outgoing=False)
+
+
+#: The default size of the chunks in which response bodies are streamed, in bytes
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"],
+    chunk_size: int = ...,
+) -> Iterator[str]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"],
+    chunk_size: int = ...,
+) -> Iterator[Reference]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    chunk_size: int = ...,
+) -> Iterator[Citation]: ...
+
+
+def iter_outgoing_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Citation] | Iterator[Reference] | Iterator[str]:
+    """Iterate over the articles that the given article cites, as they're downloaded.
+
+    Unlike :func:`get_outgoing_citations_from_api`, the response is decoded
+    incrementally while it's streamed, so memory use doesn't grow with the number of
+    citations. Streamed responses aren't stored in the response cache, but a fresh
+    response that's already in it is used.
+
+    :param reference: The reference to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param chunk_size: The number of bytes of the response to read at a time
+    :return: An iterator of citations
+
+    .. seealso::
+
+        https://api.opencitations.net/index/v2#/references/{id}
+    """
+    reference = handle_input(reference)
+    records = _iter_index_v2(f"/references/{reference.curie}", token=token, chunk_size=chunk_size)
+    return _iter_processed_citations(records, reference, return_type=return_type, outgoing=True)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"],
+    chunk_size: int = ...,
+) -> Iterator[str]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"],
+    chunk_size: int = ...,
+) -> Iterator[Reference]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def iter_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    chunk_size: int = ...,
+) -> Iterator[Citation]: ...
+
+
+def iter_incoming_citations_from_api(
+    reference: str | Reference,
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Citation] | Iterator[Reference] | Iterator[str]:
+    """Iterate over the articles that cite a given article, as they're downloaded.
+
+    Unlike :func:`get_incoming_citations_from_api`, the response is decoded
+    incrementally while it's streamed, so memory use doesn't grow with the number of
+    citations, and the first citations are available before the whole response is
+    downloaded. This is useful for highly cited articles. Streamed responses aren't
+    stored in the response cache, but a fresh response that's already in it is used.
+
+    :param reference: The reference to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param chunk_size: The number of bytes of the response to read at a time
+    :return: An iterator of citations
+
+    .. seealso::
+
+        https://api.opencitations.net/index/v2#/citations/{id}
+    """
+    reference = handle_input(reference)
+    records = _iter_index_v2(f"/citations/{reference.curie}", token=token, chunk_size=chunk_size)
+    return _iter_processed_citations(records, reference, return_type=return_type, outgoing=False)
+
+
+def _process_citations(
+    records: Iterable[dict[str, Any]],
+    reference: Reference,
+    *,
+    return_type: CitationReturnType,
+    outgoing: bool,
+) -> list[Citation] | list[Reference] | list[str]:
+    """Process citation records from the API, for either outgoing or incoming citations."""
+    return list(  # type:ignore[return-value]
+        _iter_processed_citations(records, reference, return_type=return_type, outgoing=outgoing)
+    )
+
+
+def _iter_processed_citations(
+    records: Iterable[dict[str, Any]],
+    reference: Reference,
+    *,
+    return_type: CitationReturnType,
+    outgoing: bool,
+) -> Iterator[Citation] | Iterator[Reference] | Iterator[str]:
+    """Lazily process citation records from the API.
+
+    If only identifiers are needed, they're taken directly from the CURIEs in each
+    record, without constructing (and validating) a citation for it.
+    """
     if return_type == "citation":
-        return citations
-    references = (
-        incoming_reference
-        for citation in citations
-        if (incoming_reference := get_reference_with_prefix(citation.citing, reference.prefix))
+        return (process_citation(record) for record in records)
+    key = "cited" if outgoing else "citing"
+    identifiers = (
+        identifier
+        for record in records
+        if (identifier := get_identifier_from_curies(record[key], reference.prefix))
     )
     if return_type == "reference":
-        return list(references)
-    return [r.identifier for r in references]
+        # the prefix comes from the validated query reference, so skip validating again
+        prefix = reference.prefix
+        return (Reference.model_construct(prefix=prefix, identifier=i) for i in identifiers)
+    return identifiers
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[str]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[Reference]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_outgoing_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[Citation]]: ...
+
+
+def get_outgoing_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress: bool = False,
+) -> (
+    dict[Reference, list[Citation]] | dict[Reference, list[Reference]] | dict[Reference, list[str]]
+):
+    """Get the articles that each of the given articles cite, from OpenCitations.
+
+    :param references: The references to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param max_workers: The number of threads making calls concurrently
+    :param progress: Should a progress bar be shown?
+    :return: A dictionary from each (normalized) reference to a list of citations
+
+    .. seealso:: :func:`get_outgoing_citations_from_api`
+    """
+    func = partial(get_outgoing_citations_from_api, token=token, return_type=return_type)
+    return _map_many(func, references, max_workers=max_workers, progress=progress)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["str"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[str]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["reference"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[Reference]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_incoming_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = ...,
+    return_type: Literal["citation"] = ...,
+    max_workers: int = ...,
+    progress: bool = ...,
+) -> dict[Reference, list[Citation]]: ...
+
+
+def get_incoming_citations_from_api_many(
+    references: Iterable[str | Reference],
+    *,
+    token: str | None = None,
+    return_type: CitationReturnType = "citation",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress: bool = False,
+) -> (
+    dict[Reference, list[Citation]] | dict[Reference, list[Reference]] | dict[Reference, list[str]]
+):
+    """Get the articles that cite each of the given articles, from OpenCitations.
+
+    :param references: The references to get citations for
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param return_type: The return type for citations. If using references or strings,
+        will filter by the same prefix as the query reference
+    :param max_workers: The number of threads making calls concurrently
+    :param progress: Should a progress bar be shown?
+    :return: A dictionary from each (normalized) reference to a list of citations
+
+    .. seealso:: :func:`get_incoming_citations_from_api`
+    """
+    func = partial(get_incoming_citations_from_api, token=token, return_type=return_type)
+    return _map_many(func, references, max_workers=max_workers, progress=progress)
+
+
+def _map_many(
+    func: Callable[[str | Reference], X],
+    references: Iterable[str | Reference],
+    *,
+    max_workers: int,
+    progress: bool,
+) -> dict[Reference, X]:
+    """Apply a function that makes API calls to many references, in a pool of threads."""
+    # deduplicate on the normalized reference, so each reference is only looked up once
+    unique_references = {handle_input(reference): reference for reference in references}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = tqdm(
+            executor.map(func, unique_references.values()),
+            total=len(unique_references),
+            unit="reference",
+            disable=not progress,
+        )
+        return dict(zip(unique_references, results, strict=True))
 
 
 def _get_index_v2(part: str, *, token: str | None = None) -> requests.Response:
-    return _get(f"{BASE_V2}/{part.lstrip('/')}", token=token)
+    return _get_cached(f"{BASE_V2}/{part.lstrip('/')}", token=token)
+
+
+def _iter_index_v2(
+    part: str, *, token: str | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Any]:
+    """Iterate over the records in a response, streaming it unless it's cached."""
+    url = f"{BASE_V2}/{part.lstrip('/')}"
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        token = _get_token(token)
+        cached = response_cache.get(url, token=token)
+        if cached is not None and response_cache.is_fresh(cached):
+            response_cache.record_hit()
+            yield from iter_json_array([cached.content])
+            return
+        response_cache.record_miss()
+    with _get(url, token=token, stream=True) as res:
+        res.raise_for_status()
+        yield from iter_json_array(res.iter_content(chunk_size))
 
 
 METADATA_ID_RE = re.compile(
@@ -176,24 +518,112 @@ METADATA_ID_RE = re.compile(
 ALLOWED_ARTICLE_PREFIXES = {"doi", "issn", "isbn", "omid", "openalex", "pmid", "pmcid"}
 
 
-def get_articles(references: list[Reference], *, token: str | None = None) -> list[Work]:
+#: The maximum length of a URL for the Meta API. Servers commonly reject request lines
+#: longer than 8 KiB, so this leaves some room for the rest of the request line
+MAX_URL_LENGTH = 8_000
+
+
+def get_articles(
+    references: list[Reference],
+    *,
+    token: str | None = None,
+    max_url_length: int = MAX_URL_LENGTH,
+) -> list[Work]:
     """Get documents by reference.
 
     :param references: A list of references to articles, using
     :param token: The token to use for authentication.
         Loaded via :func:`pystow.get_config` if not given explicitly
+    :param max_url_length: The maximum length of the URL for a call. If the references
+        don't fit in one call, they're split over several.
     :return: A list of articles for the references
 
-    .. seealso:: https://api.opencitations.net/meta/v1#/metadata/{ids}
+    .. seealso::
+
+        - https://api.opencitations.net/meta/v1#/metadata/{ids}
+        - :func:`get_articles_many`, which makes calls concurrently and associates
+          each reference with its article
     """
-    invalid_references = [
-        reference for reference in references if reference.prefix not in ALLOWED_ARTICLE_PREFIXES
+    _raise_for_invalid_articles(references)
+    return [
+        work
+        for batch in _pack_references(references, max_url_length=max_url_length)
+        for work in _get_articles_batch(batch, token=token)
     ]
-    if invalid_references:
-        raise ValueError(f"invalid references: {invalid_references}")
 
-    value = "__".join(reference.curie for reference in references)
-    res = _get_meta_v1(f"/metadata/{value}", token=token)
+
+def get_articles_many(
+    references: Iterable[Reference],
+    *,
+    token: str | None = None,
+    max_url_length: int = MAX_URL_LENGTH,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress: bool = False,
+) -> dict[Reference, Work | None]:
+    """Get documents for many references, using as few calls as possible.
+
+    The references are packed into as few calls to the metadata endpoint as the maximum
+    URL length allows, which are made concurrently.
+
+    :param references: References to articles
+    :param token: The token to use for authentication.
+        Loaded via :func:`pystow.get_config` if not given explicitly
+    :param max_url_length: The maximum length of the URL for a call
+    :param max_workers: The number of threads making calls concurrently
+    :param progress: Should a progress bar be shown?
+    :return: A dictionary from each reference to its article, or none if OpenCitations
+        doesn't have an article for it
+
+    .. seealso:: https://api.opencitations.net/meta/v1#/metadata/{ids}
+    """
+    unique_references = list(dict.fromkeys(references))
+    _raise_for_invalid_articles(unique_references)
+    batches = _pack_references(unique_references, max_url_length=max_url_length)
+    works: dict[tuple[str, str], Work] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_works in tqdm(
+            executor.map(partial(_get_articles_batch, token=token), batches),
+            total=len(batches),
+            unit="call",
+            disable=not progress,
+        ):
+            for work in batch_works:
+                for reference in work.references:
+                    works[_get_article_key(reference)] = work
+    return {reference: works.get(_get_article_key(reference)) for reference in unique_references}
+
+
+def _get_article_key(reference: Reference) -> tuple[str, str]:
+    # DOIs are case-insensitive, and OpenCitations normalizes them to lowercase
+    if reference.prefix == "doi":
+        return reference.prefix, reference.identifier.lower()
+    return reference.prefix, reference.identifier
+
+
+def _pack_references(
+    references: list[Reference], *, max_url_length: int = MAX_URL_LENGTH
+) -> list[list[Reference]]:
+    """Pack references into as few batches as possible, whose URLs are short enough."""
+    budget = max_url_length - len(f"{META_V1}/metadata/")
+    batches: list[list[Reference]] = []
+    batch: list[Reference] = []
+    length = 0
+    for reference in references:
+        # the length after percent-encoding, plus the separator
+        reference_length = len(requote_uri(reference.curie)) + (2 if batch else 0)
+        if batch and length + reference_length > budget:
+            batches.append(batch)
+            batch, length = [], 0
+            reference_length -= 2
+        batch.append(reference)
+        length += reference_length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _get_articles_batch(references: list[Reference], *, token: str | None = None) -> list[Work]:
+    res = _get_meta_v1(_get_articles_part(references), token=token)
     res.raise_for_status()
     return [process_work(record) for record in res.json()]
 
@@ -230,6 +660,20 @@ def get_articles_for_editor(reference: Reference, *, token: str | None = None) -
     return [process_work(record) for record in res.json()]
 
 
+def _raise_for_invalid_articles(references: list[Reference]) -> None:
+    invalid_references = [
+        reference for reference in references if reference.prefix not in ALLOWED_ARTICLE_PREFIXES
+    ]
+    if invalid_references:
+        raise ValueError(f"invalid references: {invalid_references}")
+
+
+def _get_articles_part(references: list[Reference]) -> str:
+    _raise_for_invalid_articles(references)
+    value = "__".join(reference.curie for reference in references)
+    return f"/metadata/{value}"
+
+
 def _raise_for_invalid_person(reference: Reference) -> None:
     if reference.prefix == "omid":
         if not reference.identifier.startswith("ra/"):
@@ -241,11 +685,75 @@ def _raise_for_invalid_person(reference: Reference) -> None:
 
 
 def _get_meta_v1(part: str, *, token: str | None = None) -> requests.Response:
-    return _get(f"{META_V1}/{part.lstrip('/')}", token=token)
-
-
-@sleep_and_retry
-@limits(calls=180, period=60)  # the OpenCitations team told me 180 calls per minute
-def _get(url: str, *, token: str | None = None) -> requests.Response:
-    token = pystow.get_config("opencitations", "token", passthrough=token, raise_on_missing=True)
-    return requests.get(url, headers={"authorization": token, "User-Agent": AGENT}, timeout=15)
+    return _get_cached(f"{META_V1}/{part.lstrip('/')}", token=token)
+
+
+@lru_cache(1)
+def _get_session() -> requests.Session:
+    """Get a session that keeps connections to the API alive, shared between threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=DEFAULT_MAX_WORKERS * 2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = AGENT
+    return session
+
+
+def _get_cached(url: str, *, token: str | None = None) -> requests.Response:
+    """Get a response from the response cache, or make a call and cache its response."""
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return _get(url, token=token)
+    # responses are cached per token, since they might differ between users
+    token = _get_token(token)
+    cached = response_cache.get(url, token=token)
+    if cached is not None and response_cache.is_fresh(cached):
+        response_cache.record_hit()
+        return cached.to_response()
+    res = _get(url, token=token, headers=cached.get_validators() if cached else None)
+    if cached is not None and res.status_code == 304:
+        response_cache.record_revalidation()
+        response_cache.refresh(url, token=token)
+        return cached.to_response()
+    response_cache.record_miss()
+    if res.status_code == 200:
+        response_cache.set(url, res, token=token)
+    return res
+
+
+def _get_token(token: str | None) -> str:
+    rv: str = pystow.get_config("opencitations", "token", passthrough=token, raise_on_missing=True)
+    return rv
+
+
+def _get(
+    url: str,
+    *,
+    token: str | None = None,
+    headers: dict[str, str] | None = None,
+    stream: bool = False,
+) -> requests.Response:
+    """Make a call, retrying it if it fails transiently (see :mod:`.retry`)."""
+    token = _get_token(token)
+    headers = {**(headers or {}), "authorization": token}
+    retry_policy = get_retry_policy()
+    attempt = 0
+    while True:
+        # the OpenCitations team told me 180 calls per minute, see rate_limit.py
+        get_rate_limiter().acquire()
+        if (pacing := retry_policy.reserve()) > 0:
+            time.sleep(pacing)
+        try:
+            res = _get_session().get(url, headers=headers, timeout=TIMEOUT, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            if (delay := retry_policy.get_delay(attempt)) is None:
+                raise
+        else:
+            delay = retry_policy.get_delay(
+                attempt, status=res.status_code, retry_after=res.headers.get("Retry-After")
+            )
+            if delay is None:
+                return res
+            res.close()
+        time.sleep(delay)
+        attempt += 1
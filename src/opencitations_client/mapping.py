@@ -0,0 +1,388 @@
+"""Compact, array-backed mappings between OMIDs and external identifiers.
+
+OpenCitations Meta assigns every bibliographic resource an OMID like ``br/0612058700``.
+The part after ``br/0`` is numeric, so OMIDs can be stored as 64-bit integers. External
+identifiers (e.g., DOIs) are interned into a sorted string table that is backed by a
+single byte heap and an array of offsets, so lookups in either direction are binary
+searches over NumPy arrays instead of lookups in dictionaries of Python strings.
+
+Mappings can be saved to a directory of ``.npy`` files and loaded back with memory
+mapping, so opening a mapping is instant and its pages are shared between processes
+through the operating system's page cache.
+"""
+
+from __future__ import annotations
+
+import array
+import heapq
+import itertools
+import shutil
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+from tqdm import tqdm
+
+__all__ = [
+    "OMIDMapping",
+    "StringTable",
+    "format_omid",
+    "parse_omid",
+]
+
+OMID_PREFIX = "br/0"
+ARRAY_NAMES = ("omids", "omid_to_index", "heap", "offsets", "index_to_omid")
+#: The number of pairs that are sorted at a time when building a mapping
+CHUNK_SIZE = 1_000_000
+#: The number of keys of a sorted chunk that are converted to Python objects at a time
+ITERATION_SIZE = 10_000
+
+
+def parse_omid(omid: str) -> int:
+    """Parse a bibliographic resource OMID into an integer.
+
+    :param omid: An OMID local unique identifier, like ``br/0612058700``
+    :return: The integer part of the OMID, like ``612058700``
+    :raises ValueError: If the OMID can't be losslessly represented as an integer
+
+    >>> parse_omid("br/0612058700")
+    612058700
+    """
+    if not omid.startswith(OMID_PREFIX):
+        raise ValueError(f"not a bibliographic resource OMID: {omid}")
+    suffix = omid[len(OMID_PREFIX) :]
+    # the supplier prefix never starts with a zero, so the
+    # integer can be losslessly turned back into a string
+    if not suffix.isdigit() or suffix.startswith("0"):
+        raise ValueError(f"invalid OMID: {omid}")
+    return int(suffix)
+
+
+def format_omid(value: int) -> str:
+    """Format an integer as a bibliographic resource OMID.
+
+    >>> format_omid(612058700)
+    'br/0612058700'
+    """
+    return f"{OMID_PREFIX}{value}"
+
+
+class StringTable:
+    """A sorted table of unique strings, stored as a UTF-8 byte heap with offsets."""
+
+    def __init__(self, heap: np.ndarray, offsets: np.ndarray) -> None:
+        """Construct a string table.
+
+        :param heap: A one-dimensional array of bytes (``uint8``) containing the
+            concatenated UTF-8 encoded strings, in sorted order
+        :param offsets: A one-dimensional array of ``int64`` with one more element than
+            there are strings, where the i-th string spans ``heap[offsets[i]:offsets[i +
+            1]]``
+        """
+        self.heap = heap
+        self.offsets = offsets
+
+    @classmethod
+    def from_sorted(cls, strings: Iterable[str]) -> StringTable:
+        """Construct a string table from strings that are already sorted and unique."""
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        np.cumsum(lengths, out=offsets[1:])
+        heap = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(heap, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self._get_bytes(index).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        """Get an array of strings for an array of positions, decoding each distinct one once."""
+        unique, inverse = np.unique(indices, return_inverse=True)
+        strings = np.array([self[index] for index in unique.tolist()], dtype=object)
+        return strings[inverse].reshape(indices.shape)
+
+    def _get_bytes(self, index: int) -> bytes:
+        return self.heap[self.offsets[index] : self.offsets[index + 1]].tobytes()
+
+    def index(self, value: str) -> int | None:
+        """Get the position of the string in the table using binary search, if it's present."""
+        key = value.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self._get_bytes(low) == key:
+            return low
+        return None
+
+
+class OMIDMapping:
+    """A compact, bidirectional mapping between OMIDs and external identifiers.
+
+    If an OMID appears with several external identifiers (or vice versa), the last one
+    wins, the same way as when constructing a dictionary.
+    """
+
+    def __init__(
+        self,
+        omids: np.ndarray,
+        omid_to_index: np.ndarray,
+        table: StringTable,
+        index_to_omid: np.ndarray,
+    ) -> None:
+        """Construct a mapping.
+
+        :param omids: A sorted array of integer OMIDs (see :func:`parse_omid`)
+        :param omid_to_index: An array aligned to ``omids`` containing the position of the
+            corresponding external identifier in ``table``
+        :param table: A sorted table of external identifiers
+        :param index_to_omid: An array aligned to ``table`` containing the integer OMID
+            corresponding to each external identifier
+        """
+        self.omids = omids
+        self.omid_to_index = omid_to_index
+        self.table = table
+        self.index_to_omid = index_to_omid
+
+    @classmethod
+    def from_pairs(
+        cls, pairs: Iterable[Sequence[str]], *, chunk_size: int = CHUNK_SIZE
+    ) -> OMIDMapping:
+        """Construct a mapping from pairs of OMIDs and external identifiers.
+
+        The pairs are read in chunks, each of which is sorted and packed into a byte
+        heap, and the chunks are then merged into the string table. This way, only one
+        chunk of the pairs is ever held as Python objects.
+
+        :param pairs: Pairs of OMIDs and external identifiers
+        :param chunk_size: The number of pairs to sort at a time
+        :return: A mapping
+        """
+        chunks: list[tuple[bytes, np.ndarray, np.ndarray]] = []
+        omid_parts: list[np.ndarray] = []
+        count = 0
+        parsed_pairs = _iter_parsed_pairs(pairs)
+        while batch := list(itertools.islice(parsed_pairs, chunk_size)):
+            omid_parts.append(np.fromiter((omid for omid, _ in batch), dtype=np.int64))
+            keys = [external.encode("utf-8") for _, external in batch]
+            del batch
+            # a stable sort, so that later pairs come after earlier ones with the same key
+            positions = sorted(range(len(keys)), key=keys.__getitem__)
+            sorted_keys = [keys[i] for i in positions]
+            del keys
+            offsets = np.zeros(len(sorted_keys) + 1, dtype=np.int64)
+            np.cumsum([len(key) for key in sorted_keys], out=offsets[1:])
+            sequence = count + np.array(positions, dtype=np.int64)
+            chunks.append((b"".join(sorted_keys), offsets, sequence))
+            count += len(positions)
+        pair_omids = np.concatenate(omid_parts) if omid_parts else np.empty(0, dtype=np.int64)
+        del omid_parts
+
+        # merge the chunks to intern the external identifiers into a sorted table of
+        # unique strings, where the last pair for each one decides its OMID
+        heap = bytearray()
+        table_offsets = array.array("q", [0])
+        merged_sequence = array.array("q")
+        merged_index = array.array("q")
+        last_sequence = array.array("q")
+        previous_key: bytes | None = None
+        for key, position in heapq.merge(*(_iter_chunk(*chunk) for chunk in chunks)):
+            if key != previous_key:
+                if previous_key is not None:
+                    last_sequence.append(merged_sequence[-1])
+                heap += key
+                table_offsets.append(len(heap))
+                previous_key = key
+            merged_sequence.append(position)
+            merged_index.append(len(table_offsets) - 2)
+        if previous_key is not None:
+            last_sequence.append(merged_sequence[-1])
+        del chunks
+        table = StringTable(
+            np.frombuffer(heap, dtype=np.uint8), np.frombuffer(table_offsets, dtype=np.int64)
+        )
+        pair_to_index = np.empty(count, dtype=np.int64)
+        pair_to_index[np.frombuffer(merged_sequence, dtype=np.int64)] = np.frombuffer(
+            merged_index, dtype=np.int64
+        )
+        del merged_sequence, merged_index
+        index_to_omid = pair_omids[np.frombuffer(last_sequence, dtype=np.int64)]
+
+        # sort the OMIDs, keeping the last occurrence of each
+        order = np.argsort(pair_omids, kind="stable")
+        sorted_omids = pair_omids[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = sorted_omids[1:] != sorted_omids[:-1]
+        return cls(
+            omids=sorted_omids[is_last],
+            omid_to_index=pair_to_index[order[is_last]],
+            table=table,
+            index_to_omid=index_to_omid,
+        )
+
+    def save(self, directory: str | Path) -> None:
+        """Save the mapping as a directory of ``.npy`` files.
+
+        The arrays are first written to a temporary sibling directory which is then
+        renamed, so an interrupted save never leaves a partial mapping behind.
+        """
+        directory = Path(directory)
+        temporary = directory.with_name(f"{directory.name}.tmp")
+        if temporary.exists():
+            shutil.rmtree(temporary)
+        temporary.mkdir(parents=True)
+        for name, values in self._get_arrays().items():
+            np.save(temporary.joinpath(f"{name}.npy"), values)
+        if directory.exists():
+            shutil.rmtree(directory)
+        temporary.rename(directory)
+
+    @classmethod
+    def load(cls, directory: str | Path, *, mmap: bool = True) -> OMIDMapping:
+        """Load a mapping that was written with :meth:`save`.
+
+        :param directory: The directory containing the mapping's arrays
+        :param mmap: Should the arrays be memory mapped instead of read into memory?
+        :return: A mapping
+        """
+        directory = Path(directory)
+        mmap_mode: Literal["r"] | None = "r" if mmap else None
+        arrays = {
+            name: np.load(directory.joinpath(f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        return cls(
+            omids=arrays["omids"],
+            omid_to_index=arrays["omid_to_index"],
+            table=StringTable(heap=arrays["heap"], offsets=arrays["offsets"]),
+            index_to_omid=arrays["index_to_omid"],
+        )
+
+    @staticmethod
+    def exists(directory: str | Path) -> bool:
+        """Check if a mapping has been saved in the given directory."""
+        directory = Path(directory)
+        return all(directory.joinpath(f"{name}.npy").is_file() for name in ARRAY_NAMES)
+
+    def _get_arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "omids": self.omids,
+            "omid_to_index": self.omid_to_index,
+            "heap": self.table.heap,
+            "offsets": self.table.offsets,
+            "index_to_omid": self.index_to_omid,
+        }
+
+    def get_external(self, omid: str) -> str | None:
+        """Get the external identifier for the given OMID, if available."""
+        try:
+            omid_value = parse_omid(omid)
+        except ValueError:
+            return None
+        position = self._search_omid(omid_value)
+        if position is None:
+            return None
+        return self.table[self.omid_to_index[position]]
+
+    def get_omid(self, external: str) -> str | None:
+        """Get the OMID for the given external identifier, if available."""
+        index = self.table.index(external)
+        if index is None:
+            return None
+        return format_omid(self.index_to_omid[index])
+
+    def get_external_indices(self, omid_values: np.ndarray) -> np.ndarray:
+        """Look up many integer OMIDs at once.
+
+        :param omid_values: An array of integer OMIDs (see :func:`parse_omid`)
+        :return: An array of the same shape containing the position of each OMID's
+            external identifier in :attr:`table`, or -1 if it doesn't have one. Use
+            :meth:`StringTable.take` to get the external identifiers themselves.
+        """
+        if len(self.omids) == 0:
+            return np.full(omid_values.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self.omids, omid_values)
+        np.minimum(positions, len(self.omids) - 1, out=positions)
+        found = self.omids[positions] == omid_values
+        return np.where(found, self.omid_to_index[positions], -1)
+
+    def _search_omid(self, omid_value: int) -> int | None:
+        position = int(np.searchsorted(self.omids, omid_value))
+        if position < len(self.omids) and self.omids[position] == omid_value:
+            return position
+        return None
+
+    @property
+    def forward(self) -> Mapping[str, str]:
+        """Get a read-only view from OMIDs to external identifiers."""
+        return _ForwardView(self)
+
+    @property
+    def backward(self) -> Mapping[str, str]:
+        """Get a read-only view from external identifiers to OMIDs."""
+        return _BackwardView(self)
+
+
+def _iter_parsed_pairs(pairs: Iterable[Sequence[str]]) -> Iterator[tuple[int, str]]:
+    for omid, external in pairs:
+        try:
+            omid_value = parse_omid(omid)
+        except ValueError:
+            tqdm.write(f"skipping invalid OMID: {omid}")
+            continue
+        yield omid_value, external
+
+
+def _iter_chunk(
+    heap: bytes, offsets: np.ndarray, sequence: np.ndarray
+) -> Iterator[tuple[bytes, int]]:
+    """Iterate over the keys of a sorted chunk, with the position of their pair."""
+    for start in range(0, len(sequence), ITERATION_SIZE):
+        # convert the arrays a bit at a time, so they're never all Python integers
+        chunk_offsets = offsets[start : start + ITERATION_SIZE + 1].tolist()
+        for i, position in enumerate(sequence[start : start + ITERATION_SIZE].tolist()):
+            yield heap[chunk_offsets[i] : chunk_offsets[i + 1]], position
+
+
+class _ForwardView(Mapping[str, str]):
+    def __init__(self, mapping: OMIDMapping) -> None:
+        self.mapping = mapping
+
+    def __getitem__(self, omid: str) -> str:
+        if (rv := self.mapping.get_external(omid)) is None:
+            raise KeyError(omid)
+        return rv
+
+    def __iter__(self) -> Iterator[str]:
+        for omid_value in self.mapping.omids:
+            yield format_omid(omid_value)
+
+    def __len__(self) -> int:
+        return len(self.mapping.omids)
+
+
+class _BackwardView(Mapping[str, str]):
+    def __init__(self, mapping: OMIDMapping) -> None:
+        self.mapping = mapping
+
+    def __getitem__(self, external: str) -> str:
+        if (rv := self.mapping.get_omid(external)) is None:
+            raise KeyError(external)
+        return rv
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.mapping.table
+
+    def __len__(self) -> int:
+        return len(self.mapping.table)
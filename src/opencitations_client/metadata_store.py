@@ -0,0 +1,226 @@
+"""A local store of article metadata, for looking up works without the Meta API.
+
+The metadata dump is loaded into a SQLite database with two tables. ``works`` holds
+each row of the dump, keyed by its integer OMID (see
+:func:`opencitations_client.mapping.parse_omid`), and ``identifiers`` maps every
+identifier in each row's ``id`` column, including its OMID, to the row. Since the rows
+are stored as they appear in the dump, works are parsed the same way as by
+:func:`opencitations_client.download.iter_metadata`.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from curies import Reference
+
+from .mapping import parse_omid
+from .models import Work, process_work
+
+__all__ = [
+    "MetadataStore",
+]
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS works (omid INTEGER PRIMARY KEY, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS identifiers (
+    prefix TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    omid INTEGER NOT NULL,
+    PRIMARY KEY (prefix, identifier)
+) WITHOUT ROWID;
+"""
+
+#: The table that identifiers are loaded into, in the order of the dump, before they're
+#: sorted into the ``identifiers`` table. Inserting into a table with a primary key in
+#: random order is slow for large tables, since every insert touches a random page.
+STAGING_SCHEMA = """\
+CREATE TABLE staging.identifiers (
+    prefix TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    omid INTEGER NOT NULL
+);
+"""
+
+#: The number of parameters per query, which is below SQLite's default limit
+BATCH_SIZE = 500
+#: The number of rows to insert at a time when building the store
+INSERT_SIZE = 10_000
+
+
+def get_identifier_key(prefix: str, identifier: str) -> tuple[str, str]:
+    """Get the key for an identifier in the store.
+
+    DOIs are case-insensitive, and OpenCitations normalizes them to lowercase.
+    """
+    if prefix == "doi":
+        return prefix, identifier.lower()
+    return prefix, identifier
+
+
+class MetadataStore:
+    """Random access to the works in the metadata dump, by OMID or external identifier."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open a metadata store.
+
+        :param path: The path to the SQLite database, built by :meth:`build`
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        with self._lock:
+            (header,) = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = 'header'"
+            ).fetchone()
+        self.header: list[str] = json.loads(header)
+
+    @classmethod
+    def build(
+        cls, path: str | Path, header: Sequence[str], rows: Iterable[Sequence[str]]
+    ) -> MetadataStore:
+        """Build a metadata store from rows of the metadata dump.
+
+        The database is written to a temporary file next to the path, which is moved
+        into place when it's complete. Identifiers are first loaded into a separate
+        temporary database, and then copied into the store in sorted order.
+
+        :param path: The path to the SQLite database
+        :param header: The names of the columns in the metadata dump
+        :param rows: Rows of the metadata dump. Rows without a valid OMID are skipped.
+        :return: The metadata store
+        """
+        path = Path(path)
+        temporary_path = path.with_name(f"{path.name}.partial")
+        staging_path = path.with_name(f"{path.name}.identifiers.partial")
+        temporary_path.unlink(missing_ok=True)
+        staging_path.unlink(missing_ok=True)
+        id_position = list(header).index("id")
+        connection = sqlite3.connect(temporary_path)
+        try:
+            connection.execute("ATTACH DATABASE ? AS staging", (str(staging_path),))
+            connection.executescript(
+                "PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;"
+                "PRAGMA staging.journal_mode = OFF; PRAGMA staging.synchronous = OFF;"
+                + SCHEMA
+                + STAGING_SCHEMA
+            )
+            connection.execute(
+                "INSERT INTO metadata VALUES ('header', ?)", (json.dumps(list(header)),)
+            )
+            works: list[tuple[int, str]] = []
+            identifiers: list[tuple[str, str, int]] = []
+            for row in rows:
+                omid, keys = _get_identifiers(row[id_position])
+                if omid is None:
+                    continue
+                works.append((omid, json.dumps(list(row))))
+                identifiers.extend((prefix, identifier, omid) for prefix, identifier in keys)
+                if len(works) >= INSERT_SIZE:
+                    _insert(connection, works, identifiers)
+            _insert(connection, works, identifiers)
+            # sorting by the primary key fills the table's pages in order, and sorting
+            # duplicates by their position in the dump means the last one is kept
+            connection.execute(
+                "INSERT OR REPLACE INTO main.identifiers "
+                "SELECT prefix, identifier, omid FROM staging.identifiers "
+                "ORDER BY prefix, identifier, rowid"
+            )
+            connection.commit()
+            connection.execute("DETACH DATABASE staging")
+        finally:
+            connection.close()
+            staging_path.unlink(missing_ok=True)
+        temporary_path.replace(path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM works").fetchone()
+        return int(count)
+
+    def get_omids(self, references: Iterable[Reference]) -> dict[Reference, int]:
+        """Get the integer OMIDs for references, skipping ones that aren't in the store."""
+        keys = {
+            reference: get_identifier_key(reference.prefix, reference.identifier)
+            for reference in references
+        }
+        found: dict[tuple[str, str], int] = {}
+        unique_keys = list(dict.fromkeys(keys.values()))
+        with self._lock:
+            for start in range(0, len(unique_keys), BATCH_SIZE):
+                batch = unique_keys[start : start + BATCH_SIZE]
+                values = ", ".join("(?, ?)" for _ in batch)
+                query = f"SELECT * FROM identifiers WHERE (prefix, identifier) IN (VALUES {values})"  # noqa:S608
+                found.update(
+                    ((prefix, identifier), omid)
+                    for prefix, identifier, omid in self._connection.execute(
+                        query, [part for key in batch for part in key]
+                    )
+                )
+        return {reference: found[key] for reference, key in keys.items() if key in found}
+
+    def get_records(self, omids: Iterable[int]) -> dict[int, dict[str, str]]:
+        """Get the rows of the metadata dump for integer OMIDs, as dictionaries."""
+        unique_omids = list(dict.fromkeys(omids))
+        rv = {}
+        with self._lock:
+            for start in range(0, len(unique_omids), BATCH_SIZE):
+                batch = unique_omids[start : start + BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                for omid, record in self._connection.execute(
+                    f"SELECT omid, record FROM works WHERE omid IN ({placeholders})",  # noqa:S608
+                    batch,
+                ):
+                    rv[omid] = dict(zip(self.header, json.loads(record), strict=True))
+        return rv
+
+    def get_works(self, references: Iterable[Reference]) -> dict[Reference, Work | None]:
+        """Get works for references.
+
+        :param references: References to articles, using any identifier that appears in
+            the ``id`` column of the metadata dump, like ``omid``, ``doi``, or ``pmid``
+        :return: A dictionary from each reference to its work, or none if the store
+            doesn't have a work for it
+        """
+        references = list(dict.fromkeys(references))
+        omids = self.get_omids(references)
+        records = self.get_records(omids.values())
+        works = {omid: process_work(record) for omid, record in records.items()}
+        return {reference: works.get(omids.get(reference, -1)) for reference in references}
+
+
+def _insert(
+    connection: sqlite3.Connection,
+    works: list[tuple[int, str]],
+    identifiers: list[tuple[str, str, int]],
+) -> None:
+    """Insert rows into the store, and clear them from the lists."""
+    connection.executemany("INSERT OR REPLACE INTO works VALUES (?, ?)", works)
+    connection.executemany("INSERT INTO staging.identifiers VALUES (?, ?, ?)", identifiers)
+    works.clear()
+    identifiers.clear()
+
+
+def _get_identifiers(curies: str) -> tuple[int | None, list[tuple[str, str]]]:
+    """Get the integer OMID and all keys for the identifiers in a row's ``id`` column."""
+    omid = None
+    identifiers = []
+    for curie in curies.split():
+        prefix, _, identifier = curie.partition(":")
+        if not identifier:
+            continue
+        if prefix == "omid":
+            try:
+                omid = parse_omid(identifier)
+            except ValueError:
+                continue
+        identifiers.append(get_identifier_key(prefix, identifier))
+    return omid, identifiers
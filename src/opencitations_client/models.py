@@ -3,10 +3,10 @@
 from __future__ import annotations
 
 import datetime
-from collections.abc import Iterable
-from typing import Any, Literal, TypeAlias, TypeVar
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any, Generic, Literal, TypeAlias, TypeVar, overload
 
-from curies import Reference
+from curies import Prefix, Reference
 from curies.utils import NoCURIEDelimiterError
 from pydantic import BaseModel, Field, field_validator
 from tqdm import tqdm
@@ -14,6 +14,7 @@ from tqdm import tqdm
 __all__ = [
     "Citation",
     "CitationReturnType",
+    "LazyWork",
     "Person",
     "Publisher",
     "Venue",
@@ -131,6 +132,22 @@ def _process_curies(s: str) -> list[Reference]:
     return [Reference.from_curie(curie) for curie in s.split(" ")]
 
 
+def get_identifier_from_curies(s: str, prefix: str) -> str | None:
+    """Get the first identifier with the given prefix from space-separated CURIEs.
+
+    This doesn't construct references, so it's much faster than processing a record
+    (e.g., with :func:`process_citation`) when only one identifier is needed.
+
+    >>> get_identifier_from_curies("omid:br/061 doi:10.1/abc pmid:123", "pmid")
+    '123'
+    """
+    start = f"{prefix}:"
+    for curie in s.split(" "):
+        if curie.startswith(start):
+            return curie[len(start) :]
+    return None
+
+
 def process_work(record: dict[str, Any]) -> Work:
     """Process a metadata record for a creative work."""
     record["references"] = _process_curies(record.pop("id"))
@@ -169,6 +186,188 @@ def _process_tagged(part: str, cls: type[X]) -> X:
     return cls(name=name.strip(), references=references)
 
 
+T = TypeVar("T")
+
+
+class _LazyField(Generic[T]):
+    """A read-only attribute of a :class:`LazyWork` that's computed on first access."""
+
+    def __init__(self, func: Callable[[LazyWork], T]) -> None:
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    # docstr-coverage:excused `overload`
+    @overload
+    def __get__(self, instance: None, owner: type[LazyWork]) -> _LazyField[T]: ...
+
+    # docstr-coverage:excused `overload`
+    @overload
+    def __get__(self, instance: LazyWork, owner: type[LazyWork]) -> T: ...
+
+    def __get__(self, instance: LazyWork | None, owner: type[LazyWork]) -> _LazyField[T] | T:
+        if instance is None:
+            return self
+        try:
+            return instance._cache[self.name]  # type:ignore[no-any-return]
+        except KeyError:
+            rv = instance._cache[self.name] = self.func(instance)
+            return rv
+
+
+class LazyWork:
+    """A lightweight view of a record from the metadata dump, for fast iteration.
+
+    Fields have the same names and types as in :class:`Work`, but are only parsed when
+    they're first accessed, and without validation. This is useful for going over all
+    of the metadata dump while only looking at a few fields of each work, since
+    validating a :class:`Work` costs much more than reading its row. Use
+    :meth:`to_work` to get a validated :class:`Work`.
+    """
+
+    __slots__ = ("_cache", "record")
+
+    def __init__(self, record: Mapping[str, str]) -> None:
+        """Wrap a record.
+
+        :param record: A row from a CSV file of the metadata dump, as a dictionary from
+            the columns in the header to values
+        """
+        self.record = record
+        self._cache: dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.record!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LazyWork) and self.record == other.record
+
+    def __getstate__(self) -> Mapping[str, str]:
+        return self.record
+
+    def __setstate__(self, state: Mapping[str, str]) -> None:
+        self.__init__(state)  # type:ignore[misc]
+
+    def to_work(self) -> Work:
+        """Parse and validate the record into a work."""
+        return process_work(dict(self.record))
+
+    @_LazyField
+    def references(self) -> list[Reference]:
+        """Get the references for the work."""
+        return _construct_curies(self.record["id"])
+
+    @_LazyField
+    def title(self) -> str:
+        """Get the title of the work."""
+        return self.record["title"]
+
+    @_LazyField
+    def authors(self) -> list[Person]:
+        """Get the authors of the work."""
+        return _construct_tagged_list(self.record["author"], Person)
+
+    @_LazyField
+    def pub_date(self) -> datetime.date | None:
+        """Get the publication date of the work."""
+        rv: datetime.date | None = Work.parse_dates(self.record["pub_date"])
+        return rv
+
+    @_LazyField
+    def venue(self) -> Venue | None:
+        """Get the venue of the work."""
+        if not (value := self.record["venue"]):
+            return None
+        try:
+            return _construct_tagged(value, Venue)
+        except NoCURIEDelimiterError:
+            return None
+
+    @_LazyField
+    def volume(self) -> str | None:
+        """Get the volume of the work."""
+        return self.record["volume"]
+
+    @_LazyField
+    def issue(self) -> str | None:
+        """Get the issue of the work."""
+        return self.record["issue"]
+
+    @_LazyField
+    def page(self) -> str | None:
+        """Get the pages of the work."""
+        return self.record["page"]
+
+    @_LazyField
+    def publishers(self) -> list[Publisher] | None:
+        """Get the publishers of the work."""
+        return _construct_optional_tagged_list(self.record["publisher"], Publisher)
+
+    @_LazyField
+    def editors(self) -> list[Person] | None:
+        """Get the editors of the work."""
+        return _construct_optional_tagged_list(self.record["editor"], Person)
+
+    @_LazyField
+    def type(self) -> str:
+        """Get the type of the work."""
+        return self.record["type"]
+
+    @property
+    def omid(self) -> str:
+        """Get the OMID for the document."""
+        if rv := self.get_identifier("omid"):
+            return rv
+        raise ValueError(f"missing omid: {self.record['id']}")
+
+    @property
+    def pubmed(self) -> str | None:
+        """Get the PubMed identifier for the document, if it exists."""
+        return self.get_identifier("pmid")
+
+    def get_identifier(self, prefix: str) -> str | None:
+        """Get the first identifier for the document with the given prefix, if it exists.
+
+        This doesn't construct the references, so it's faster than looking through
+        :attr:`references` if they aren't needed otherwise.
+        """
+        return get_identifier_from_curies(self.record["id"], prefix)
+
+
+def _construct_curies(s: str) -> list[Reference]:
+    """Split CURIEs into references, like :func:`_process_curies` but without validation."""
+    rv = []
+    for curie in s.split(" "):
+        prefix, delimiter, identifier = curie.partition(":")
+        if not delimiter:
+            raise NoCURIEDelimiterError(curie)
+        rv.append(Reference.model_construct(prefix=Prefix(prefix), identifier=identifier))
+    return rv
+
+
+def _construct_tagged_list(s: str, cls: type[X]) -> list[X]:
+    if not s:
+        return []
+    return [_construct_tagged(x, cls) for x in s.split(";") if x.strip()]
+
+
+def _construct_optional_tagged_list(s: str, cls: type[X]) -> list[X] | None:
+    if not s:
+        return None
+    try:
+        return _construct_tagged_list(s, cls)
+    except NoCURIEDelimiterError:
+        return None
+
+
+def _construct_tagged(part: str, cls: type[X]) -> X:
+    part = part.strip()
+    if not part.endswith("]"):
+        raise ValueError(f"no brackets were given: {part}")
+    name, _, rest = part.rpartition("[")
+    return cls.model_construct(name=name.strip(), references=_construct_curies(rest.rstrip("]")))
+
+
 def _bool(s: Literal["yes", "no"]) -> bool:
     if s == "no":
         return False
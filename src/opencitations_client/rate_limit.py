@@ -0,0 +1,312 @@
+"""Rate limiters that keep all calls to the OpenCitations API under its quota.
+
+The OpenCitations team asks for at most 180 calls per minute. A rate limiter that
+lives in one process can't enforce this when the client runs in several processes,
+e.g., in a web application served by multiple workers, so there are three backends:
+
+1. :class:`InProcessRateLimiter`, a token bucket shared by the threads of one process
+2. :class:`FileRateLimiter`, a token bucket whose state is kept in a locked file, which
+   is shared by all processes on one host
+3. :class:`StoreRateLimiter`, which counts calls in a Redis-like key-value store that
+   can be shared between hosts. :class:`InMemoryStore` is a local stand-in.
+
+All rate limiters reserve a slot for the next call and return how long the caller has
+to wait before making it, so they work for both threads (:func:`time.sleep`) and
+coroutines (:func:`asyncio.sleep`). The rate limiter used by the clients can be
+changed with :func:`set_rate_limiter`. Otherwise, a :class:`FileRateLimiter` is used
+if the ``OPENCITATIONS_RATE_LIMIT_PATH`` environment variable (or ``rate_limit_path``
+in the ``opencitations`` section of the PyStow configuration) is set, and an
+:class:`InProcessRateLimiter` if not.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Generator
+from pathlib import Path
+from typing import IO, Protocol
+
+import pystow
+
+__all__ = [
+    "FileRateLimiter",
+    "InMemoryStore",
+    "InProcessRateLimiter",
+    "KeyValueStore",
+    "RateLimiter",
+    "StoreRateLimiter",
+    "get_rate_limiter",
+    "set_rate_limiter",
+]
+
+#: The number of calls allowed per period, which the OpenCitations team gave as 180
+#: calls per minute
+CALLS = 180
+#: The length of the period, in seconds
+PERIOD = 60
+
+# an alias, for where the ``time`` module is shadowed to match Redis' signatures
+_monotonic = time.monotonic
+
+
+class RateLimiter(ABC):
+    """A rate limiter that allows a number of calls per period."""
+
+    def __init__(self, calls: int = CALLS, period: float = PERIOD) -> None:
+        """Construct a rate limiter.
+
+        :param calls: The maximum number of calls per period
+        :param period: The length of the period, in seconds
+        """
+        self.calls = calls
+        self.period = period
+
+    @abstractmethod
+    def reserve(self) -> float:
+        """Reserve a slot for a call.
+
+        :return: The number of seconds to wait before making the call
+        """
+
+    def acquire(self) -> None:
+        """Wait until a call can be made."""
+        if (delay := self.reserve()) > 0:
+            time.sleep(delay)
+
+
+def _reserve_token(
+    tokens: float, updated: float, now: float, *, calls: int, period: float
+) -> tuple[float, float]:
+    """Take a token from a bucket and get the new number of tokens and the delay.
+
+    The bucket holds up to ``calls`` tokens and is refilled at ``calls / period`` tokens
+    per second. A negative number of tokens means that calls are queued up.
+    """
+    rate = calls / period
+    tokens = min(calls, tokens + max(0.0, now - updated) * rate) - 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class InProcessRateLimiter(RateLimiter):
+    """A token bucket rate limiter shared by all threads in a process."""
+
+    def __init__(self, calls: int = CALLS, period: float = PERIOD) -> None:
+        """Construct a rate limiter.
+
+        :param calls: The maximum number of calls per period, which is also the largest
+            allowed burst of calls
+        :param period: The length of the period, in seconds
+        """
+        super().__init__(calls=calls, period=period)
+        self._lock = threading.Lock()
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Reserve a slot for a call."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, delay = _reserve_token(
+                self._tokens, self._updated, now, calls=self.calls, period=self.period
+            )
+            self._updated = now
+        return delay
+
+
+class FileRateLimiter(RateLimiter):
+    """A token bucket rate limiter shared by all processes on a host, through a file.
+
+    The state of the bucket is stored in a small JSON file, which is locked for the
+    duration of each reservation.
+    """
+
+    def __init__(self, path: str | Path, calls: int = CALLS, period: float = PERIOD) -> None:
+        """Construct a rate limiter.
+
+        :param path: The path to the file with the state of the bucket. All processes
+            that should share a quota need to use the same path.
+        :param calls: The maximum number of calls per period, which is also the largest
+            allowed burst of calls
+        :param period: The length of the period, in seconds
+        """
+        super().__init__(calls=calls, period=period)
+        self.path = Path(path).expanduser().resolve()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+
+    def reserve(self) -> float:
+        """Reserve a slot for a call."""
+        with self.path.open("r+") as file, _lock_file(file):
+            # the wall clock is used since it's shared between processes
+            now = time.time()
+            content = file.read()
+            state = json.loads(content) if content else {"tokens": self.calls, "updated": now}
+            tokens, delay = _reserve_token(
+                state["tokens"], state["updated"], now, calls=self.calls, period=self.period
+            )
+            file.seek(0)
+            file.truncate()
+            file.write(json.dumps({"tokens": tokens, "updated": now}))
+            file.flush()
+        return delay
+
+
+@contextlib.contextmanager
+def _lock_file(file: IO[str]) -> Generator[None, None, None]:
+    """Hold an exclusive lock on an open file, blocking until it's available."""
+    if sys.platform == "win32":
+        import msvcrt
+
+        # lock the first byte, which is sufficient since all processes do the same
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class KeyValueStore(Protocol):
+    """The part of a Redis-like key-value store needed for rate limiting.
+
+    A :class:`redis.Redis` client satisfies this protocol.
+    """
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        """Atomically increment the integer value of a key, starting from zero."""
+
+    def expire(self, name: str, time: int) -> bool:
+        """Delete a key after the given number of seconds."""
+
+
+class InMemoryStore:
+    """A thread-safe, in-memory stand-in for a Redis-like key-value store."""
+
+    def __init__(self) -> None:
+        """Construct an empty store."""
+        self._lock = threading.Lock()
+        self._values: dict[str, int] = {}
+        self._expirations: dict[str, float] = {}
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        """Atomically increment the integer value of a key, starting from zero."""
+        with self._lock:
+            self._expire(_monotonic())
+            self._values[name] = self._values.get(name, 0) + amount
+            return self._values[name]
+
+    def expire(self, name: str, time: int) -> bool:
+        """Delete a key after the given number of seconds."""
+        with self._lock:
+            if name not in self._values:
+                return False
+            self._expirations[name] = _monotonic() + time
+            return True
+
+    def _expire(self, now: float) -> None:
+        for name, expiration in list(self._expirations.items()):
+            if expiration <= now:
+                del self._values[name]
+                del self._expirations[name]
+
+
+class StoreRateLimiter(RateLimiter):
+    """A rate limiter that counts calls in fixed windows in a Redis-like store.
+
+    Each window gets its own counter. A call is allowed in the first window, starting
+    from the current one, whose counter hasn't reached the limit yet. Since counters are
+    incremented atomically by the store, this is shared by all processes and hosts using
+    the same store.
+
+    With one window per period and a limit of ``calls`` per window, the calls at the
+    end of one window and the start of the next would add up to twice the quota within
+    a period. Instead, each period is split into ``windows`` windows. Any span of one
+    period overlaps at most ``windows + 1`` of them, so each window gets a limit of
+    ``calls // (windows + 1)``. This never exceeds the quota, at the cost of using a
+    fraction ``windows / (windows + 1)`` of it, e.g., 150 of 180 calls per minute by
+    default.
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        calls: int = CALLS,
+        period: float = PERIOD,
+        *,
+        key: str = "opencitations:rate-limit",
+        windows: int = 5,
+    ) -> None:
+        """Construct a rate limiter.
+
+        :param store: A Redis-like key-value store, like a :class:`redis.Redis` client
+            or an :class:`InMemoryStore`
+        :param calls: The maximum number of calls per period
+        :param period: The length of the period, in seconds
+        :param key: The prefix for keys of counters in the store
+        :param windows: The number of windows that each period is split into
+        :raises ValueError: If there are fewer than ``windows + 1`` calls per period,
+            so that no calls would be allowed per window
+        """
+        super().__init__(calls=calls, period=period)
+        self.store = store
+        self.key = key
+        self.window = period / windows
+        self.limit = calls // (windows + 1)
+        if self.limit < 1:
+            raise ValueError(f"{calls} calls per period can't be split into {windows} windows")
+
+    def reserve(self) -> float:
+        """Reserve a slot for a call."""
+        now = time.time()
+        window = int(now // self.window)
+        while True:
+            name = f"{self.key}:{window}"
+            count = self.store.incr(name)
+            if count == 1:
+                # keep counters for windows in the future around until they've passed
+                delay = max(0.0, (window + 1) * self.window - now)
+                self.store.expire(name, int(delay) + 1)
+            if count <= self.limit:
+                return max(0.0, window * self.window - now)
+            window += 1
+
+
+_rate_limiter: RateLimiter | None = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the rate limiter shared by all calls to the OpenCitations API."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            path = pystow.get_config("opencitations", "rate_limit_path")
+            if path:
+                _rate_limiter = FileRateLimiter(path)
+            else:
+                _rate_limiter = InProcessRateLimiter()
+        return _rate_limiter
+
+
+def set_rate_limiter(rate_limiter: RateLimiter | None) -> None:
+    """Set the rate limiter shared by all calls to the OpenCitations API.
+
+    :param rate_limiter: A rate limiter, or none to go back to the default
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = rate_limiter
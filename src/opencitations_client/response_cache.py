@@ -0,0 +1,336 @@
+"""A persistent cache for responses from the OpenCitations API.
+
+OpenCitations releases new data about once a month, so asking for the same article or
+citations again within a short time gives the same result. Responses are stored in a
+SQLite database in the PyStow directory and reused until they expire. Expired
+responses are revalidated with a conditional request, if the server gave an ``ETag``
+or ``Last-Modified`` header for them. When the cache grows beyond its maximum size,
+the least recently used responses are evicted. Responses are stored separately for
+each token, so they're never shared between users of the same cache.
+
+Caching is opt-in. It's enabled by setting the ``OPENCITATIONS_RESPONSE_CACHE``
+environment variable (or ``response_cache`` in the ``opencitations`` section of the
+PyStow configuration) to ``true``, or by passing a cache to :func:`set_response_cache`.
+Lookups with ``backend="auto"`` (see :mod:`opencitations_client.api`) always cache
+their calls to the API with :func:`ensure_response_cache`, in the default cache if no
+other one is enabled, so repeated lookups of references that aren't in the local graph
+cache don't call the API again.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+
+import pystow
+import requests
+from requests.structures import CaseInsensitiveDict
+
+__all__ = [
+    "CacheStatistics",
+    "CachedResponse",
+    "ResponseCache",
+    "ensure_response_cache",
+    "get_default_response_cache",
+    "get_response_cache",
+    "set_response_cache",
+]
+
+#: The default time after which responses are revalidated
+DEFAULT_TTL = datetime.timedelta(days=1)
+#: The default maximum total size of response bodies, in bytes
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    content BLOB NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+-- the total size of the responses, kept up to date by triggers so that it's never summed
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE totals SET size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE totals SET size = size + new.size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE totals SET size = size - old.size;
+END;
+"""
+
+
+@dataclass
+class CacheStatistics:
+    """Counts of how requests were served by a response cache."""
+
+    #: The number of requests that were served from the cache without a call
+    hits: int = 0
+    #: The number of requests that needed a call and weren't served from the cache
+    misses: int = 0
+    #: The number of expired responses that were confirmed as unchanged by the server
+    revalidations: int = 0
+    #: The number of responses that were evicted to stay under the maximum size
+    evictions: int = 0
+
+
+@dataclass
+class CachedResponse:
+    """A response stored in the cache."""
+
+    url: str
+    status: int
+    content: bytes
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    created: float
+
+    def get_validators(self) -> dict[str, str]:
+        """Get headers for a conditional request that checks if the response changed."""
+        rv = {}
+        if self.etag:
+            rv["If-None-Match"] = self.etag
+        if self.last_modified:
+            rv["If-Modified-Since"] = self.last_modified
+        return rv
+
+    def to_response(self) -> requests.Response:
+        """Get a response object, like one returned by :mod:`requests`."""
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status
+        response._content = self.content
+        response.headers = CaseInsensitiveDict()
+        if self.content_type:
+            response.headers["Content-Type"] = self.content_type
+        response.encoding = "utf-8"
+        return response
+
+
+class ResponseCache:
+    """A cache for API responses in a SQLite database, keyed by URL and token."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl: datetime.timedelta = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        """Construct a response cache.
+
+        :param path: The path to the SQLite database, which is created if it doesn't exist
+        :param ttl: The time after which a response is considered stale and is
+            revalidated (or fetched again) on the next request for it
+        :param max_size: The maximum total size of stored response bodies, in bytes.
+            Beyond this, the least recently used responses are evicted.
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.statistics = CacheStatistics()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def get(self, url: str, *, token: str | None = None) -> CachedResponse | None:
+        """Get a response for the URL and token, whether or not it has expired."""
+        key = _get_key(url, token)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT status, content, content_type, etag, last_modified, created "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return CachedResponse(url, *row)
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        """Check if a stored response can be used without revalidating it."""
+        return time.time() - response.created < self.ttl.total_seconds()
+
+    def set(self, url: str, response: requests.Response, *, token: str | None = None) -> None:
+        """Store a successful response for the URL and token, then evict responses if needed."""
+        now = time.time()
+        content = response.content
+        with self._lock, self._connection:
+            # an upsert, unlike INSERT OR REPLACE, runs the triggers that track the total size
+            self._connection.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET url = excluded.url, status = excluded.status, "
+                "content = excluded.content, content_type = excluded.content_type, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, "
+                "created = excluded.created, accessed = excluded.accessed, size = excluded.size",
+                (
+                    _get_key(url, token),
+                    url,
+                    response.status_code,
+                    content,
+                    response.headers.get("Content-Type"),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(content),
+                ),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used responses until the total size is under the maximum."""
+        (excess,) = self._connection.execute(
+            "SELECT size - ? FROM totals", (self.max_size,)
+        ).fetchone()
+        if excess <= 0:
+            return
+        keys = []
+        # the index on the access time lets this stop after the responses that get evicted
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.statistics.evictions += len(keys)
+
+    def record_hit(self) -> None:
+        """Count a request that was served from the cache without a call."""
+        with self._lock:
+            self.statistics.hits += 1
+
+    def record_miss(self) -> None:
+        """Count a request that needed a call and wasn't served from the cache."""
+        with self._lock:
+            self.statistics.misses += 1
+
+    def record_revalidation(self) -> None:
+        """Count an expired response that was confirmed as unchanged by the server."""
+        with self._lock:
+            self.statistics.revalidations += 1
+
+    def refresh(self, url: str, *, token: str | None = None) -> None:
+        """Mark a stored response as fresh, e.g., after the server confirmed it's unchanged."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE responses SET created = ?, accessed = ? WHERE key = ?",
+                (now, now, _get_key(url, token)),
+            )
+
+    def clear(self) -> None:
+        """Delete all stored responses."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return int(count)
+
+    def get_size(self) -> int:
+        """Get the total size of stored response bodies, in bytes."""
+        with self._lock:
+            (size,) = self._connection.execute("SELECT size FROM totals").fetchone()
+        return int(size)
+
+
+def _get_key(url: str, token: str | None) -> str:
+    """Get the key for a response, which doesn't store the token itself."""
+    if token is None:
+        return url
+    return f"{hashlib.sha256(token.encode()).hexdigest()} {url}"
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_configured = False
+_response_cache_lock = threading.Lock()
+
+
+_default_response_cache: ResponseCache | None = None
+#: A response cache that overrides the configured one, see :func:`ensure_response_cache`
+_context_response_cache: ContextVar[ResponseCache | None] = ContextVar(
+    "response_cache", default=None
+)
+
+
+def get_default_response_cache() -> ResponseCache:
+    """Get the response cache in the PyStow directory, whether or not caching is enabled."""
+    with _response_cache_lock:
+        return _get_default_response_cache()
+
+
+def _get_default_response_cache() -> ResponseCache:
+    global _default_response_cache
+    if _default_response_cache is None:
+        module = pystow.module("opencitations")
+        _default_response_cache = ResponseCache(module.join(name="responses.sqlite"))
+    return _default_response_cache
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Get the response cache used for calls to the OpenCitations API, if enabled."""
+    global _response_cache, _response_cache_configured
+    if (rv := _context_response_cache.get()) is not None:
+        return rv
+    with _response_cache_lock:
+        if not _response_cache_configured:
+            if pystow.get_config("opencitations", "response_cache", dtype=bool, default=False):
+                _response_cache = _get_default_response_cache()
+            _response_cache_configured = True
+        return _response_cache
+
+
+@contextmanager
+def ensure_response_cache() -> Iterator[ResponseCache]:
+    """Cache calls to the API in the context, even if caching isn't enabled.
+
+    :yields: The response cache that's used, which is the one from
+        :func:`get_response_cache` if caching is enabled, and otherwise the one from
+        :func:`get_default_response_cache`
+    """
+    response_cache = get_response_cache() or get_default_response_cache()
+    token = _context_response_cache.set(response_cache)
+    try:
+        yield response_cache
+    finally:
+        _context_response_cache.reset(token)
+
+
+def set_response_cache(response_cache: ResponseCache | None) -> None:
+    """Set the response cache used for calls to the OpenCitations API.
+
+    :param response_cache: A response cache, or none to disable caching
+    """
+    global _response_cache, _response_cache_configured
+    with _response_cache_lock:
+        _response_cache = response_cache
+        _response_cache_configured = True
@@ -0,0 +1,208 @@
+"""Retrying calls to the OpenCitations API that fail transiently.
+
+Long batch jobs make many calls, so some of them will hit a gateway error (e.g., 502)
+or be throttled by the server (429) even when the rate limit in
+:mod:`opencitations_client.rate_limit` is respected. Calls that fail like this, or with
+a connection error or timeout, are retried after a delay that grows exponentially with
+each attempt, with random jitter so that concurrent callers don't retry in lockstep. If
+the server says how long to wait with a ``Retry-After`` header, that's used instead.
+
+When the server pushes back (429 or 503), the :class:`RetryPolicy` also lowers the
+rate of calls by spacing them out further, beyond what the rate limiter allows. The
+rate is halved on each pushback and climbs back up with each successful call, like
+additive-increase, multiplicative-decrease congestion control.
+
+The retry policy used by the clients can be changed with :func:`set_retry_policy`. The
+default number of retries can be set with the ``OPENCITATIONS_MAX_RETRIES``
+environment variable (or ``max_retries`` in the ``opencitations`` section of the
+PyStow configuration), where 0 disables retrying.
+"""
+
+from __future__ import annotations
+
+import datetime
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import pystow
+
+from .rate_limit import CALLS, PERIOD
+
+__all__ = [
+    "RetryPolicy",
+    "RetryStatistics",
+    "get_retry_policy",
+    "parse_retry_after",
+    "set_retry_policy",
+]
+
+#: The default number of times a call is retried before giving up
+DEFAULT_MAX_RETRIES = 5
+#: The status codes of responses that are retried
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+#: The status codes of responses where the server asks for fewer calls
+PUSHBACK_STATUSES = frozenset([429, 503])
+
+
+@dataclass
+class RetryStatistics:
+    """Counts of how calls went, for a retry policy."""
+
+    #: The number of calls made, including retries
+    calls: int = 0
+    #: The number of calls that were retried
+    retries: int = 0
+    #: The number of responses where the server pushed back, with a 429 or 503
+    pushbacks: int = 0
+    #: The number of calls that failed with a connection error or timeout
+    errors: int = 0
+    #: The number of calls that still failed after all retries
+    failures: int = 0
+    #: The total time spent waiting before retries, in seconds
+    delay: float = 0.0
+
+
+class RetryPolicy:
+    """Decides whether and when to retry calls, and adapts the rate of calls."""
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        jitter: bool = True,
+        interval: float = PERIOD / CALLS,
+        min_rate: float = 1 / 16,
+        increase: float = 0.1,
+    ) -> None:
+        """Construct a retry policy.
+
+        :param max_retries: The maximum number of times a call is retried
+        :param backoff: The delay before the first retry, in seconds, which is doubled
+            for each subsequent retry
+        :param max_backoff: The maximum delay before a retry, in seconds, unless the
+            server asks for a longer one with ``Retry-After``
+        :param jitter: Should delays be drawn uniformly between zero and the backoff
+            (i.e., full jitter) instead of being exactly the backoff?
+        :param interval: The time between calls, in seconds, at the full rate. By
+            default, this matches the rate limit.
+        :param min_rate: The lowest fraction of the full rate that calls are slowed to
+        :param increase: The fraction of the full rate that's added back after each
+            successful call
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.interval = interval
+        self.min_rate = min_rate
+        self.increase = increase
+        #: The current fraction of the full rate
+        self.rate = 1.0
+        self.statistics = RetryStatistics()
+        self._lock = threading.Lock()
+        self._next_call = time.monotonic()
+
+    def reserve(self) -> float:
+        """Reserve a slot for a call at the current rate.
+
+        :return: The number of seconds to wait before making the call, which is zero
+            unless the rate was lowered after the server pushed back
+        """
+        with self._lock:
+            self.statistics.calls += 1
+            now = time.monotonic()
+            if self.rate >= 1.0:
+                self._next_call = now
+                return 0.0
+            call = max(now, self._next_call)
+            self._next_call = call + self.interval / self.rate
+            return call - now
+
+    def get_delay(
+        self, attempt: int, *, status: int | None = None, retry_after: str | None = None
+    ) -> float | None:
+        """Record the outcome of a call, and get how long to wait before retrying it.
+
+        :param attempt: The number of times the call was already retried
+        :param status: The status code of the response, or none if the call failed with
+            a connection error or timeout
+        :param retry_after: The value of the ``Retry-After`` header of the response
+        :return: The number of seconds to wait before retrying the call, or none if it
+            shouldn't be retried, either because it succeeded, it failed in a way that
+            retrying won't fix, or it was retried too many times already
+        """
+        with self._lock:
+            if status is None:
+                self.statistics.errors += 1
+            elif status in PUSHBACK_STATUSES:
+                self.statistics.pushbacks += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif status < 400:
+                self.rate = min(1.0, self.rate + self.increase)
+            if status is not None and status not in RETRY_STATUSES:
+                return None
+            if attempt >= self.max_retries:
+                self.statistics.failures += 1
+                return None
+            delay = parse_retry_after(retry_after) if retry_after else None
+            if delay is None:
+                delay = min(self.max_backoff, self.backoff * 2**attempt)
+                if self.jitter:
+                    delay = random.uniform(0, delay)  # noqa:S311
+            self.statistics.retries += 1
+            self.statistics.delay += delay
+        return delay
+
+
+def parse_retry_after(value: str) -> float | None:
+    """Parse the value of a ``Retry-After`` header into a number of seconds.
+
+    :param value: Either a number of seconds or an HTTP date
+    :return: The number of seconds to wait, or none if the value can't be parsed
+
+    >>> parse_retry_after("120")
+    120.0
+    >>> parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT")
+    0.0
+    """
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+_retry_policy: RetryPolicy | None = None
+_retry_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Get the retry policy shared by all calls to the OpenCitations API."""
+    global _retry_policy
+    with _retry_policy_lock:
+        if _retry_policy is None:
+            max_retries = pystow.get_config(
+                "opencitations", "max_retries", dtype=int, default=DEFAULT_MAX_RETRIES
+            )
+            _retry_policy = RetryPolicy(max_retries=max_retries)
+        return _retry_policy
+
+
+def set_retry_policy(retry_policy: RetryPolicy | None) -> None:
+    """Set the retry policy shared by all calls to the OpenCitations API.
+
+    :param retry_policy: A retry policy, or none to go back to the default
+    """
+    global _retry_policy
+    with _retry_policy_lock:
+        _retry_policy = retry_policy
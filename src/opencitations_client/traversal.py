@@ -0,0 +1,355 @@
+"""Multi-hop traversals of the local citation graph.
+
+Looking up the citations of each node in a neighborhood one at a time makes a call
+(and builds a list of strings) per node, so two- or three-hop neighborhoods of
+well-connected articles take thousands of calls. Instead, the traversals here keep a
+frontier of node indices in a NumPy array, and expand all of it at once with the CSR
+index of the graph cache (see :class:`pystow.graph.GraphCache`). Node indices are only
+converted back to local unique identifiers at the end, for the deduplicated result.
+
+All functions take references with one prefix that has a graph cache, like the batch
+lookups in :mod:`opencitations_client.cache`, e.g., ``omid`` or ``pubmed``.
+"""
+
+from __future__ import annotations
+
+from collections import ChainMap
+from collections.abc import Iterable
+from typing import Literal, TypeAlias, overload
+
+import numpy as np
+from curies import Reference
+from pystow.graph import GraphCache, SingleGraphCache
+
+from .cache import _gather_csr, _get_cache, _handle_batch_input
+from .delta import DeltaGraphCache
+
+__all__ = [
+    "Direction",
+    "NodeReturnType",
+    "get_bibliographically_coupled",
+    "get_citation_layers",
+    "get_citation_neighborhood",
+    "get_co_cited",
+]
+
+#: The direction of edges to follow. ``out`` goes from citing to cited articles, ``in``
+#: from cited to citing articles, and ``both`` ignores the direction of citations
+Direction: TypeAlias = Literal["out", "in", "both"]
+
+#: The return type for nodes found by a traversal
+NodeReturnType: TypeAlias = Literal["reference", "str"]
+
+
+class _Traversal:
+    """Expands frontiers of node indices in a graph cache, with its delta layer applied."""
+
+    def __init__(self, cache: GraphCache | DeltaGraphCache) -> None:
+        self.cache = cache
+        base = cache.base if isinstance(cache, DeltaGraphCache) else cache
+        self.forward: SingleGraphCache = base.forward
+        self.reverse: SingleGraphCache = base.reverse
+        self.size = len(self.forward.node_to_id)
+        # nodes that are only in the delta get indices after the ones in the graph cache
+        self.extra_node_to_id: dict[str, int] = {}
+        self.extra_id_to_node: dict[int, str] = {}
+        self.id_to_node = ChainMap(self.extra_id_to_node, self.forward.id_to_node)
+        # the indices of nodes whose edges are changed by the delta, in each direction
+        self.changed: dict[bool, np.ndarray] = {}
+        for out in (True, False):
+            nodes: Iterable[str] = ()
+            if isinstance(cache, DeltaGraphCache):
+                delta = cache.delta
+                added, removed = (
+                    (delta.added_out, delta.removed_out)
+                    if out
+                    else (delta.added_in, delta.removed_in)
+                )
+                nodes = cache.format_nodes(np.union1d(added.get_nodes(), removed.get_nodes()))
+            self.changed[out] = np.unique(
+                np.fromiter((self._get_or_add_id(node) for node in nodes), dtype=np.int64)
+            )
+
+    def _get_or_add_id(self, node: str) -> int:
+        if (node_id := self.forward.node_to_id.get(node)) is not None:
+            return node_id
+        if node not in self.extra_node_to_id:
+            self.extra_node_to_id[node] = self.size + len(self.extra_node_to_id)
+            self.extra_id_to_node[self.extra_node_to_id[node]] = node
+        return self.extra_node_to_id[node]
+
+    def get_ids(self, nodes: Iterable[str]) -> np.ndarray:
+        """Get the sorted, unique indices for nodes, skipping ones that aren't in the graph."""
+        ids = (
+            self.forward.node_to_id.get(node, self.extra_node_to_id.get(node, -1)) for node in nodes
+        )
+        rv = np.unique(np.fromiter(ids, dtype=np.int64))
+        return rv[rv >= 0]
+
+    def get_nodes(self, ids: np.ndarray) -> list[str]:
+        """Get the local unique identifiers for node indices."""
+        return [self.id_to_node[i] for i in ids.tolist()]
+
+    def gather(self, frontier: np.ndarray, *, out: bool) -> np.ndarray:
+        """Get the neighbors of all nodes in the frontier, with duplicates between nodes."""
+        single = self.forward if out else self.reverse
+        changed = self.changed[out]
+        unchanged = frontier[(frontier < self.size) & ~np.isin(frontier, changed)]
+        _, neighbors = _gather_csr(single.indices_pointers, single.indices, unchanged)
+        parts = [neighbors]
+        # the delta is small, so the nodes it changes are looked up one at a time
+        for node in self.get_nodes(np.intersect1d(frontier, changed)):
+            edges = self.cache.out_edges(node) if out else self.cache.in_edges(node)
+            parts.append(np.array([self._get_or_add_id(edge) for edge in edges], dtype=np.int64))
+        return np.concatenate(parts)
+
+    def expand(self, frontier: np.ndarray, *, direction: Direction) -> np.ndarray:
+        """Get the sorted, unique neighbors of all nodes in the frontier."""
+        if direction == "both":
+            return np.union1d(self.gather(frontier, out=True), self.gather(frontier, out=False))
+        return np.unique(self.gather(frontier, out=direction == "out"))
+
+    def get_layers(self, seeds: np.ndarray, *, hops: int, direction: Direction) -> list[np.ndarray]:
+        """Run a breadth-first search, and get the nodes first reached at each distance."""
+        visited = frontier = seeds
+        layers = [seeds]
+        for _ in range(hops):
+            frontier = np.setdiff1d(
+                self.expand(frontier, direction=direction), visited, assume_unique=True
+            )
+            visited = np.union1d(visited, frontier)
+            layers.append(frontier)
+        return layers
+
+    def get_coupled(self, seeds: np.ndarray, *, out: bool) -> tuple[np.ndarray, np.ndarray]:
+        """Get the nodes that share neighbors with the seeds, and how many they share.
+
+        :param seeds: The indices of the seed nodes
+        :param out: If true, finds nodes that cite the same articles as the seeds
+            (bibliographic coupling). If false, finds nodes that are cited by the same
+            articles as the seeds (co-citation).
+        :return: The indices of the coupled nodes, and the number of shared neighbors
+        """
+        shared = np.unique(self.gather(seeds, out=out))
+        # each shared neighbor's edges are unique, so each count is of distinct neighbors
+        ids, counts = np.unique(self.gather(shared, out=not out), return_counts=True)
+        keep = ~np.isin(ids, seeds)
+        return ids[keep], counts[keep]
+
+
+def _get_traversal(
+    references: Iterable[str | Reference], *, prefix: str | None
+) -> tuple[str, _Traversal, np.ndarray]:
+    prefix, identifiers = _handle_batch_input(references, prefix=prefix)
+    traversal = _Traversal(_get_cache(prefix))
+    return prefix, traversal, traversal.get_ids(identifiers)
+
+
+def _to_set(
+    nodes: list[str], *, prefix: str, return_type: NodeReturnType
+) -> set[Reference] | set[str]:
+    if return_type == "str":
+        return set(nodes)
+    return {Reference(prefix=prefix, identifier=node) for node in nodes}
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_citation_layers(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = ...,
+    direction: Direction = ...,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> list[set[Reference]]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_citation_layers(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = ...,
+    direction: Direction = ...,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> list[set[str]]: ...
+
+
+def get_citation_layers(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = 1,
+    direction: Direction = "out",
+    prefix: str | None = None,
+    return_type: NodeReturnType = "reference",
+) -> list[set[Reference]] | list[set[str]]:
+    """Run a breadth-first search from the references in the local citation graph.
+
+    :param references: References or CURIEs to start from, which all have to have the
+        same prefix. If a prefix is given explicitly, strings are instead interpreted
+        as local unique identifiers, which skips parsing them.
+    :param hops: The maximum distance from the references
+    :param direction: The direction of citations to follow
+    :param prefix: The prefix for all references
+    :param return_type: The return type for nodes
+    :return: A list of ``hops + 1`` sets, where the set at position ``i`` has the nodes
+        that are first reached after ``i`` hops. The first set has the references that
+        are in the graph.
+    """
+    prefix, traversal, seeds = _get_traversal(references, prefix=prefix)
+    return [  # type:ignore[return-value]
+        _to_set(traversal.get_nodes(layer), prefix=prefix, return_type=return_type)
+        for layer in traversal.get_layers(seeds, hops=hops, direction=direction)
+    ]
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_citation_neighborhood(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = ...,
+    direction: Direction = ...,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> set[Reference]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_citation_neighborhood(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = ...,
+    direction: Direction = ...,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> set[str]: ...
+
+
+def get_citation_neighborhood(
+    references: Iterable[str | Reference],
+    *,
+    hops: int = 1,
+    direction: Direction = "out",
+    prefix: str | None = None,
+    return_type: NodeReturnType = "reference",
+) -> set[Reference] | set[str]:
+    """Get all nodes within a number of hops of the references in the local citation graph.
+
+    :param references: References or CURIEs to start from, which all have to have the
+        same prefix. If a prefix is given explicitly, strings are instead interpreted
+        as local unique identifiers, which skips parsing them.
+    :param hops: The maximum distance from the references
+    :param direction: The direction of citations to follow
+    :param prefix: The prefix for all references
+    :param return_type: The return type for nodes
+    :return: The nodes that can be reached in at most ``hops`` hops, not including the
+        references themselves
+
+    .. seealso:: :func:`get_citation_layers`, which also gives the distance to each node
+    """
+    prefix, traversal, seeds = _get_traversal(references, prefix=prefix)
+    layers = traversal.get_layers(seeds, hops=hops, direction=direction)
+    nodes = traversal.get_nodes(np.concatenate(layers[1:]))
+    return _to_set(nodes, prefix=prefix, return_type=return_type)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_co_cited(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> dict[Reference, int]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_co_cited(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> dict[str, int]: ...
+
+
+def get_co_cited(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = None,
+    return_type: NodeReturnType = "reference",
+) -> dict[Reference, int] | dict[str, int]:
+    """Get the articles that are cited together with the references (co-citation).
+
+    :param references: References or CURIEs, which all have to have the same prefix. If
+        a prefix is given explicitly, strings are instead interpreted as local unique
+        identifiers, which skips parsing them.
+    :param prefix: The prefix for all references
+    :param return_type: The return type for nodes
+    :return: A dictionary from each co-cited article to the number of articles that
+        cite both it and any of the references, from most to least
+    """
+    return _get_coupled(references, prefix=prefix, return_type=return_type, out=False)
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_bibliographically_coupled(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["reference"] = ...,
+) -> dict[Reference, int]: ...
+
+
+# docstr-coverage:excused `overload`
+@overload
+def get_bibliographically_coupled(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = ...,
+    return_type: Literal["str"] = ...,
+) -> dict[str, int]: ...
+
+
+def get_bibliographically_coupled(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None = None,
+    return_type: NodeReturnType = "reference",
+) -> dict[Reference, int] | dict[str, int]:
+    """Get the articles that cite the same articles as the references (bibliographic coupling).
+
+    :param references: References or CURIEs, which all have to have the same prefix. If
+        a prefix is given explicitly, strings are instead interpreted as local unique
+        identifiers, which skips parsing them.
+    :param prefix: The prefix for all references
+    :param return_type: The return type for nodes
+    :return: A dictionary from each coupled article to the number of articles that it
+        and any of the references both cite, from most to least
+    """
+    return _get_coupled(references, prefix=prefix, return_type=return_type, out=True)
+
+
+def _get_coupled(
+    references: Iterable[str | Reference],
+    *,
+    prefix: str | None,
+    return_type: NodeReturnType,
+    out: bool,
+) -> dict[Reference, int] | dict[str, int]:
+    prefix, traversal, seeds = _get_traversal(references, prefix=prefix)
+    ids, counts = traversal.get_coupled(seeds, out=out)
+    # sort by decreasing count, then by index so that the order is deterministic
+    order = np.lexsort((ids, -counts))
+    nodes = traversal.get_nodes(ids[order])
+    if return_type == "str":
+        return dict(zip(nodes, counts[order].tolist(), strict=True))
+    return {
+        Reference(prefix=prefix, identifier=node): count
+        for node, count in zip(nodes, counts[order].tolist(), strict=True)
+    }
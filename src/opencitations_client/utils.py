@@ -0,0 +1,146 @@
+"""Utilities for processing bulk data."""
+
+from __future__ import annotations
+
+import codecs
+import json
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, TypeVar
+
+__all__ = [
+    "iter_json_array",
+    "iter_ordered_map",
+]
+
+X = TypeVar("X")
+Y = TypeVar("Y")
+
+
+def iter_ordered_map(
+    func: Callable[[X], Y],
+    items: Iterable[X],
+    *,
+    workers: int | None = None,
+    max_pending: int | None = None,
+) -> Iterable[Y]:
+    """Apply a function to items in a pool of processes, yielding results in order.
+
+    :param func: A function to apply to each item. It must be picklable, i.e., defined
+        at the top level of a module or a :func:`functools.partial` of one
+    :param items: The items to process
+    :param workers: The number of worker processes. If none or one, the function is
+        applied in the current process
+    :param max_pending: The maximum number of items that have been submitted to the
+        pool, but whose results have not been yielded yet. Defaults to twice the number
+        of workers. Unlike :meth:`concurrent.futures.Executor.map`, this means that
+        only a bounded part of the items (e.g., the members of a large archive) are
+        held in memory at any time.
+
+    :yields: The results of applying the function to each item, in the same order as
+        the items
+    """
+    if workers is None or workers <= 1:
+        yield from map(func, items)
+        return
+    if max_pending is None:
+        max_pending = 2 * workers
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending: deque[Future[Y]] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+JSON_WHITESPACE = " \t\n\r"
+
+#: Transitions between the states of decoding a JSON array on punctuation, where
+#: ``first`` is after the opening bracket, ``value`` after a comma, and ``separator``
+#: after an element
+JSON_ARRAY_TRANSITIONS = {
+    "start": {"[": "first"},
+    "first": {"]": "end"},
+    "separator": {",": "value", "]": "end"},
+    "end": {},
+}
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Incrementally decode the elements of a JSON array from chunks of UTF-8 bytes.
+
+    Only the part of the array that hasn't been decoded yet is kept in memory, so this
+    can decode arbitrarily large arrays whose elements are small, like API responses
+    that are streamed from the network.
+
+    :param chunks: Chunks of a JSON document whose top level is an array. The chunks
+        can be split anywhere, including in the middle of an element or character.
+    :yields: The decoded elements of the array, as soon as the chunk that completes
+        them is read
+    :raises ValueError: If the document isn't a valid JSON array
+
+    >>> list(iter_json_array([b'[{"a": 1}, {"a"', b": 2}]"]))
+    [{'a': 1}, {'a': 2}]
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    array_decoder = _JSONArrayDecoder()
+    buffer = ""
+    for chunk in _with_end(chunks):
+        final = chunk is None
+        buffer += text_decoder.decode(chunk or b"", final=final)
+        values, position = array_decoder.decode(buffer, final=final)
+        yield from values
+        buffer = buffer[position:]
+    if array_decoder.state != "end":
+        raise ValueError("the JSON array is incomplete")
+
+
+class _JSONArrayDecoder:
+    def __init__(self) -> None:
+        self.state = "start"
+        self._decoder = json.JSONDecoder()
+
+    def decode(self, buffer: str, *, final: bool) -> tuple[list[Any], int]:
+        """Decode as many elements as possible from the buffer.
+
+        :return: The decoded elements, and the position up to which the buffer was used
+        """
+        values = []
+        position = 0
+        while (position := _skip_whitespace(buffer, position)) < len(buffer):
+            if self.state == "value" or (self.state == "first" and buffer[position] != "]"):
+                try:
+                    value, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # the element isn't complete yet, so wait for the next chunk
+                if end == len(buffer) and not final:
+                    break  # numbers can be cut off at the end of a chunk, so wait
+                values.append(value)
+                self.state = "separator"
+                position = end
+            else:
+                transitions = JSON_ARRAY_TRANSITIONS[self.state]
+                if (character := buffer[position]) not in transitions:
+                    raise ValueError(f"unexpected {character!r} in JSON array: {buffer[:100]}")
+                self.state = transitions[character]
+                position += 1
+        return values, position
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+        position += 1
+    return position
+
+
+def _with_end(chunks: Iterable[bytes]) -> Iterable[bytes | None]:
+    yield from chunks
+    yield None
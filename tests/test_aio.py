@@ -0,0 +1,129 @@
+"""Test the asynchronous API client."""
+
+import asyncio
+import json
+import threading
+import unittest
+
+import httpx
+from curies import Reference
+
+from opencitations_client import aio
+from opencitations_client.json_api_client import META_V1
+from opencitations_client.rate_limit import InProcessRateLimiter, set_rate_limiter
+from opencitations_client.retry import RetryPolicy, set_retry_policy
+
+TOKEN = "test-token"  # noqa:S105
+RECORD = {
+    "oci": "061-062",
+    "citing": "omid:br/061 doi:10.1000/a",
+    "cited": "omid:br/062 doi:10.1000/b",
+    "creation": "2020",
+    "timespan": "",
+    "journal_sc": "no",
+    "author_sc": "no",
+}
+
+
+def _work(curie: str) -> dict[str, str]:
+    fields = ["title", "author", "pub_date", "page", "issue", "volume", "venue", "type"]
+    return {"id": curie, **dict.fromkeys(fields, ""), "publisher": "", "editor": ""}
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    """Test the asynchronous API client against a mock transport."""
+
+    async def asyncSetUp(self) -> None:
+        """Set up a client that answers requests without calling the API."""
+        self.requests: list[httpx.Request] = []
+
+        def _handle(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return httpx.Response(200, content=json.dumps([RECORD]))
+
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(_handle))
+        self.addAsyncCleanup(self.client.aclose)
+
+    async def test_citations(self) -> None:
+        """Test getting incoming and outgoing citations concurrently."""
+        incoming, outgoing = await asyncio.gather(
+            aio.get_incoming_citations_from_api(
+                "doi:10.1000/b", token=TOKEN, return_type="str", client=self.client
+            ),
+            aio.get_outgoing_citations_from_api(
+                "doi:10.1000/a", token=TOKEN, return_type="reference", client=self.client
+            ),
+        )
+        self.assertEqual(["10.1000/a"], incoming)
+        self.assertEqual([Reference(prefix="doi", identifier="10.1000/b")], outgoing)
+        self.assertEqual(
+            {
+                "https://api.opencitations.net/index/v2/citations/doi:10.1000/b",
+                "https://api.opencitations.net/index/v2/references/doi:10.1000/a",
+            },
+            {str(request.url) for request in self.requests},
+        )
+        self.assertTrue(all(r.headers["authorization"] == TOKEN for r in self.requests))
+
+    async def test_articles(self) -> None:
+        """Test that references that don't fit in one URL are split over concurrent calls."""
+
+        def _handle(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            curies = request.url.path.removeprefix("/meta/v1/metadata/").split("__")
+            return httpx.Response(200, content=json.dumps([_work(curie) for curie in curies]))
+
+        references = [Reference(prefix="doi", identifier=f"10.1000/{i}") for i in range(10)]
+        max_url_length = len(META_V1) + 100
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handle)) as client:
+            works = await aio.get_articles(
+                references, token=TOKEN, max_url_length=max_url_length, client=client
+            )
+        self.assertEqual(references, [work.references[0] for work in works])
+        self.assertLess(1, len(self.requests))
+        self.assertTrue(all(len(str(r.url)) <= max_url_length for r in self.requests))
+
+    async def test_invalid_person(self) -> None:
+        """Test that invalid references are rejected before making a call."""
+        with self.assertRaises(ValueError):
+            await aio.get_articles_for_author(
+                Reference.from_curie("doi:10.1000/a"), token=TOKEN, client=self.client
+            )
+        self.assertEqual([], self.requests)
+
+    async def test_retry(self) -> None:
+        """Test that transient server errors are retried."""
+        statuses = [502, 429, 200]
+
+        def _handle(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return httpx.Response(
+                statuses.pop(0), content=json.dumps([RECORD]), headers={"Retry-After": "0"}
+            )
+
+        policy = RetryPolicy(backoff=0.0)
+        set_retry_policy(policy)
+        self.addCleanup(set_retry_policy, None)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handle)) as client:
+            identifiers = await aio.get_incoming_citations_from_api(
+                "doi:10.1000/b", token=TOKEN, return_type="str", client=client
+            )
+        self.assertEqual(["10.1000/a"], identifiers)
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(2, policy.statistics.retries)
+        self.assertEqual(1, policy.statistics.pushbacks)
+
+    async def test_rate_limit_thread(self) -> None:
+        """Test that rate limit slots are reserved without blocking the event loop."""
+        threads = []
+
+        class RecordingRateLimiter(InProcessRateLimiter):
+            def reserve(self) -> float:
+                threads.append(threading.current_thread())
+                return super().reserve()
+
+        set_rate_limiter(RecordingRateLimiter())
+        self.addCleanup(set_rate_limiter, None)
+        await aio.get_incoming_citations_from_api("doi:10.1000/b", token=TOKEN, client=self.client)
+        self.assertEqual(1, len(threads))
+        self.assertIsNot(threading.main_thread(), threads[0])
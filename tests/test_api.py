@@ -1,16 +1,36 @@
 """API tests."""
 
+import copy
 import datetime
+import io
+import json
 import unittest
+from unittest import mock
 
+import requests
 from curies import Reference
 
+from opencitations_client import api, json_api_client
 from opencitations_client.json_api_client import (
     get_articles,
     get_articles_for_author,
+    get_articles_many,
     get_incoming_citations_from_api,
+    get_incoming_citations_from_api_many,
+    iter_incoming_citations_from_api,
 )
-from opencitations_client.models import Person, Publisher, Venue, Work, process_work
+from opencitations_client.models import (
+    Citation,
+    CitationReturnType,
+    Person,
+    Publisher,
+    Venue,
+    Work,
+    get_reference_with_prefix,
+    process_work,
+)
+from opencitations_client.response_cache import get_response_cache, set_response_cache
+from opencitations_client.utils import iter_json_array
 from opencitations_client.version import get_version
 
 bioregistry_reference = Reference.from_curie("doi:10.1038/s41597-022-01807-3")
@@ -215,3 +235,178 @@ class TestVersion(unittest.TestCase):
             expected.model_dump(),
             process_work(data).model_dump(),
         )
+
+
+class TestMany(unittest.TestCase):
+    """Test bulk lookups, without calling the API."""
+
+    def test_incoming_many(self) -> None:
+        """Test getting incoming citations for many references."""
+
+        def _get_index_v2(part: str, *, token: str | None = None) -> mock.Mock:
+            cited = part.removeprefix("/citations/")
+            record = {
+                "oci": f"0{len(cited)}-0",
+                "citing": f"omid:br/0{len(cited)} pmid:{len(cited)}",
+                "cited": cited,
+                "creation": "2020",
+                "timespan": "",
+                "journal_sc": "no",
+                "author_sc": "no",
+            }
+            return mock.Mock(json=lambda: [record])
+
+        with mock.patch.object(json_api_client, "_get_index_v2", side_effect=_get_index_v2) as get:
+            rv = get_incoming_citations_from_api_many(
+                ["pubmed:1", "pubmed:22", "pubmed:1"], return_type="str", max_workers=2
+            )
+        # duplicates are only looked up once
+        self.assertEqual(2, get.call_count)
+        self.assertEqual(
+            {
+                Reference(prefix="pmid", identifier="1"): ["6"],
+                Reference(prefix="pmid", identifier="22"): ["7"],
+            },
+            rv,
+        )
+
+    def test_process_citations(self) -> None:
+        """Test that identifiers are extracted the same way as from full citations."""
+        records = [
+            {
+                "oci": f"0{i}-01",
+                "citing": f"omid:br/0{i} doi:10.1000/{i}" + (f" pmid:{i}" if i % 2 else ""),
+                "cited": "omid:br/01 pmid:1",
+                "creation": "2020",
+                "timespan": "",
+                "journal_sc": "no",
+                "author_sc": "no",
+            }
+            for i in range(2, 10)
+        ]
+        for prefix in ["omid", "doi", "pmid"]:
+            reference = Reference(prefix=prefix, identifier="1")
+            citations = json_api_client._process_citations(
+                copy.deepcopy(records), reference, return_type="citation", outgoing=False
+            )
+            expected = [
+                other
+                for citation in citations
+                if isinstance(citation, Citation)
+                and (other := get_reference_with_prefix(citation.citing, prefix))
+            ]
+            return_types: list[CitationReturnType] = ["reference", "str"]
+            for return_type in return_types:
+                with self.subTest(prefix=prefix, return_type=return_type):
+                    rv = json_api_client._process_citations(
+                        copy.deepcopy(records), reference, return_type=return_type, outgoing=False
+                    )
+                    if return_type == "reference":
+                        self.assertEqual(expected, rv)
+                    else:
+                        self.assertEqual([r.identifier for r in expected], rv)
+
+    def test_articles_many(self) -> None:
+        """Test getting articles for many references in as few calls as possible."""
+
+        def _get_meta_v1(part: str, *, token: str | None = None) -> mock.Mock:
+            records = [
+                {
+                    "id": f"{curie.lower()} omid:br/0{i}",
+                    "title": curie,
+                    "author": "",
+                    "pub_date": "",
+                    "venue": "",
+                    "volume": "",
+                    "issue": "",
+                    "page": "",
+                    "type": "journal article",
+                    "publisher": "",
+                    "editor": "",
+                }
+                for i, curie in enumerate(part.removeprefix("/metadata/").split("__"))
+                # OpenCitations doesn't know about one of the DOIs
+                if curie != "doi:10.1000/missing"
+            ]
+            return mock.Mock(json=lambda: records)
+
+        references = [
+            Reference(prefix="doi", identifier=f"10.1000/{i}") for i in ["A", "b", "missing"]
+        ] * 2 + [Reference(prefix="pmid", identifier=str(i)) for i in range(100)]
+        max_url_length = len(json_api_client.META_V1) + 100
+        with mock.patch.object(json_api_client, "_get_meta_v1", side_effect=_get_meta_v1) as get:
+            rv = get_articles_many(references, max_url_length=max_url_length)
+        for call in get.call_args_list:
+            self.assertLessEqual(len(json_api_client.META_V1) + len(call.args[0]), max_url_length)
+        # 103 unique references, packed into calls of up to 90 characters after the base URL
+        self.assertEqual(11, get.call_count)
+        self.assertEqual(103, len(rv))
+        self.assertEqual("doi:10.1000/A", rv[references[0]].title)  # type:ignore[union-attr]
+        self.assertIsNone(rv[references[2]])
+        self.assertEqual("pmid:99", rv[references[-1]].title)  # type:ignore[union-attr]
+
+        with self.assertRaises(ValueError):
+            get_articles_many([Reference(prefix="orcid", identifier="0000-0002-8420-0696")])
+
+    def test_articles_max_url_length(self) -> None:
+        """Test that the maximum URL length is passed on to the API client."""
+        references = [Reference(prefix="doi", identifier="10.1000/a")]
+        with mock.patch.object(api, "get_articles_from_api", return_value=[]) as get:
+            api.get_articles(references, max_url_length=100)
+        get.assert_called_once_with(references, token=None, max_url_length=100)
+
+
+class TestStreaming(unittest.TestCase):
+    """Test streaming citations, without calling the API."""
+
+    def test_iter_json_array(self) -> None:
+        """Test decoding a JSON array from chunks that are split anywhere."""
+        data = [{"a": i, "b": "ü" * i, "c": [1.5, None, True]} for i in range(20)] + [123, []]
+        content = json.dumps(data).encode("utf-8")
+        for size in [1, 2, 3, 7, 100, len(content)]:
+            with self.subTest(size=size):
+                chunks = [content[i : i + size] for i in range(0, len(content), size)]
+                self.assertEqual(data, list(iter_json_array(chunks)))
+        self.assertEqual([], list(iter_json_array([b" [ ", b"] "])))
+        for content in [b"", b'{"a": 1}', b"[1 2]", b"[1,", b"[1,]", b"[1]2"]:
+            with self.subTest(content=content), self.assertRaises(ValueError):
+                list(iter_json_array([content]))
+
+    def test_iter_incoming(self) -> None:
+        """Test iterating over incoming citations from a streamed response."""
+        records = [
+            {
+                "oci": f"0{i}-01",
+                "citing": f"omid:br/0{i} pmid:{i}",
+                "cited": "omid:br/01 pmid:1",
+                "creation": "2020",
+                "timespan": "",
+                "journal_sc": "no",
+                "author_sc": "no",
+            }
+            for i in range(2, 100)
+        ]
+
+        def _get(url: str, *, token: str | None = None, stream: bool = False) -> requests.Response:
+            self.assertTrue(stream)
+            self.assertTrue(url.endswith("/citations/pmid:1"))
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = io.BytesIO(json.dumps(records).encode("utf-8"))
+            return response
+
+        response_cache = get_response_cache()
+        set_response_cache(None)
+        try:
+            with mock.patch.object(json_api_client, "_get", side_effect=_get):
+                identifiers = iter_incoming_citations_from_api(
+                    "pubmed:1", return_type="str", chunk_size=100
+                )
+                self.assertEqual("2", next(identifiers))
+                self.assertEqual([str(i) for i in range(3, 100)], list(identifiers))
+
+                citations = list(iter_incoming_citations_from_api("pubmed:1", chunk_size=100))
+        finally:
+            set_response_cache(response_cache)
+        self.assertEqual(98, len(citations))
+        self.assertEqual(Reference(prefix="oci", identifier="02-01"), citations[0].reference)
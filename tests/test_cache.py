@@ -1,17 +1,39 @@
 """Test the database."""
 
+import json
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
+import requests
 from curies import Reference
+from pystow.graph import build_graph_cache
 
+from opencitations_client import api, cache, json_api_client, response_cache
 from opencitations_client.cache import (
     _get_omid_cache,
+    _get_omid_cache_paths,
     _get_pubmed_cache,
     get_incoming_citations_from_cache,
+    get_incoming_citations_from_cache_batch,
     get_outgoing_citations_from_cache,
-    omid_cache_paths,
+    get_outgoing_citations_from_cache_batch,
     pubmed_cache_paths,
 )
+from opencitations_client.degrees import get_citation_counts, get_most_cited
+from opencitations_client.delta import CitationDelta, DeltaGraphCache
+from opencitations_client.models import CitationReturnType
+from opencitations_client.response_cache import ResponseCache, set_response_cache
+from opencitations_client.traversal import (
+    get_bibliographically_coupled,
+    get_citation_layers,
+    get_citation_neighborhood,
+    get_co_cited,
+)
+
+TOKEN = "test-token"  # noqa:S105
+EDGES = [("1", "2"), ("1", "3"), ("2", "3"), ("4", "1")]
 
 
 @unittest.skipUnless(pubmed_cache_paths.exists(), "can't run tests without cache")
@@ -50,7 +72,7 @@ class TestPubmedGraphCache(unittest.TestCase):
         self.assertFalse(get_outgoing_citations_from_cache(example))
 
 
-@unittest.skipUnless(omid_cache_paths.exists(), "can't run tests without cache")
+@unittest.skipUnless(_get_omid_cache_paths().exists(), "can't run tests without cache")
 class TestOMIDGraphCache(unittest.TestCase):
     """Tests for the OMID graph cache."""
 
@@ -75,3 +97,285 @@ class TestOMIDGraphCache(unittest.TestCase):
         for outgoing_citation in outgoing_citation_references:
             incoming = get_incoming_citations_from_cache(outgoing_citation, return_type="reference")
             self.assertIn(example_reference, incoming)
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for batch lookup in a graph cache."""
+
+    def setUp(self) -> None:
+        """Set up a small graph cache for PubMed."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.graph = build_graph_cache(lambda: EDGES, directory.name, progress=False)
+        patcher = mock.patch.object(cache, "_get_pubmed_cache", lambda: self.graph)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_csr(self) -> None:
+        """Test getting arrays in the CSR format."""
+        rv = get_outgoing_citations_from_cache_batch(
+            ["1", "5", "3", "2"], prefix="pmid", return_type="csr"
+        )
+        self.assertEqual(4, len(rv))
+        self.assertEqual([0, 2, 2, 2, 3], rv.offsets.tolist())
+        self.assertEqual(["2", "3"], rv[0])
+        self.assertEqual([], rv[1])
+        self.assertEqual(["3"], rv[3])
+
+    def test_dict(self) -> None:
+        """Test getting dictionaries, and that results match single lookups."""
+        nodes = ["1", "2", "3", "4", "5"]
+        references = [Reference(prefix="pubmed", identifier=node) for node in nodes]
+        outgoing = get_outgoing_citations_from_cache_batch(references, return_type="str")
+        incoming = get_incoming_citations_from_cache_batch(references, return_type="str")
+        for reference in references:
+            self.assertEqual(
+                get_outgoing_citations_from_cache(reference, return_type="str"),
+                outgoing[reference.identifier],
+            )
+            self.assertEqual(
+                get_incoming_citations_from_cache(reference, return_type="str"),
+                incoming[reference.identifier],
+            )
+
+        rv = get_incoming_citations_from_cache_batch(["pubmed:3"])
+        self.assertEqual(
+            {
+                Reference(prefix="pmid", identifier="3"): [
+                    Reference(prefix="pmid", identifier="1"),
+                    Reference(prefix="pmid", identifier="2"),
+                ]
+            },
+            rv,
+        )
+        with self.assertRaises(ValueError):
+            get_incoming_citations_from_cache_batch(["pubmed:3", "doi:10.1000/a"])
+
+    def test_delta(self) -> None:
+        """Test batch lookup in a graph cache with a delta layer."""
+        delta = CitationDelta(added=[(1, 6), (2, 4)], removed=[(1, 2)])
+        with mock.patch.object(
+            cache,
+            "_get_pubmed_cache",
+            lambda: DeltaGraphCache(self.graph, delta, parse_node=int, format_node=str),
+        ):
+            rv = get_outgoing_citations_from_cache_batch(
+                ["1", "2", "4"], prefix="pmid", return_type="str"
+            )
+        self.assertEqual({"1": ["3", "6"], "2": ["3", "4"], "4": ["1"]}, rv)
+
+
+class TestTraversal(unittest.TestCase):
+    """Tests for multi-hop traversals of a graph cache."""
+
+    def setUp(self) -> None:
+        """Set up a small graph cache for PubMed."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.graph = build_graph_cache(lambda: EDGES, directory.name, progress=False)
+        patcher = mock.patch.object(cache, "_get_pubmed_cache", lambda: self.graph)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_layers(self) -> None:
+        """Test breadth-first search in each direction."""
+        self.assertEqual(
+            [{"4"}, {"1"}, {"2", "3"}, set()],
+            get_citation_layers(["4"], hops=3, prefix="pmid", return_type="str"),
+        )
+        self.assertEqual(
+            [
+                {
+                    Reference(prefix="pmid", identifier="2"),
+                    Reference(prefix="pmid", identifier="3"),
+                },
+                {Reference(prefix="pmid", identifier="1")},
+            ],
+            get_citation_layers(["pubmed:3", "pubmed:2"], direction="in"),
+        )
+        self.assertEqual(
+            {"1", "2", "4"},
+            get_citation_neighborhood(
+                ["3"], hops=2, direction="in", prefix="pmid", return_type="str"
+            ),
+        )
+        self.assertEqual(
+            {"1", "3"},
+            get_citation_neighborhood(["2"], direction="both", prefix="pmid", return_type="str"),
+        )
+        # nodes that aren't in the graph are skipped
+        self.assertEqual(
+            [set(), set()], get_citation_layers(["5"], prefix="pmid", return_type="str")
+        )
+
+    def test_coupling(self) -> None:
+        """Test co-citation and bibliographic coupling."""
+        self.assertEqual({"3": 1}, get_co_cited(["2"], prefix="pmid", return_type="str"))
+        self.assertEqual({"2": 1}, get_co_cited(["3"], prefix="pmid", return_type="str"))
+        self.assertEqual(
+            {Reference(prefix="pmid", identifier="1"): 1},
+            get_bibliographically_coupled(["pubmed:2"]),
+        )
+        self.assertEqual({}, get_bibliographically_coupled(["4"], prefix="pmid"))
+
+    def test_delta(self) -> None:
+        """Test traversals in a graph cache with a delta layer."""
+        delta = CitationDelta(added=[(1, 6), (2, 4)], removed=[(1, 2)])
+        with mock.patch.object(
+            cache,
+            "_get_pubmed_cache",
+            lambda: DeltaGraphCache(self.graph, delta, parse_node=int, format_node=str),
+        ):
+            self.assertEqual(
+                [{"2"}, {"3", "4"}, {"1"}, {"6"}],
+                get_citation_layers(["2"], hops=3, prefix="pmid", return_type="str"),
+            )
+            self.assertEqual(
+                [{"6"}, {"1"}, {"4"}, {"2"}],
+                get_citation_layers(
+                    ["6"], hops=3, direction="in", prefix="pmid", return_type="str"
+                ),
+            )
+            self.assertEqual(
+                {"4": 1, "6": 1}, get_co_cited(["3"], prefix="pmid", return_type="str")
+            )
+
+
+class TestDegrees(unittest.TestCase):
+    """Tests for counting citations in a graph cache."""
+
+    def setUp(self) -> None:
+        """Set up a small graph cache for PubMed."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.graph = build_graph_cache(lambda: EDGES, directory.name, progress=False)
+        patcher = mock.patch.object(cache, "_get_pubmed_cache", lambda: self.graph)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counts(self) -> None:
+        """Test counting citations, which are saved next to the graph cache."""
+        nodes = ["1", "2", "3", "4", "5"]
+        self.assertEqual([1, 1, 2, 0, -1], get_citation_counts(nodes, prefix="pmid").tolist())
+        self.assertTrue(self.directory.joinpath("in_degrees.bin").is_file())
+        self.assertEqual(
+            [2, 1, 0, 1, -1], get_citation_counts(nodes, prefix="pmid", direction="out").tolist()
+        )
+        self.assertEqual(
+            [3, 2, 2, 1, -1], get_citation_counts(nodes, prefix="pmid", direction="both").tolist()
+        )
+        self.assertEqual(
+            [2], get_citation_counts([Reference(prefix="pubmed", identifier="3")]).tolist()
+        )
+
+    def test_most_cited(self) -> None:
+        """Test getting the most cited nodes."""
+        self.assertEqual({Reference(prefix="pmid", identifier="3"): 2}, get_most_cited("pmid", k=1))
+        rv = get_most_cited("pmid", k=10, return_type="str")
+        self.assertEqual({"1", "2", "3", "4"}, set(rv))
+        self.assertEqual([2, 1, 1, 0], list(rv.values()))
+        self.assertEqual(("3", "4"), (next(iter(rv)), list(rv)[-1]))
+
+    def test_delta(self) -> None:
+        """Test counting citations in a graph cache with a delta layer."""
+        delta = CitationDelta(added=[(1, 6), (2, 4)], removed=[(1, 2)])
+        with mock.patch.object(
+            cache,
+            "_get_pubmed_cache",
+            lambda: DeltaGraphCache(self.graph, delta, parse_node=int, format_node=str),
+        ):
+            self.assertEqual(
+                [1, 0, 2, 1, 1, -1],
+                get_citation_counts(["1", "2", "3", "4", "6", "7"], prefix="pmid").tolist(),
+            )
+            self.assertEqual(
+                [2, 2, 0, 1, 0, -1],
+                get_citation_counts(
+                    ["1", "2", "3", "4", "6", "7"], prefix="pmid", direction="out"
+                ).tolist(),
+            )
+            self.assertEqual({"3": 2}, get_most_cited("pmid", k=1, return_type="str"))
+            self.assertEqual(
+                {"1": 2, "2": 2}, get_most_cited("pmid", k=2, direction="out", return_type="str")
+            )
+
+
+class TestAutoBackend(unittest.TestCase):
+    """Tests for answering from the graph cache and falling back to the API."""
+
+    def setUp(self) -> None:
+        """Set up a small graph cache for PubMed, and mock the API."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        graph = build_graph_cache(lambda: EDGES, directory.name, progress=False)
+        for module, target, value in [
+            (cache, "_get_pubmed_cache", mock.Mock(return_value=graph)),
+            (cache, "_has_cache", mock.Mock(side_effect=lambda prefix: prefix == "pmid")),
+            (api, "get_outgoing_citations_from_api", mock.Mock(return_value=["api"])),
+        ]:
+            patcher = mock.patch.object(module, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_local(self) -> None:
+        """Test that graph lookups are answered locally, when possible."""
+        rv = api.get_outgoing_citations("pubmed:1", backend="auto", return_type="str")
+        self.assertEqual(["2", "3"], rv)
+        self.assertEqual(
+            [Reference(prefix="pmid", identifier="1")],
+            api.get_outgoing_citations("pubmed:4", backend="auto"),
+        )
+        api.get_outgoing_citations_from_api.assert_not_called()  # type:ignore[attr-defined]
+
+    def test_fallback(self) -> None:
+        """Test falling back to the API for full citations and missing references."""
+        cases: list[tuple[str, CitationReturnType]] = [
+            # the local graph doesn't have full citations
+            ("pubmed:1", "citation"),
+            # the reference isn't in the local graph, e.g., if it's newer than the dump
+            ("pubmed:5", "str"),
+            # there's no local graph for DOIs
+            ("doi:10.1000/a", "str"),
+        ]
+        for reference, return_type in cases:
+            with self.subTest(reference=reference, return_type=return_type):
+                self.assertEqual(
+                    ["api"],
+                    api.get_outgoing_citations(reference, backend="auto", return_type=return_type),
+                )
+
+    def test_write_back(self) -> None:
+        """Test that API results are cached locally, even if caching isn't enabled."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        set_response_cache(None)
+        self.addCleanup(set_response_cache, None)
+        record = {
+            "oci": "0610-065",
+            "citing": "omid:br/065 pmid:5",
+            "cited": "omid:br/0610 pmid:10",
+            "creation": "2020",
+            "timespan": "",
+            "journal_sc": "no",
+            "author_sc": "no",
+        }
+        res = requests.Response()
+        res.status_code = 200
+        res._content = json.dumps([record]).encode()
+        default_cache = ResponseCache(Path(directory.name).joinpath("responses.sqlite"))
+        # the API client is mocked in the setup, so undo that for the real one
+        from_api = json_api_client.get_outgoing_citations_from_api
+        with (
+            mock.patch.object(api, "get_outgoing_citations_from_api", from_api),
+            mock.patch.object(response_cache, "_default_response_cache", default_cache),
+            mock.patch.object(json_api_client, "_get", return_value=res) as get,
+        ):
+            for _ in range(2):
+                rv = api.get_outgoing_citations(
+                    "pubmed:5", backend="auto", return_type="str", token=TOKEN
+                )
+                self.assertEqual(["10"], rv)
+        get.assert_called_once()
+        self.assertEqual(1, default_cache.statistics.hits)
+        self.assertIsNone(response_cache.get_response_cache())
@@ -0,0 +1,61 @@
+"""Test the delta layer for incremental graph cache updates."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from pystow.graph import build_graph_cache
+
+from opencitations_client.delta import CitationDelta, DeltaGraphCache
+from opencitations_client.mapping import format_omid
+
+A, B, C, D, E = (format_omid(i) for i in range(1, 6))
+EDGES = [(A, B), (A, C), (B, C)]
+
+
+class TestDelta(unittest.TestCase):
+    """Test the delta layer."""
+
+    def setUp(self) -> None:
+        """Set up a temporary directory with a small graph cache."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.base = Path(self.directory.name)
+        cache_directory = self.base.joinpath("cache")
+        cache_directory.mkdir()
+        self.cache = build_graph_cache(lambda: EDGES, cache_directory, progress=False)
+
+    def test_lookup(self) -> None:
+        """Test that lookups apply the delta on top of the graph cache."""
+        delta = CitationDelta(added=[(1, 4), (4, 3)], removed=[(1, 3)])
+        cache = DeltaGraphCache(self.cache, delta)
+        self.assertEqual([B, D], cache.out_edges(A))
+        self.assertEqual([C], cache.out_edges(D))
+        self.assertEqual([B, D], sorted(cache.in_edges(C)))
+        self.assertEqual([], cache.out_edges(E))
+        with self.assertRaises(KeyError):
+            cache.out_edges(E, raise_on_missing=True)
+        # nodes that are only in the delta don't count as missing
+        self.assertEqual([A], cache.in_edges(D, raise_on_missing=True))
+        # nodes that can't be parsed can't be in the delta
+        self.assertEqual([], cache.out_edges("nope"))
+        self.assertEqual([-1, 1], cache.parse_nodes(["nope", A]).tolist())
+
+    def test_update(self) -> None:
+        """Test merging a newer delta into an existing one."""
+        delta = CitationDelta(added=[(1, 4)], removed=[(1, 3)])
+        delta = delta.update(added=[(1, 3), (2, 4)], removed=[(1, 4), (2, 3)])
+        self.assertEqual([[2, 4]], delta.added.tolist())
+        self.assertEqual([[2, 3]], delta.removed.tolist())
+        self.assertEqual(2, len(delta))
+        self.assertEqual([2, 3, 4], delta.get_nodes().tolist())
+
+    def test_save_load(self) -> None:
+        """Test round-tripping a delta through the file system."""
+        directory = self.base.joinpath("delta")
+        self.assertFalse(CitationDelta.load(directory))
+        delta = CitationDelta(added=[(1, 4), (1, 2)], removed=[(1, 3)])
+        delta.save(directory)
+        loaded = CitationDelta.load(directory)
+        self.assertEqual([[1, 2], [1, 4]], loaded.added.tolist())
+        self.assertEqual(delta.removed.tolist(), loaded.removed.tolist())
@@ -0,0 +1,500 @@
+"""Test processing bulk downloads."""
+
+import csv
+import datetime
+import json
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import numpy as np
+import pystow
+from curies import Reference
+from pystow.graph import GraphCache
+from pystow.utils import safe_open_writer
+
+from opencitations_client import api, cache, download
+from opencitations_client.citation_store import MISSING
+from opencitations_client.mapping import OMIDMapping, parse_omid
+from opencitations_client.models import Citation, LazyWork, Work
+
+HERE = Path(__file__).parent.resolve()
+ARTICLES_SAMPLE_PATH = HERE.joinpath("articles_sample.csv")
+CITATIONS_SAMPLE_PATH = HERE.joinpath("citations_sample.csv")
+
+
+def doi(identifier: str) -> Reference:
+    """Get a reference for a DOI."""
+    return Reference(prefix="doi", identifier=identifier)
+
+
+class TestMetadata(unittest.TestCase):
+    """Test processing the metadata dump."""
+
+    def setUp(self) -> None:
+        """Set up a temporary directory with a small metadata dump."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        base = Path(self.directory.name)
+        self.metadata_path = base.joinpath("metadata.tar.gz")
+        with tarfile.open(self.metadata_path, mode="w:gz") as tar_file:
+            # split the sample into two parts to check they're both read
+            lines = ARTICLES_SAMPLE_PATH.read_text().splitlines(keepends=True)
+            for i, part in enumerate([lines[:3], [lines[0], *lines[3:]]]):
+                path = base.joinpath(f"part_{i}.csv")
+                path.write_text("".join(part))
+                tar_file.add(path, arcname=path.name)
+        for target, value in [
+            ("ensure_metadata_csv", lambda: self.metadata_path),
+            ("MODULE", pystow.Module(base.joinpath("module"))),
+        ]:
+            patcher = mock.patch.object(download, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_external_identifiers(self) -> None:
+        """Test extracting all external identifier mappings in one pass."""
+        with mock.patch.object(
+            download,
+            "_iter_omid_to_external_identifiers",
+            wraps=download._iter_omid_to_external_identifiers,
+        ) as wrapped:
+            self.assertEqual(
+                [
+                    ("br/0634096228", "10.1016/j.bej.2023.108849"),
+                    ("br/0634096859", "10.1080/19427867.2022.2160559"),
+                    ("br/0634096809", "10.1016/j.neucie.2022.11.019"),
+                    ("br/0634096697", "10.1007/978-3-031-30541-2_18"),
+                    ("br/0634096003", "10.1364/ao.475915"),
+                ],
+                [tuple(row) for row in download.iter_omid_to_doi()],
+            )
+            self.assertEqual(
+                ["br/0634096228", "W4319166369"],
+                next(iter(download._iter_omid_to_external_identifier("openalex"))),
+            )
+            self.assertEqual([], list(download.iter_omid_to_pubmed()))
+            # all prefixes were extracted by the first call
+            wrapped.assert_called_once()
+
+    def test_external_identifiers_parallel(self) -> None:
+        """Test extracting external identifiers with several workers gives the same result."""
+        prefixes = download.EXTERNAL_PREFIXES
+        self.assertEqual(
+            list(download._iter_omid_to_external_identifiers(prefixes)),
+            list(download._iter_omid_to_external_identifiers(prefixes, workers=2)),
+        )
+
+    def test_iter_metadata(self) -> None:
+        """Test iterating over the metadata, with and without workers."""
+        works = list(download.iter_metadata())
+        self.assertEqual(
+            ["br/0634096228", "br/0634096859", "br/0634096809", "br/0634096697", "br/0634096003"],
+            [work.omid for work in works],
+        )
+        self.assertEqual(works, list(download.iter_metadata(workers=2)))
+
+    def test_iter_metadata_lazy(self) -> None:
+        """Test iterating over lightweight documents gives the same fields."""
+        works = list(download.iter_metadata())
+        lazy_works = list(download.iter_metadata(lazy=True, workers=2))
+        self.assertEqual(len(works), len(lazy_works))
+        for work, lazy_work in zip(works, lazy_works, strict=True):
+            self.assertIsInstance(lazy_work, LazyWork)
+            self.assertEqual(work.omid, lazy_work.omid)
+            self.assertEqual(work.pubmed, lazy_work.pubmed)
+            for field in Work.model_fields:
+                with self.subTest(field=field):
+                    self.assertEqual(getattr(work, field), getattr(lazy_work, field))
+            self.assertEqual(work, lazy_work.to_work())
+
+    def test_iter_metadata_columns(self) -> None:
+        """Test iterating over a few columns of the metadata."""
+        with ARTICLES_SAMPLE_PATH.open() as file:
+            expected = [
+                {"id": record["id"], "pub_date": record["pub_date"]}
+                for record in csv.DictReader(file)
+            ]
+        columns = ["id", "pub_date"]
+        self.assertEqual(expected, list(download.iter_metadata(columns=columns)))
+        self.assertEqual(expected, list(download.iter_metadata(columns=columns, workers=2)))
+
+        batches = list(download.iter_metadata_batches(columns))
+        self.assertEqual([2, 3], [len(batch["id"]) for batch in batches])
+        self.assertEqual(
+            [record["id"] for record in expected],
+            np.concatenate([batch["id"] for batch in batches]).tolist(),
+        )
+        self.assertEqual(datetime.date(2023, 3, 1), batches[0]["pub_date"][0].item())
+        self.assertEqual(
+            [work.pub_date for work in download.iter_metadata()],
+            np.concatenate([batch["pub_date"] for batch in batches]).tolist(),
+        )
+
+        with self.assertRaises(ValueError):
+            list(download.iter_metadata(columns=["id", "citations"]))
+        with self.assertRaises(ValueError):
+            list(download.iter_metadata(columns=columns, lazy=True))  # type:ignore[call-overload]
+
+    def test_iter_metadata_malformed(self) -> None:
+        """Test that columns are read from rows with missing or extra values."""
+        header = ",".join(download.METADATA_COLUMNS)
+        data = f"{header}\nomid:br/061,A\n\nomid:br/062,{',' * 9}x,y\n".encode()
+        for columns in [download.METADATA_COLUMNS, ("id", "title", "editor")]:
+            with self.subTest(columns=columns):
+                records = download._process_metadata_member_columns(data, columns=columns)
+                self.assertEqual(
+                    [
+                        {"id": "omid:br/061", "title": "A", "editor": ""},
+                        {"id": "omid:br/062", "title": "", "editor": "x"},
+                    ],
+                    [{key: record[key] for key in ("id", "title", "editor")} for record in records],
+                )
+                batch = download._process_metadata_member_batch(data, columns=columns)
+                self.assertEqual(["", "x"], batch["editor"].tolist())
+
+    def test_metadata_store(self) -> None:
+        """Test looking up works in the local metadata database."""
+        works = list(download.iter_metadata())
+        path = Path(self.directory.name).joinpath("metadata.db")
+        store = download._load_metadata_store(path, workers=2)
+        self.assertEqual(len(works), len(store))
+        self.assertEqual([path.name], [p.name for p in path.parent.glob("metadata.db*")])
+
+        missing = doi("10.1000/missing")
+        references = [
+            Reference(prefix="omid", identifier="br/0634096859"),
+            # DOIs are matched case-insensitively
+            doi("10.1016/J.BEJ.2023.108849"),
+            Reference(prefix="openalex", identifier="W4319166369"),
+            missing,
+        ]
+        self.assertEqual(
+            {
+                references[0]: works[1],
+                references[1]: works[0],
+                references[2]: works[0],
+                missing: None,
+            },
+            store.get_works(references),
+        )
+
+        cache._get_metadata_store.cache_clear()
+        self.addCleanup(cache._get_metadata_store.cache_clear)
+        with mock.patch.object(cache, "CITATION_DB", path):
+            self.assertEqual([works[1], works[0]], api.get_articles(references, backend="local"))
+
+
+class TestCitations(unittest.TestCase):
+    """Test processing the citation dump."""
+
+    def setUp(self) -> None:
+        """Set up a temporary directory with a small citation dump."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        base = Path(self.directory.name)
+        lines = CITATIONS_SAMPLE_PATH.read_text().splitlines(keepends=True)
+        self.archive_paths = []
+        for i, part in enumerate([lines[1:5], lines[5:8], lines[8:]]):
+            archive_path = base.joinpath(f"citations_{i}.zip")
+            with zipfile.ZipFile(archive_path, mode="w") as zip_file:
+                zip_file.writestr(f"citations_{i}.csv", "".join([lines[0], *part]))
+            self.archive_paths.append(archive_path)
+        self.expected_omid_citations = [
+            [citing.removeprefix("omid:"), cited.removeprefix("omid:")]
+            for _, citing, cited, *_ in csv.reader(lines[1:])
+        ]
+
+        self.module = pystow.Module(base.joinpath("module"))
+        with safe_open_writer(self.module.join(name="omid_to_doi.tsv.gz")) as writer:
+            writer.writerow(("omid", "doi"))
+            writer.writerows(
+                [
+                    ("br/06801597168", "10.1000/a"),
+                    ("br/062402843420", "10.1000/b"),
+                    ("br/06602862275", "10.1000/c"),
+                    ("br/061401980696", "10.1000/d"),
+                ]
+            )
+        for target, value in [
+            ("ensure_citation_data_csv", lambda: self.archive_paths),
+            ("MODULE", self.module),
+        ]:
+            patcher = mock.patch.object(download, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_omid_citations(self) -> None:
+        """Test getting OMID citations."""
+        self.assertEqual(self.expected_omid_citations, list(download.iter_omid_citations()))
+        # loaded from the cache
+        self.assertEqual(self.expected_omid_citations, list(download.iter_omid_citations()))
+        self.assertEqual(
+            self.expected_omid_citations,
+            list(download.iter_omid_citations(force_process=True, workers=2)),
+        )
+
+    def test_binary_citations(self) -> None:
+        """Test getting citations in the binary edge format."""
+        self.assertEqual(
+            self.expected_omid_citations,
+            [list(edge) for edge in download.iter_omid_citations(edge_format="bin")],
+        )
+        arrays = list(download.iter_citation_arrays("omid", workers=2))
+        self.assertEqual(len(self.archive_paths), len(arrays))
+        self.assertIsInstance(arrays[0], np.memmap)
+        self.assertEqual(
+            [parse_omid(omid) for omid, _ in self.expected_omid_citations],
+            np.concatenate(arrays)[:, 0].tolist(),
+        )
+
+        expected = [["10.1000/a", "10.1000/b"], ["10.1000/a", "10.1000/c"]]
+        self.assertEqual(expected, list(download.iter_doi_citations(edge_format="bin")))
+        # one of the archives has no DOI citations
+        self.assertEqual([2, 0, 0], [len(a) for a in download.iter_citation_arrays("doi")])
+
+    def test_update_mapping(self) -> None:
+        """Test that shards of string table positions are reprocessed for a new mapping."""
+        expected = [["10.1000/a", "10.1000/b"], ["10.1000/a", "10.1000/c"]]
+        self.assertEqual(expected, list(download.iter_doi_citations(edge_format="bin")))
+        # a DOI that sorts first shifts the positions of all others in the string table
+        mapping = download._get_omid_mapping("doi")
+        OMIDMapping.from_pairs([*mapping.forward.items(), ("br/0612058700", "10.0999/z")]).save(
+            self.module.join(name="omid_to_doi.index")
+        )
+        with mock.patch.object(
+            download, "_process_citation_archive", side_effect=download._process_citation_archive
+        ) as wrapped:
+            _added, _removed, manifest = download._update_citations("doi")
+        self.assertEqual(self.archive_paths, [c.args[0] for c in wrapped.call_args_list])
+        download._commit_citations("doi", manifest)
+        self.assertEqual(expected, list(download.iter_doi_citations(edge_format="bin")))
+
+    def test_update_citations(self) -> None:
+        """Test updating the binary edge list to a new release."""
+        download._ensure_citations("omid", edge_format="bin")
+        lines = CITATIONS_SAMPLE_PATH.read_text().splitlines(keepends=True)
+        new_line = "oci:0610-0620,omid:br/0610,omid:br/0620,2020-01-01,P1Y,no,no\n"
+        # change the second archive, drop the third archive, and add a new one
+        with zipfile.ZipFile(self.archive_paths[1], mode="w") as zip_file:
+            zip_file.writestr("citations_1.csv", "".join([lines[0], *lines[5:7], new_line]))
+        new_archive_path = self.archive_paths[2].with_name("citations_3.zip")
+        with zipfile.ZipFile(new_archive_path, mode="w") as zip_file:
+            zip_file.writestr("citations_3.csv", "".join([lines[0], lines[8]]))
+        self.archive_paths[2:] = [new_archive_path]
+
+        with mock.patch.object(
+            download, "_process_citation_archive", wraps=download._process_citation_archive
+        ) as process:
+            added, removed, manifest = download._update_citations("omid")
+        self.assertEqual(2, process.call_count)
+        self.assertEqual([[610, 620]], added.tolist())
+        # the edge in lines[8] moved to the new archive, so it's not removed
+        removed_lines = [lines[7], *lines[9:]]
+        self.assertEqual(
+            sorted(
+                [parse_omid(citing.removeprefix("omid:")), parse_omid(cited.removeprefix("omid:"))]
+                for _, citing, cited, *_ in csv.reader(removed_lines)
+            ),
+            sorted(removed.tolist()),
+        )
+
+        # the update only takes effect once its manifest is committed
+        self.assertEqual(
+            self.expected_omid_citations,
+            [list(edge) for edge in download.iter_omid_citations(edge_format="bin")],
+        )
+        download._commit_citations("omid", manifest)
+        directory = self.module.join(name="omid_citations.edges")
+        self.assertEqual(
+            sorted(shard["name"] for shard in manifest["shards"]),
+            sorted(path.name for path in directory.glob("*.bin")),
+        )
+        updated = list(download.iter_omid_citations(edge_format="bin"))
+        shutil.rmtree(directory)
+        self.assertEqual(list(download.iter_omid_citations(edge_format="bin")), updated)
+
+    def test_update_omid_cache(self) -> None:
+        """Test that an interrupted update of the OMID graph cache is finished later."""
+        for target, value in [
+            ("MODULE", self.module),
+            ("omid_state_path", self.module.join(name="database-omid.json")),
+        ]:
+            patcher = mock.patch.object(cache, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache._get_omid_cache.cache_clear()
+        self.addCleanup(cache._get_omid_cache.cache_clear)
+
+        self.assertEqual(0, len(cache.update_omid_cache()))
+        lines = CITATIONS_SAMPLE_PATH.read_text().splitlines(keepends=True)
+        new_line = "oci:0610-0620,omid:br/0610,omid:br/0620,2020-01-01,P1Y,no,no\n"
+        with zipfile.ZipFile(self.archive_paths[1], mode="w") as zip_file:
+            zip_file.writestr("citations_1.csv", "".join([lines[0], *lines[5:8], new_line]))
+        with (
+            mock.patch.object(cache, "_commit_citations", side_effect=KeyboardInterrupt),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            cache.update_omid_cache(compaction_threshold=1.0)
+        # the delta was switched to, but the edge list wasn't updated yet
+        self.assertEqual(["br/0620"], cache._get_omid_cache().out_edges("br/0610"))
+        edge = ["br/0610", "br/0620"]
+        self.assertNotIn(edge, [list(e) for e in download.iter_omid_citations(edge_format="bin")])
+
+        # e.g., a cache that another process is building
+        self.module.join("database-omid.v9")
+        cache.compact_omid_cache()
+        self.assertIn(edge, [list(e) for e in download.iter_omid_citations(edge_format="bin")])
+        self.assertIsInstance(cache._get_omid_cache(), GraphCache)
+        self.assertEqual(["br/0620"], cache._get_omid_cache().out_edges("br/0610"))
+        self.assertEqual(
+            ["database-omid.json", "database-omid.v2", "database-omid.v9"],
+            sorted(path.name for path in self.module.base.glob("database-omid*")),
+        )
+
+    def test_resume(self) -> None:
+        """Test resuming citation processing after a crash."""
+        process = download._process_citation_archive
+
+        def _crash_on_last_archive(path: Path, **kwargs: Any) -> dict[str, Any]:
+            if path == self.archive_paths[-1]:
+                raise KeyboardInterrupt
+            return process(path, **kwargs)
+
+        for edge_format in ("tsv", "bin"):
+            with self.subTest(edge_format=edge_format):
+                with (
+                    mock.patch.object(
+                        download, "_process_citation_archive", side_effect=_crash_on_last_archive
+                    ),
+                    self.assertRaises(KeyboardInterrupt),
+                ):
+                    list(download.iter_omid_citations(edge_format=edge_format))
+
+                with mock.patch.object(
+                    download, "_process_citation_archive", side_effect=process
+                ) as wrapped:
+                    self.assertEqual(
+                        self.expected_omid_citations,
+                        [list(e) for e in download.iter_omid_citations(edge_format=edge_format)],
+                    )
+                # only the archive that crashed was processed again
+                self.assertEqual(
+                    [self.archive_paths[-1]], [c.args[0] for c in wrapped.call_args_list]
+                )
+
+    def test_resume_corrupt(self) -> None:
+        """Test that a corrupt shard is reprocessed when resuming."""
+        directory = download._ensure_citations("omid", edge_format="bin")
+        manifest = json.loads(directory.joinpath(download.MANIFEST_NAME).read_text())
+        manifest["complete"] = False
+        directory.joinpath(download.MANIFEST_NAME).write_text(json.dumps(manifest))
+        directory.joinpath(manifest["shards"][0]["name"]).write_bytes(b"")
+
+        with mock.patch.object(
+            download, "_process_citation_archive", side_effect=download._process_citation_archive
+        ) as wrapped:
+            self.assertEqual(
+                self.expected_omid_citations,
+                [list(e) for e in download.iter_omid_citations(edge_format="bin")],
+            )
+        self.assertEqual([self.archive_paths[0]], [c.args[0] for c in wrapped.call_args_list])
+
+    def test_doi_citations(self) -> None:
+        """Test getting DOI citations, using a mapping from OMIDs."""
+        expected = [["10.1000/a", "10.1000/b"], ["10.1000/a", "10.1000/c"]]
+        self.assertEqual(expected, list(download.iter_doi_citations()))
+        # forcing would also rebuild the mapping from the metadata dump, so delete instead
+        self.module.join(name="doi_citations.tsv.gz").unlink()
+        self.assertEqual(expected, list(download.iter_doi_citations(workers=2)))
+
+    def test_citation_store(self) -> None:
+        """Test looking up the attributes of citations in the citation store."""
+        self.assertFalse(download._has_citation_store())
+        store = download._load_citation_store(workers=2)
+        self.assertTrue(download._has_citation_store())
+        self.assertEqual(len(self.expected_omid_citations), len(store))
+
+        expected = [
+            Citation(
+                reference=Reference(prefix="oci", identifier=oci.removeprefix("oci:")),
+                citing=[Reference.from_curie(citing)],
+                cited=[Reference.from_curie(cited)],
+                creation=creation,
+                timespan=timespan,
+                journal_self_citation=journal_sc == "yes",
+                author_self_citation=author_sc == "yes",
+            )
+            for oci, citing, cited, creation, timespan, journal_sc, author_sc in csv.reader(
+                CITATIONS_SAMPLE_PATH.read_text().splitlines()[1:]
+            )
+        ]
+
+        citing = parse_omid("br/0690972672")
+        # citations are sorted by the cited article
+        self.assertEqual(
+            [expected[6], expected[5], expected[4]],
+            store.to_citations(store.get_outgoing(citing)),
+        )
+        cited = parse_omid("br/06602862275")
+        self.assertEqual(expected[2:3], store.to_citations(store.get_incoming(cited)))
+        self.assertEqual([], store.to_citations(store.get_outgoing(cited)))
+
+        mapping = download._get_omid_mapping("doi")
+        citations = store.to_citations(
+            store.get_outgoing(parse_omid("br/06801597168")), mappings={"doi": mapping}
+        )
+        self.assertEqual(
+            [
+                [Reference(prefix="omid", identifier="br/06602862275"), doi("10.1000/c")],
+                [Reference(prefix="omid", identifier="br/062402843420"), doi("10.1000/b")],
+                [Reference(prefix="omid", identifier="br/062501437493")],
+            ],
+            [citation.cited for citation in citations],
+        )
+
+    def test_parse_citation_chunk(self) -> None:
+        """Test parsing the attributes of citations."""
+        data = (
+            b"oci,citing,cited,creation,timespan,journal_sc,author_sc\r\n"
+            b"oci:01-02,omid:br/01,omid:br/02,2020-02-29,-P1Y2M,yes,\r\n"
+            b"oci:01-03,omid:br/01,omid:br/03,,,,\n"
+            b"oci:01-04,omid:br/01,omid:br/04,2019-02-29,P1M2Y,x,no\n"
+            b"oci:01-05,omid:br/01,omid:br/05,2018-06-29\n"
+            b"oci:05-06,omid:br/05,omid:br/06,2018-04,P0D,,no"
+        )
+        columns = download._parse_citation_chunk(data)
+        self.assertEqual([1, 1, 1, 5], columns["citing"].tolist())
+        self.assertEqual([2, 3, 4, 6], columns["cited"].tolist())
+        missing = MISSING
+        self.assertEqual([18321, missing, missing, 17622], columns["creation"].tolist())
+        self.assertEqual([-425, missing, missing, 0], columns["timespan"].tolist())
+        self.assertEqual([1, -1, -1, -1], columns["journal_sc"].tolist())
+        self.assertEqual([-1, -1, 0, 0], columns["author_sc"].tolist())
+
+        self.assertEqual([], download._parse_citation_chunk(b"")["citing"].tolist())
+
+    def test_parse_oci_chunk(self) -> None:
+        """Test parsing OCIs into arrays of integer OMIDs."""
+        data = (
+            b"oci,citing,cited,creation,timespan,journal_sc,author_sc\n"
+            b"oci:06801597168-062402843420,omid:br/06801597168,omid:br/062402843420,2018-06-29\n"
+            b"\n"
+            b"oci:06x-061,,,2018-06-29\n"
+            b"oci:0612-06100000000000000000000000,,,2018-06-29\n"
+            b"oci:0612" + b"0" * 100_000 + b"\n"
+            b"oci:0690972672-062101521863,omid:br/0690972672,omid:br/062101521863,2018\n"
+            b"oci:067-068\r\n"
+            b"oci:069-0610"
+        )
+        sources, targets = download._parse_oci_chunk(data)
+        self.assertEqual([6801597168, 690972672, 67, 69], sources.tolist())
+        self.assertEqual([62402843420, 62101521863, 68, 610], targets.tolist())
+
+        sources, targets = download._parse_oci_chunk(b"")
+        self.assertEqual([], sources.tolist())
@@ -0,0 +1,96 @@
+"""Test compact identifier mappings."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from opencitations_client.mapping import OMIDMapping, StringTable, format_omid, parse_omid
+
+PAIRS = [
+    ("br/06801597168", "10.1000/b"),
+    ("br/062402843420", "10.1000/a"),
+    ("br/0612058700", "10.1007/978-1-4020-9632-7"),
+    ("br/062501437493", "10.1000/ü"),
+    # duplicate OMID, the last one wins
+    ("br/06801597168", "10.1000/c"),
+]
+
+
+class TestMapping(unittest.TestCase):
+    """Test compact identifier mappings."""
+
+    def test_omid_round_trip(self) -> None:
+        """Test parsing and formatting OMIDs."""
+        for omid in ("br/0612058700", "br/062402843420"):
+            self.assertEqual(omid, format_omid(parse_omid(omid)))
+        for omid in ("ra/0612058700", "br/00612", "br/06x"):
+            with self.assertRaises(ValueError):
+                parse_omid(omid)
+
+    def test_string_table(self) -> None:
+        """Test binary search in a string table."""
+        strings = sorted(["b", "a", "ü", "ab", ""])
+        table = StringTable.from_sorted(strings)
+        self.assertEqual(strings, list(table))
+        for i, string in enumerate(strings):
+            self.assertEqual(i, table.index(string))
+        self.assertIsNone(table.index("c"))
+        self.assertIsNone(StringTable.from_sorted([]).index("c"))
+
+    def test_mapping(self) -> None:
+        """Test looking up in both directions."""
+        mapping = OMIDMapping.from_pairs(PAIRS)
+        expected_forward = dict(PAIRS)
+        self.assertEqual(expected_forward, dict(mapping.forward))
+        self.assertEqual(
+            {"10.1000/a", "10.1000/b", "10.1000/c", "10.1000/ü", "10.1007/978-1-4020-9632-7"},
+            set(mapping.backward),
+        )
+        self.assertEqual("br/06801597168", mapping.get_omid("10.1000/b"))
+        self.assertEqual("br/06801597168", mapping.get_omid("10.1000/c"))
+        self.assertEqual("10.1000/ü", mapping.get_external("br/062501437493"))
+        self.assertIsNone(mapping.get_external("br/061"))
+        self.assertIsNone(mapping.get_external("nope"))
+        self.assertIsNone(mapping.get_omid("10.1000/d"))
+        self.assertNotIn("br/061", mapping.forward)
+
+    def test_chunks(self) -> None:
+        """Test that building from several sorted chunks gives the same mapping."""
+        pairs = [(f"br/06{i % 7}", f"10.1000/{i % 5}") for i in range(40)]
+        expected = OMIDMapping.from_pairs(pairs)
+        self.assertEqual(dict(pairs), dict(expected.forward))
+        self.assertEqual({external: omid for omid, external in pairs}, dict(expected.backward))
+        for chunk_size in [1, 3, 7]:
+            with self.subTest(chunk_size=chunk_size):
+                mapping = OMIDMapping.from_pairs(pairs, chunk_size=chunk_size)
+                for name, array in expected._get_arrays().items():
+                    self.assertEqual(array.tolist(), mapping._get_arrays()[name].tolist())
+
+    def test_save_load(self) -> None:
+        """Test saving and memory-mapping a mapping."""
+        mapping = OMIDMapping.from_pairs(PAIRS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("omid_to_doi.index")
+            self.assertFalse(OMIDMapping.exists(path))
+            mapping.save(path)
+            self.assertTrue(OMIDMapping.exists(path))
+            loaded = OMIDMapping.load(path)
+            self.assertIsInstance(loaded.omids, np.memmap)
+            self.assertEqual(dict(mapping.forward), dict(loaded.forward))
+            self.assertEqual(dict(mapping.backward), dict(loaded.backward))
+
+            # saving again overwrites
+            OMIDMapping.from_pairs([]).save(path)
+            self.assertEqual({}, dict(OMIDMapping.load(path).forward))
+
+    def test_bulk_lookup(self) -> None:
+        """Test looking up many OMIDs at once."""
+        mapping = OMIDMapping.from_pairs(PAIRS)
+        omid_values = np.array([parse_omid("br/06801597168"), 5, parse_omid("br/062402843420")])
+        indices = mapping.get_external_indices(omid_values)
+        self.assertEqual(-1, indices[1])
+        self.assertEqual(["10.1000/c", "10.1000/a"], mapping.table.take(indices[[0, 2]]).tolist())
+        empty = OMIDMapping.from_pairs([])
+        self.assertEqual([-1, -1, -1], empty.get_external_indices(omid_values).tolist())
@@ -0,0 +1,81 @@
+"""Test rate limiters."""
+
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from opencitations_client.rate_limit import (
+    FileRateLimiter,
+    InMemoryStore,
+    InProcessRateLimiter,
+    RateLimiter,
+    StoreRateLimiter,
+)
+
+
+def _reserve(path: Path) -> float:
+    return FileRateLimiter(path, calls=5, period=10).reserve()
+
+
+class TestRateLimiters(unittest.TestCase):
+    """Test rate limiters."""
+
+    def assert_delays(self, rate_limiter: RateLimiter) -> None:
+        """Test that the first calls go through immediately and later ones are spaced out."""
+        delays = [rate_limiter.reserve() for _ in range(7)]
+        self.assertEqual([0.0] * 5, delays[:5])
+        self.assertGreater(delays[5], 0.0)
+        self.assertGreaterEqual(delays[6], delays[5])
+
+    def test_in_process(self) -> None:
+        """Test the in-process token bucket."""
+        rate_limiter = InProcessRateLimiter(calls=5, period=10)
+        self.assert_delays(rate_limiter)
+        # tokens are refilled every two seconds, and three calls are queued up
+        self.assertAlmostEqual(6.0, rate_limiter.reserve(), delta=0.1)
+
+    def test_file(self) -> None:
+        """Test the token bucket shared between processes through a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("rate_limit.json")
+            self.assert_delays(FileRateLimiter(path, calls=5, period=10))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("rate_limit.json")
+            with ProcessPoolExecutor(max_workers=3) as executor:
+                delays = sorted(executor.map(_reserve, [path] * 8))
+            # no matter which process reserved a slot, only five go through at once
+            self.assertEqual([0.0] * 5, delays[:5])
+            self.assertTrue(all(delay > 0 for delay in delays[5:]))
+
+    def test_store(self) -> None:
+        """Test counting calls in fixed windows in a key-value store."""
+        store = InMemoryStore()
+        with mock.patch("time.time", return_value=1001.0):
+            # three windows of four seconds, with three calls each
+            rate_limiter = StoreRateLimiter(store, calls=12, period=12, windows=3)
+            delays = [rate_limiter.reserve() for _ in range(30)]
+        self.assertEqual([0.0, 0.0, 0.0, 3.0, 3.0, 3.0, 7.0], delays[:7])
+        # no span of one period has more calls than allowed, even across windows
+        times = [1001.0 + delay for delay in delays]
+        for start in times:
+            self.assertLessEqual(sum(start <= t < start + 12 for t in times), 12)
+        # two processes with the same store share the quota
+        with mock.patch("time.time", return_value=1101.0):
+            delays = [
+                StoreRateLimiter(store, calls=12, period=12, windows=3).reserve() for _ in range(4)
+            ]
+        self.assertEqual([0.0, 0.0, 0.0, 3.0], delays)
+        with self.assertRaises(ValueError):
+            StoreRateLimiter(store, calls=3, period=12, windows=3)
+
+    def test_in_memory_store(self) -> None:
+        """Test the in-memory stand-in for a key-value store."""
+        store = InMemoryStore()
+        self.assertFalse(store.expire("key", 10))
+        self.assertEqual(1, store.incr("key"))
+        self.assertEqual(3, store.incr("key", 2))
+        self.assertTrue(store.expire("key", 0))
+        self.assertEqual(1, store.incr("key"))
@@ -0,0 +1,120 @@
+"""Test the response cache."""
+
+import datetime
+import itertools
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import requests
+
+from opencitations_client import json_api_client
+from opencitations_client.response_cache import ResponseCache, set_response_cache
+
+TOKEN = "test-token"  # noqa:S105
+
+
+def _response(status_code: int, data: Any = None, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b"" if data is None else json.dumps(data).encode()
+    response.headers.update(headers)
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the response cache."""
+
+    def setUp(self) -> None:
+        """Set up a response cache in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(Path(directory.name).joinpath("responses.sqlite"))
+        set_response_cache(self.cache)
+        self.addCleanup(set_response_cache, None)
+
+    def test_hit(self) -> None:
+        """Test that a second request is served from the cache."""
+        url = f"{json_api_client.META_V1}/author/orcid:0000-0000-0000-0000"
+        with mock.patch.object(
+            json_api_client, "_get", return_value=_response(200, [{"title": "A"}])
+        ) as get:
+            for _ in range(3):
+                res = json_api_client._get_meta_v1("/author/orcid:0000-0000-0000-0000", token=TOKEN)
+                self.assertEqual([{"title": "A"}], res.json())
+        get.assert_called_once_with(url, token=TOKEN, headers=None)
+        self.assertEqual(2, self.cache.statistics.hits)
+        self.assertEqual(1, self.cache.statistics.misses)
+
+    def test_tokens(self) -> None:
+        """Test that responses aren't shared between tokens, and tokens aren't stored."""
+        with mock.patch.object(
+            json_api_client, "_get", return_value=_response(200, [{"title": "A"}])
+        ) as get:
+            json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+            json_api_client._get_index_v2("/citations/doi:10.1000/a", token="other-token")  # noqa:S106
+        self.assertEqual(2, get.call_count)
+        self.assertEqual(2, len(self.cache))
+        self.assertNotIn(TOKEN.encode(), self.cache.path.read_bytes())
+
+    def test_errors_not_cached(self) -> None:
+        """Test that unsuccessful responses aren't stored."""
+        with mock.patch.object(json_api_client, "_get", return_value=_response(500)) as get:
+            json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+            json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+        self.assertEqual(2, get.call_count)
+        self.assertEqual(0, len(self.cache))
+
+    def test_revalidate(self) -> None:
+        """Test that expired responses are revalidated with a conditional request."""
+        self.cache.ttl = datetime.timedelta(0)
+        with mock.patch.object(
+            json_api_client, "_get", return_value=_response(200, [1], ETag='"v1"')
+        ):
+            json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+        with mock.patch.object(json_api_client, "_get", return_value=_response(304)) as get:
+            res = json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+        self.assertEqual({"If-None-Match": '"v1"'}, get.call_args.kwargs["headers"])
+        self.assertEqual(200, res.status_code)
+        self.assertEqual([1], res.json())
+        self.assertEqual(1, self.cache.statistics.revalidations)
+
+        # if the response changed, the new one is stored
+        with mock.patch.object(
+            json_api_client, "_get", return_value=_response(200, [2], ETag='"v2"')
+        ):
+            res = json_api_client._get_index_v2("/citations/doi:10.1000/a", token=TOKEN)
+        self.assertEqual([2], res.json())
+        cached = self.cache.get(f"{json_api_client.BASE_V2}/citations/doi:10.1000/a", token=TOKEN)
+        self.assertIsNotNone(cached)
+        self.assertEqual('"v2"', cached.etag)  # type:ignore[union-attr]
+
+    def test_evict(self) -> None:
+        """Test that the least recently used responses are evicted."""
+        # each response is 12 bytes, so two fit
+        self.cache.max_size = 25
+        with mock.patch("time.time", side_effect=itertools.count(1000)):
+            self.cache.set("https://example.org/0", _response(200, "0123456789"))
+            self.cache.set("https://example.org/1", _response(200, "0123456789"))
+            # use the first one, so the second is the least recently used
+            self.cache.get("https://example.org/0")
+            self.cache.set("https://example.org/2", _response(200, "0123456789"))
+            self.assertIsNotNone(self.cache.get("https://example.org/0"))
+            self.assertIsNone(self.cache.get("https://example.org/1"))
+            self.assertIsNotNone(self.cache.get("https://example.org/2"))
+        self.assertEqual(24, self.cache.get_size())
+        self.assertEqual(1, self.cache.statistics.evictions)
+
+    def test_size(self) -> None:
+        """Test that the total size is kept up to date when responses are replaced."""
+        self.cache.set("https://example.org/0", _response(200, "0123456789"))
+        self.cache.set("https://example.org/1", _response(200, "0123456789"))
+        self.cache.set("https://example.org/0", _response(200, "0"))
+        self.assertEqual(15, self.cache.get_size())
+        # a cache that's opened again gets the size from the database
+        self.assertEqual(15, ResponseCache(self.cache.path).get_size())
+        self.cache.clear()
+        self.assertEqual(0, self.cache.get_size())
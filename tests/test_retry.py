@@ -0,0 +1,155 @@
+"""Test retrying calls to the API, against a local stub server."""
+
+import datetime
+import email.utils
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+
+from opencitations_client import json_api_client
+from opencitations_client.rate_limit import InProcessRateLimiter, set_rate_limiter
+from opencitations_client.retry import RetryPolicy, parse_retry_after, set_retry_policy
+
+TOKEN = "test-token"  # noqa:S105
+
+
+class StubServer(ThreadingHTTPServer):
+    """A local server that answers calls with a queue of scripted responses."""
+
+    def __init__(self, responses: list[tuple[int, dict[str, str]]]) -> None:
+        """Start a server on a free port, which answers with the given responses."""
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = responses
+        self.paths: list[str] = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        """Get the base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each call with the next scripted response, and then with the last one."""
+
+    server: StubServer
+
+    def do_GET(self) -> None:
+        """Answer a call."""
+        self.server.paths.append(self.path)
+        responses = self.server.responses
+        status, headers = responses.pop(0) if len(responses) > 1 else responses[0]
+        body = json.dumps([{"status": status}]).encode()
+        self.send_response(status)
+        for key, value in {**headers, "Content-Length": str(len(body))}.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Don't log calls."""
+
+
+class TestRetry(unittest.TestCase):
+    """Test retrying calls to the API."""
+
+    def setUp(self) -> None:
+        """Set up a retry policy with short delays, and a fresh rate limiter."""
+        self.policy = RetryPolicy(max_retries=3, backoff=0.01, jitter=False)
+        set_retry_policy(self.policy)
+        self.addCleanup(set_retry_policy, None)
+        set_rate_limiter(InProcessRateLimiter())
+        self.addCleanup(set_rate_limiter, None)
+
+    def get(self, responses: list[tuple[int, dict[str, str]]]) -> tuple[requests.Response, int]:
+        """Make a call to a stub server, and get the response and number of calls."""
+        server = StubServer(responses)
+        self.addCleanup(server.stop)
+        res = json_api_client._get(f"{server.url}/test", token=TOKEN)
+        return res, len(server.paths)
+
+    def test_server_errors(self) -> None:
+        """Test that transient server errors are retried with exponential backoff."""
+        with mock.patch("time.sleep") as sleep:
+            res, calls = self.get([(502, {}), (500, {}), (200, {})])
+        self.assertEqual(200, res.status_code)
+        self.assertEqual([{"status": 200}], res.json())
+        self.assertEqual(3, calls)
+        self.assertEqual([mock.call(0.01), mock.call(0.02)], sleep.call_args_list)
+        self.assertEqual(2, self.policy.statistics.retries)
+        self.assertEqual(3, self.policy.statistics.calls)
+        # server errors other than 503 don't lower the rate
+        self.assertEqual(1.0, self.policy.rate)
+
+    def test_retry_after(self) -> None:
+        """Test that the server's Retry-After header is honored, and the rate adapts."""
+        with mock.patch("time.sleep") as sleep:
+            res, calls = self.get([(429, {"Retry-After": "7"}), (200, {})])
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(2, calls)
+        sleep.assert_called_once_with(7.0)
+        self.assertEqual(1, self.policy.statistics.pushbacks)
+        self.assertEqual(7.0, self.policy.statistics.delay)
+        # halved by the 429, then climbing back up after the successful call
+        self.assertAlmostEqual(0.6, self.policy.rate)
+
+    def test_give_up(self) -> None:
+        """Test that the last response is returned after too many retries."""
+        with mock.patch("time.sleep"):
+            res, calls = self.get([(503, {})])
+        self.assertEqual(503, res.status_code)
+        self.assertEqual(4, calls)
+        self.assertEqual(1, self.policy.statistics.failures)
+        self.assertEqual(1 / 16, self.policy.rate)
+
+    def test_not_retried(self) -> None:
+        """Test that client errors aren't retried."""
+        res, calls = self.get([(404, {}), (200, {})])
+        self.assertEqual(404, res.status_code)
+        self.assertEqual(1, calls)
+        self.assertEqual(0, self.policy.statistics.retries)
+
+    def test_connection_error(self) -> None:
+        """Test that connection errors are retried, then raised."""
+        server = StubServer([(200, {})])
+        url = server.url
+        server.stop()
+        with mock.patch("time.sleep"), self.assertRaises(requests.ConnectionError):
+            json_api_client._get(f"{url}/test", token=TOKEN)
+        self.assertEqual(4, self.policy.statistics.errors)
+        self.assertEqual(1, self.policy.statistics.failures)
+
+    def test_pacing(self) -> None:
+        """Test that calls are spaced out when the rate is lowered, and jitter."""
+        policy = RetryPolicy(interval=1.0, backoff=10.0)
+        self.assertEqual(0.0, policy.reserve())
+        self.assertEqual(0.0, policy.reserve())
+        policy.rate = 0.5
+        self.assertEqual(0.0, policy.reserve())
+        self.assertAlmostEqual(2.0, policy.reserve(), delta=0.1)
+        for attempt in range(3):
+            delay = policy.get_delay(attempt, status=502)
+            if delay is None:
+                self.fail("server errors should be retried")
+            self.assertLessEqual(delay, 10.0 * 2**attempt)
+
+    def test_parse_retry_after(self) -> None:
+        """Test parsing the Retry-After header."""
+        self.assertEqual(30.0, parse_retry_after("30"))
+        self.assertIsNone(parse_retry_after("soon"))
+        date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+        delay = parse_retry_after(email.utils.format_datetime(date, usegmt=True))
+        if delay is None:
+            self.fail("HTTP dates should be parsed")
+        self.assertAlmostEqual(60.0, delay, delta=2.0)